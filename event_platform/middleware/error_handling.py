@@ -3,16 +3,13 @@ from django.core.exceptions import PermissionDenied
 from django.http import Http404
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.utils.deprecation import MiddlewareMixin
 
-class ErrorHandlingMiddleware:
-    """Middleware para manejar errores de permisos y otros errores comunes"""
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
+class ErrorHandlingMiddleware(MiddlewareMixin):
+    """Middleware para manejar errores de permisos y otros errores comunes
 
-    def __call__(self, request):
-        response = self.get_response(request)
-        return response
+    MiddlewareMixin lo hace compatible con vistas síncronas y async.
+    """
 
     def process_exception(self, request, exception):
         """Maneja excepciones específicas"""
@@ -0,0 +1,127 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+logger = logging.getLogger('event_platform.sql')
+
+
+class RegistroConsultas:
+    """Envoltorio de ejecución que anota cada consulta SQL de una petición"""
+    
+    def __init__(self):
+        self.consultas = []
+    
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append({
+                'sql': sql,
+                'params': params,
+                'duracion': time.perf_counter() - inicio,
+                'alias': context['connection'].alias,
+            })
+    
+    @property
+    def total(self):
+        return len(self.consultas)
+    
+    @property
+    def tiempo_total(self):
+        """Tiempo total en SQL (segundos)"""
+        return sum(consulta['duracion'] for consulta in self.consultas)
+    
+    @property
+    def duplicadas(self):
+        """Número de ejecuciones repetidas con el mismo SQL y los mismos parámetros"""
+        repeticiones = Counter(
+            (consulta['sql'], repr(consulta['params'])) for consulta in self.consultas
+        )
+        return sum(veces - 1 for veces in repeticiones.values())
+    
+    @property
+    def similares(self):
+        """Número de ejecuciones repetidas del mismo SQL con otros parámetros (patrón N+1)"""
+        repeticiones = Counter(consulta['sql'] for consulta in self.consultas)
+        return sum(veces - 1 for veces in repeticiones.values()) - self.duplicadas
+    
+    def mas_lentas(self, cantidad=3):
+        return sorted(self.consultas, key=lambda c: c['duracion'], reverse=True)[:cantidad]
+
+
+class InstrumentacionSQLMiddleware:
+    """Middleware que mide las consultas SQL de cada petición
+
+    Añade la cabecera ``Server-Timing`` (visible en las herramientas de
+    desarrollo del navegador) y escribe una línea JSON en el logger
+    ``event_platform.sql``. El registro queda en ``request.consultas_sql``
+    para que las pruebas puedan comprobar presupuestos de consultas.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Con vistas async (ASGI) no forzar un hilo por petición
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        registro = RegistroConsultas()
+        request.consultas_sql = registro
+        
+        inicio = time.perf_counter()
+        with self._instrumentar(registro):
+            response = self.get_response(request)
+        return self._anotar(request, response, registro, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        registro = RegistroConsultas()
+        request.consultas_sql = registro
+        
+        inicio = time.perf_counter()
+        with self._instrumentar(registro):
+            response = await self.get_response(request)
+        return self._anotar(request, response, registro, time.perf_counter() - inicio)
+
+    @staticmethod
+    def _instrumentar(registro):
+        pila = ExitStack()
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(registro))
+        return pila
+
+    def _anotar(self, request, response, registro, duracion):
+        tiempo_sql = registro.tiempo_total * 1000
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={tiempo_sql:.1f};desc="{registro.total} consultas"',
+            f'app;dur={duracion * 1000 - tiempo_sql:.1f}',
+        ])
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'metodo': request.method,
+                'ruta': request.path,
+                'vista': getattr(request.resolver_match, 'view_name', None),
+                'estado': response.status_code,
+                'duracion_ms': round(duracion * 1000, 2),
+                'consultas': registro.total,
+                'duplicadas': registro.duplicadas,
+                'similares': registro.similares,
+                'tiempo_sql_ms': round(tiempo_sql, 2),
+                'mas_lentas': [
+                    {'sql': c['sql'][:300], 'ms': round(c['duracion'] * 1000, 2)}
+                    for c in registro.mas_lentas()
+                ],
+            }, ensure_ascii=False))
+        
+        return response
@@ -0,0 +1,37 @@
+"""Presupuestos de consultas SQL por vista para las pruebas
+
+Cada entrada indica el máximo de consultas que puede ejecutar una vista
+(incluidas las de sesión, usuario y permisos). Si una vista lo supera, la
+prueba correspondiente falla y muestra las consultas ejecutadas.
+"""
+from django.urls import reverse
+
+PRESUPUESTOS_CONSULTAS = {
+    'eventos:lista': 8,
+    'eventos:detalle': 5,
+    'eventos:mis_eventos': 6,
+    'usuarios:perfil': 7,
+    'admin:eventos_evento_changelist': 6,
+    'admin:eventos_registroevento_changelist': 6,
+}
+
+
+class PresupuestoConsultasMixin:
+    """Mixin para TestCase que comprueba el presupuesto de consultas de una URL"""
+
+    presupuestos = PRESUPUESTOS_CONSULTAS
+
+    def assertDentroDelPresupuesto(self, nombre_url, args=None, kwargs=None, datos=None):
+        """Pide la URL con ``self.client`` y falla si supera su presupuesto"""
+        presupuesto = self.presupuestos[nombre_url]
+        respuesta = self.client.get(reverse(nombre_url, args=args, kwargs=kwargs), datos)
+        registro = respuesta.wsgi_request.consultas_sql
+        if registro.total > presupuesto:
+            detalle = '\n'.join(
+                f'{i}. {consulta["sql"]}' for i, consulta in enumerate(registro.consultas, 1)
+            )
+            self.fail(
+                f'{nombre_url} ejecutó {registro.total} consultas '
+                f'(presupuesto: {presupuesto}):\n{detalle}'
+            )
+        return respuesta
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'event_platform.middleware.instrumentacion.InstrumentacionSQLMiddleware',  # Métricas SQL por petición
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +66,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'usuarios.context_processors.grupos_usuario',
             ],
         },
     },
@@ -79,6 +82,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Tomar el bloqueo de escritura al abrir la transacción evita los
+            # "database is locked" al promocionar lecturas bajo concurrencia
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -124,7 +133,21 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caché compartida (permisos, fragmentos y respuestas)
+# En producción con varios procesos usar una caché compartida, por ejemplo:
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'event-platform',
+        # El valor por defecto (300) es menor que una página grande de tarjetas
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
 # Configuraciones de autenticación y seguridad
+# Permisos resueltos desde la caché (ver usuarios/permisos.py)
+AUTHENTICATION_BACKENDS = ['usuarios.backends.PermisosCacheadosBackend']
 LOGIN_URL = '/usuarios/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
@@ -147,3 +170,40 @@ STATICFILES_DIRS = [
 # Configuración de archivos media (para imágenes de eventos)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Registro de métricas SQL por petición (una línea JSON por petición con DEBUG=True)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'require_debug_true': {
+            '()': 'django.utils.log.RequireDebugTrue',
+        },
+    },
+    'handlers': {
+        'consola_sql': {
+            'class': 'logging.StreamHandler',
+            'filters': ['require_debug_true'],
+        },
+    },
+    'loggers': {
+        'event_platform.sql': {
+            'handlers': ['consola_sql'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Paginación de la lista de eventos: 'cursor' (keyset, sin COUNT ni OFFSET) u 'offset'
+EVENTOS_PAGINACION = 'cursor'
+
+# Resultados de una búsqueda: los N más relevantes (ver eventos/busqueda.py)
+EVENTOS_BUSQUEDA_MAXIMO = 200
+
+# Hilos que generan las variantes de Evento.imagen (ver eventos/imagenes.py)
+EVENTOS_IMAGENES_HILOS = 2
+
+# Vistas async de lista, detalle e inscripción (para servir con uvicorn o daphne).
+# Se elige por despliegue con la variable de entorno EVENTOS_VISTAS_ASYNC=1
+EVENTOS_VISTAS_ASYNC = os.environ.get('EVENTOS_VISTAS_ASYNC') == '1'
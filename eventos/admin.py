@@ -1,6 +1,69 @@
+from datetime import timedelta
+
 from django.contrib import admin
 from django.contrib.auth.models import User, Group, Permission
+from django.contrib import messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
+from django.utils.functional import cached_property
+from . import exportacion, reservas
+from .busqueda import filtro_prefijo, obtener_buscador
 from .models import TipoEvento, Evento, RegistroEvento
+from .paginacion import PaginadorConteoEstimado
+from .parametros import ParametroInvalido, rango_fechas
+
+
+# Listados preparados para tablas de millones de filas
+class ListadoEscalableMixin:
+    """Total estimado en lugar de COUNT(*) y búsqueda solo por índices"""
+    paginator = PaginadorConteoEstimado
+    # Sin el segundo COUNT(*) de la tabla completa al filtrar
+    show_full_result_count = False
+
+    @staticmethod
+    def usuarios_por_prefijo(texto):
+        """Ids de usuario cuyo username o email empieza por ``texto``"""
+        return User.objects.filter(
+            filtro_prefijo('username', texto) | filtro_prefijo('email', texto)
+        ).values('pk')
+
+    @staticmethod
+    def eventos_por_texto(texto):
+        """Ids de eventos que coinciden en el motor de búsqueda (FTS5 en SQLite)"""
+        return obtener_buscador().filtrar(Evento.objects.all(), texto).values('pk')
+
+
+# Acciones de exportación (CSV en streaming, XLSX en modo write_only)
+def _exportar(modeladmin, request, registros, formato):
+    if formato == 'xlsx' and not exportacion.xlsx_disponible():
+        modeladmin.message_user(
+            request, 'La exportación a Excel requiere openpyxl.', messages.ERROR
+        )
+        return None
+    if formato == 'xlsx':
+        return exportacion.respuesta_xlsx(registros, 'registros')
+    return exportacion.respuesta_csv(registros, 'registros')
+
+@admin.action(description='Exportar registros seleccionados a CSV')
+def exportar_registros_csv(modeladmin, request, queryset):
+    return _exportar(modeladmin, request, queryset, 'csv')
+
+@admin.action(description='Exportar registros seleccionados a Excel')
+def exportar_registros_xlsx(modeladmin, request, queryset):
+    return _exportar(modeladmin, request, queryset, 'xlsx')
+
+@admin.action(description='Exportar asistentes de los eventos seleccionados a CSV')
+def exportar_asistentes_csv(modeladmin, request, queryset):
+    registros = RegistroEvento.objects.filter(evento__in=queryset.values('pk'))
+    return _exportar(modeladmin, request, registros, 'csv')
+
+@admin.action(description='Exportar asistentes de los eventos seleccionados a Excel')
+def exportar_asistentes_xlsx(modeladmin, request, queryset):
+    registros = RegistroEvento.objects.filter(evento__in=queryset.values('pk'))
+    return _exportar(modeladmin, request, registros, 'xlsx')
 
 # Configuración para TipoEvento
 @admin.register(TipoEvento)
@@ -9,16 +72,147 @@ class TipoEventoAdmin(admin.ModelAdmin):
     search_fields = ['nombre']
     ordering = ['nombre']
 
-# Inline para mostrar registros en el admin de eventos
+# Formset que muestra una sola página de los registros del evento
+class RegistrosPaginadosFormSet(BaseInlineFormSet):
+    """Solo edita la página ``?registros=N`` (el POST va a la misma URL)"""
+    por_pagina = 50
+    pagina_solicitada = None
+
+    @cached_property
+    def pagina_registros(self):
+        # Orden por id: lo resuelve el índice de evento sin ordenar en memoria
+        registros = super().get_queryset().order_by('-pk')
+        paginador = Paginator(registros, self.por_pagina)
+        try:
+            return paginador.page(self.pagina_solicitada or 1)
+        except InvalidPage:
+            return paginador.page(1)
+
+    def get_queryset(self):
+        return self.pagina_registros.object_list
+
+def promover_plazas_liberadas(formularios, borrados=()):
+    """Cede a la lista de espera las plazas que dejan los registros editados
+
+    Una plaza queda libre si un registro confirmado se cancela (o cambia de
+    estado o de evento) o se borra; el contador ya se ajustó al guardar.
+    """
+    eventos = set()
+    for formulario in formularios:
+        if formulario.initial.get('estado') != 'confirmado':
+            continue
+        registro = formulario.instance
+        anterior = formulario.initial.get('evento', registro.evento_id)
+        if (formulario in borrados or registro.estado != 'confirmado'
+                or anterior != registro.evento_id):
+            eventos.add(anterior)
+    for evento_id in eventos:
+        reservas.promover_lista_espera(evento_id)
+
+# Inline con los registros existentes, paginado
 class RegistroEventoInline(admin.TabularInline):
     model = RegistroEvento
+    formset = RegistrosPaginadosFormSet
+    template = 'admin/eventos/evento/registros_paginados.html'
     extra = 0
-    readonly_fields = ['fecha_registro']
+    # El usuario se muestra como texto (select_related): sin <select> por fila
+    readonly_fields = ['usuario', 'fecha_registro']
     fields = ['usuario', 'estado', 'fecha_registro', 'comentarios']
+    
+    def has_add_permission(self, request, obj=None):
+        # Las altas van por NuevoRegistroEventoInline
+        return False
+    
+    def get_queryset(self, request):
+        # usuario para la columna y evento para el título de cada fila (__str__)
+        return super().get_queryset(request).select_related('usuario', 'evento')
+    
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.pagina_solicitada = request.GET.get('registros')
+        return formset
+
+# Inline para añadir registros con el usuario elegido por autocompletado
+class NuevoRegistroEventoInline(admin.TabularInline):
+    model = RegistroEvento
+    extra = 1
+    fields = ['usuario', 'estado', 'comentarios']
+    autocomplete_fields = ['usuario']
+    verbose_name_plural = 'Añadir registros'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).none()
+
+# Filtro del listado de eventos por ventana de fechas
+class VentanaFechasFilter(admin.SimpleListFilter):
+    """Próximos, de esta semana o en curso (EventoQuerySet.en_ventana)"""
+    title = 'cuándo'
+    parameter_name = 'cuando'
+
+    def lookups(self, request, model_admin):
+        return Evento.VENTANA_CHOICES
+
+    def queryset(self, request, queryset):
+        if self.value() in dict(Evento.VENTANA_CHOICES):
+            return queryset.en_ventana(self.value())
+        return queryset
+
+# Filtro del listado de eventos por rango de fechas, con el criterio de la lista pública
+class RangoFechasFilter(admin.ListFilter):
+    """Eventos que transcurren entre ``desde`` y ``hasta`` (EventoQuerySet.en_rango)"""
+    title = 'transcurre'
+    parametros = ('desde', 'hasta')
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        for parametro in self.parametros:
+            if parametro in params:
+                self.used_parameters[parametro] = params.pop(parametro)[-1]
+
+    def rangos(self):
+        hoy = timezone.localdate()
+        inicio_mes = hoy.replace(day=1)
+        fin_mes = (inicio_mes + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        return [
+            ('Hoy', hoy, hoy),
+            ('Próximos 7 días', hoy, hoy + timedelta(days=6)),
+            ('Este mes', inicio_mes, fin_mes),
+        ]
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return list(self.parametros)
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.used_parameters,
+            'query_string': changelist.get_query_string(remove=self.parametros),
+            'display': 'Cualquier fecha',
+        }
+        for nombre, desde, hasta in self.rangos():
+            valores = {'desde': desde.isoformat(), 'hasta': hasta.isoformat()}
+            yield {
+                'selected': self.used_parameters == valores,
+                'query_string': changelist.get_query_string(valores),
+                'display': nombre,
+            }
+
+    def queryset(self, request, queryset):
+        try:
+            desde, hasta = rango_fechas(
+                self.used_parameters.get('desde'), self.used_parameters.get('hasta')
+            )
+        except ParametroInvalido as error:
+            raise IncorrectLookupParameters(error)
+        if desde or hasta:
+            return queryset.en_rango(desde, hasta)
+        return queryset
 
 # Configuración para Evento
 @admin.register(Evento)
-class EventoAdmin(admin.ModelAdmin):
+class EventoAdmin(ListadoEscalableMixin, admin.ModelAdmin):
     list_display = [
         'titulo', 
         'tipo_evento', 
@@ -32,9 +226,14 @@ class EventoAdmin(admin.ModelAdmin):
         'estado', 
         'privacidad', 
         'tipo_evento', 
+        VentanaFechasFilter,
+        RangoFechasFilter,
         'fecha_inicio'
     ]
-    search_fields = ['titulo', 'descripcion', 'organizador__username']
+    list_select_related = ['tipo_evento', 'organizador']
+    autocomplete_fields = ['organizador']
+    search_fields = ['titulo', 'descripcion', '^organizador__username']
+    search_help_text = 'Palabras del título, descripción o ubicación, o inicio del username del organizador'
     ordering = ['-fecha_inicio']
     
     fieldsets = (
@@ -42,7 +241,7 @@ class EventoAdmin(admin.ModelAdmin):
             'fields': ('titulo', 'descripcion', 'tipo_evento', 'imagen')
         }),
         ('Fecha y Ubicación', {
-            'fields': ('fecha_inicio', 'fecha_fin', 'ubicacion', 'capacidad_maxima')
+            'fields': ('fecha_inicio', 'fecha_fin', 'ubicacion', 'capacidad_maxima', 'lista_espera')
         }),
         ('Configuración', {
             'fields': ('organizador', 'estado', 'privacidad', 'precio')
@@ -54,15 +253,43 @@ class EventoAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
-    inlines = [RegistroEventoInline]
+    inlines = [RegistroEventoInline, NuevoRegistroEventoInline]
+    actions = [exportar_asistentes_csv, exportar_asistentes_xlsx]
     
     def plazas_disponibles(self, obj):
+        # Sale del contador Evento.confirmados: sin consultas por fila
         return obj.plazas_disponibles
     plazas_disponibles.short_description = 'Plazas Disponibles'
+    
+    def get_search_results(self, request, queryset, search_term):
+        texto = search_term.strip()
+        if not texto:
+            return queryset, False
+        return queryset.filter(
+            Q(pk__in=self.eventos_por_texto(texto))
+            | Q(organizador__in=self.usuarios_por_prefijo(texto))
+        ), False
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        conflictos = obj.conflictos().count()
+        if conflictos:
+            self.message_user(
+                request,
+                f'Hay {conflictos} eventos en "{obj.ubicacion}" que se solapan con este horario.',
+                messages.WARNING,
+            )
+        # Ceder a la lista de espera las plazas que deje una capacidad mayor
+        if change and {'capacidad_maxima', 'lista_espera'} & set(form.changed_data):
+            reservas.promover_lista_espera(obj.pk)
+    
+    def save_formset(self, request, form, formset, change):
+        super().save_formset(request, form, formset, change)
+        promover_plazas_liberadas(formset.initial_forms, formset.deleted_forms)
 
 # Configuración para RegistroEvento
 @admin.register(RegistroEvento)
-class RegistroEventoAdmin(admin.ModelAdmin):
+class RegistroEventoAdmin(ListadoEscalableMixin, admin.ModelAdmin):
     list_display = [
         'usuario', 
         'evento', 
@@ -70,12 +297,16 @@ class RegistroEventoAdmin(admin.ModelAdmin):
         'fecha_registro'
     ]
     list_filter = ['estado', 'fecha_registro', 'evento__tipo_evento']
+    list_select_related = ['usuario', 'evento']
     search_fields = [
-        'usuario__username', 
-        'usuario__email', 
+        '^usuario__username', 
+        '^usuario__email', 
         'evento__titulo'
     ]
+    search_help_text = 'Inicio del username o email del usuario, o palabras del título del evento'
+    autocomplete_fields = ['usuario', 'evento']
     ordering = ['-fecha_registro']
+    actions = [exportar_registros_csv, exportar_registros_xlsx]
     
     fieldsets = (
         ('Información del Registro', {
@@ -87,3 +318,18 @@ class RegistroEventoAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['fecha_registro']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            promover_plazas_liberadas([form])
+    
+    def get_search_results(self, request, queryset, search_term):
+        texto = search_term.strip()
+        if not texto:
+            return queryset, False
+        # Subconsultas por índice en lugar de JOIN + LIKE sobre todos los registros
+        return queryset.filter(
+            Q(usuario__in=self.usuarios_por_prefijo(texto))
+            | Q(evento__in=self.eventos_por_texto(texto))
+        ), False
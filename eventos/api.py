@@ -0,0 +1,137 @@
+"""API de lectura de eventos en JSON y NDJSON
+
+Las respuestas se generan en streaming a partir de ``.values().iterator()``,
+de modo que la memoria se mantiene constante aunque se exporten cientos de
+miles de eventos. Se aplican las mismas reglas de visibilidad y los mismos
+filtros (``search`` y ``tipo``) que en la lista HTML.
+
+Parámetros:
+
+* ``formato``: ``json`` (por defecto) o ``ndjson``. También se respeta
+  ``Accept: application/x-ndjson``.
+* ``search``, ``tipo``: como en la lista.
+* ``desde``, ``hasta``: eventos que transcurren en el rango, aunque empiecen
+  antes, como en la lista (fecha o fecha y hora ISO).
+* ``cuando``: ventana de fechas, ``proximos``, ``semana`` o ``ahora`` (en curso).
+* ``campos``: lista separada por comas de los campos a devolver.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .busqueda import obtener_buscador
+from .models import Evento
+from .parametros import ParametroInvalido, rango_fechas
+
+TAMANO_LOTE = 2000
+
+# Campo público -> expresión del ORM
+CAMPOS = {
+    'id': F('id'),
+    'titulo': F('titulo'),
+    'descripcion': F('descripcion'),
+    'tipo': F('tipo_evento__nombre'),
+    'tipo_id': F('tipo_evento_id'),
+    'fecha_inicio': F('fecha_inicio'),
+    'fecha_fin': F('fecha_fin'),
+    'ubicacion': F('ubicacion'),
+    'capacidad_maxima': F('capacidad_maxima'),
+    'plazas_disponibles': F('capacidad_maxima') - F('confirmados'),
+    'estado': F('estado'),
+    'privacidad': F('privacidad'),
+    'organizador': F('organizador__username'),
+    'precio': F('precio'),
+}
+CAMPOS_POR_DEFECTO = [
+    'id', 'titulo', 'tipo', 'fecha_inicio', 'fecha_fin',
+    'ubicacion', 'plazas_disponibles', 'precio',
+]
+
+
+def _campos_solicitados(valor):
+    if not valor:
+        return CAMPOS_POR_DEFECTO
+    campos = [campo.strip() for campo in valor.split(',') if campo.strip()]
+    desconocidos = [campo for campo in campos if campo not in CAMPOS]
+    if desconocidos:
+        raise ParametroInvalido(
+            f'Campos desconocidos: {", ".join(desconocidos)}. '
+            f'Disponibles: {", ".join(CAMPOS)}'
+        )
+    return campos
+
+
+def filtrar_eventos(request):
+    """Queryset de eventos visibles para el usuario con los filtros de la petición"""
+    queryset = Evento.objects.visible_para(request.user)
+
+    tipo = request.GET.get('tipo')
+    if tipo:
+        if not tipo.isdigit():
+            raise ParametroInvalido(f'Tipo no válido: {tipo}')
+        queryset = queryset.filter(tipo_evento_id=tipo)
+
+    cuando = request.GET.get('cuando')
+    if cuando:
+        if cuando not in dict(Evento.VENTANA_CHOICES):
+            raise ParametroInvalido(f'Ventana de fechas no válida: {cuando}')
+        queryset = queryset.en_ventana(cuando)
+
+    desde, hasta = rango_fechas(request.GET.get('desde'), request.GET.get('hasta'))
+    if desde or hasta:
+        queryset = queryset.en_rango(desde, hasta)
+
+    search = request.GET.get('search')
+    if search:
+        queryset = obtener_buscador().filtrar(queryset, search)
+
+    return queryset.order_by('-fecha_inicio', '-id')
+
+
+def _filas(queryset, campos):
+    # Alias con prefijo para no chocar con los nombres de los campos del modelo
+    expresiones = {f'api_{campo}': CAMPOS[campo] for campo in campos}
+    for fila in queryset.values(**expresiones).iterator(chunk_size=TAMANO_LOTE):
+        yield {campo: fila[f'api_{campo}'] for campo in campos}
+
+
+def _json(filas):
+    yield '['
+    separador = ''
+    for fila in filas:
+        yield separador + json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False)
+        separador = ','
+    yield ']\n'
+
+
+def _ndjson(filas):
+    for fila in filas:
+        yield json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+@require_GET
+def lista_eventos(request):
+    """Lista de eventos visibles en JSON o NDJSON (streaming)"""
+    formato = request.GET.get('formato')
+    if not formato:
+        aceptados = request.headers.get('Accept', '')
+        formato = 'ndjson' if 'application/x-ndjson' in aceptados else 'json'
+
+    try:
+        if formato not in ('json', 'ndjson'):
+            raise ParametroInvalido(f'Formato no válido: {formato}')
+        campos = _campos_solicitados(request.GET.get('campos'))
+        queryset = filtrar_eventos(request)
+    except ParametroInvalido as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    filas = _filas(queryset, campos)
+    if formato == 'ndjson':
+        response = StreamingHttpResponse(_ndjson(filas), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(_json(filas), content_type='application/json')
+    response['Vary'] = 'Accept, Cookie'
+    return response
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class EventosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'eventos'
+
+    def ready(self):
+        # Registrar señales que mantienen los datos desnormalizados
+        from . import signals  # noqa: F401
+        from .busqueda import instalar_buscador
+
+        # El índice de búsqueda se (re)instala después de cada migrate
+        post_migrate.connect(instalar_buscador, sender=self)
@@ -0,0 +1,80 @@
+"""Utilidades compartidas por los comandos de benchmark"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, override_settings
+
+
+@contextmanager
+def cronometro(latencias):
+    """Añade a ``latencias`` la duración (en segundos) del bloque"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        latencias.append(time.perf_counter() - inicio)
+
+
+def percentiles(latencias):
+    """Devuelve p50, p95 y p99 en milisegundos"""
+    if not latencias:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    if len(latencias) == 1:
+        valor = latencias[0] * 1000
+        return {'p50': valor, 'p95': valor, 'p99': valor}
+    cortes = statistics.quantiles(latencias, n=100, method='inclusive')
+    return {
+        'p50': cortes[49] * 1000,
+        'p95': cortes[94] * 1000,
+        'p99': cortes[98] * 1000,
+    }
+
+
+def formatear_resumen(nombre, latencias, duracion):
+    """Línea legible con throughput y percentiles de latencia"""
+    p = percentiles(latencias)
+    throughput = len(latencias) / duracion if duracion else 0.0
+    return (
+        f'{nombre}: {len(latencias)} ops en {duracion:.2f}s '
+        f'({throughput:.1f} ops/s) - '
+        f'p50={p["p50"]:.1f}ms p95={p["p95"]:.1f}ms p99={p["p99"]:.1f}ms'
+    )
+
+
+def cliente_de_pruebas(usuario=None):
+    """Client de pruebas con un host aceptado por ALLOWED_HOSTS
+
+    Las excepciones de las vistas se convierten en respuestas 500 en lugar de
+    propagarse, como ocurriría con un servidor real.
+    """
+    host = next(
+        (h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost'
+    )
+    cliente = Client(HTTP_HOST=host, raise_request_exception=False)
+    if usuario is not None:
+        cliente.force_login(usuario)
+    return cliente
+
+
+@contextmanager
+def cache_aislada(nombre):
+    """Caché local propia mientras dura el bloque
+
+    Los comandos que recorren las vistas con datos temporales (que luego se
+    descartan con un rollback) escribirían en la caché real respuestas,
+    fragmentos y permisos con esos datos; el rollback no los deshace. Con una
+    caché aparte del mismo tipo que la local se siguen midiendo sus efectos.
+    """
+    opciones = settings.CACHES.get('default', {}).get('OPTIONS', {})
+    with override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'aislada-{nombre}',
+        'OPTIONS': opciones,
+    }}):
+        try:
+            yield
+        finally:
+            cache.clear()
@@ -0,0 +1,200 @@
+"""Motores de búsqueda de texto para los eventos
+
+El motor se elige con el setting ``EVENTOS_BUSCADOR`` (ruta a la clase). Si no
+está definido se usa FTS5 en SQLite y la búsqueda ``icontains`` en el resto de
+bases de datos. Todos los motores exponen la misma interfaz:
+
+* ``filtrar(queryset, texto)``: todos los eventos que coinciden, sin ranking.
+* ``buscar(queryset, texto)``: los ``EVENTOS_BUSQUEDA_MAXIMO`` más relevantes,
+  con la anotación ``relevancia`` (menor = mejor).
+* ``instalar()``: crea las estructuras auxiliares (índices, triggers...).
+* ``reconstruir()``: regenera el índice completo.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import CharField, Q, TextField, Value, FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Concat, Lower, StrIndex
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from django.utils.module_loading import import_string
+
+PALABRA = re.compile(r'\w+', re.UNICODE)
+
+
+class BuscadorBasico:
+    """Búsqueda portable con ``icontains`` (sin índice, sin ranking)"""
+
+    campos = ('titulo', 'descripcion', 'ubicacion')
+
+    def filtrar(self, queryset, texto):
+        filtro = Q()
+        for campo in self.campos:
+            filtro |= Q(**{f'{campo}__icontains': texto})
+        return queryset.filter(filtro)
+
+    def buscar(self, queryset, texto):
+        # Sin ranking no hay un "más relevante" que acotar
+        return self.filtrar(queryset, texto).annotate(
+            relevancia=Value(0.0, output_field=FloatField())
+        )
+
+    def instalar(self):
+        pass
+
+    def reconstruir(self):
+        return 0
+
+
+class BuscadorSQLite(BuscadorBasico):
+    """Búsqueda con una tabla virtual FTS5 de contenido externo
+
+    La tabla se mantiene sincronizada con ``eventos_evento`` mediante triggers,
+    de modo que también cubre ``bulk_create`` y ``update`` masivos. El
+    tokenizador elimina tildes (``remove_diacritics 2``) y los prefijos de 2 y 3
+    caracteres están indexados para las búsquedas "mientras se escribe".
+    """
+
+    tabla = 'eventos_evento_fts'
+    tabla_eventos = 'eventos_evento'
+    # Peso de cada columna en el ranking bm25 (titulo, descripcion, ubicacion)
+    pesos = (10.0, 1.0, 2.0)
+
+    @property
+    def maximo(self):
+        """Cuántos resultados (los más relevantes) devuelve ``buscar``"""
+        return getattr(settings, 'EVENTOS_BUSQUEDA_MAXIMO', 200)
+
+    def construir_consulta(self, texto):
+        """Convierte el texto del usuario en una consulta FTS5 segura
+
+        Cada palabra se busca como prefijo y todas deben aparecer.
+        """
+        palabras = PALABRA.findall(texto)
+        return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+    def _coincidencias(self, consulta, maximo=None):
+        """SQL con los rowid que coinciden (los ``maximo`` mejores, en orden)"""
+        if maximo is None:
+            return f'SELECT rowid FROM {self.tabla} WHERE {self.tabla} MATCH %s', (consulta,)
+        pesos = ', '.join(str(peso) for peso in self.pesos)
+        return (
+            f'SELECT rowid FROM {self.tabla} WHERE {self.tabla} MATCH %s '
+            f'ORDER BY bm25({self.tabla}, {pesos}) LIMIT %s',
+            (consulta, maximo),
+        )
+
+    def filtrar(self, queryset, texto):
+        consulta = self.construir_consulta(texto)
+        if not consulta:
+            return super().filtrar(queryset, texto)
+        return queryset.filter(pk__in=RawSQL(*self._coincidencias(consulta)))
+
+    def buscar(self, queryset, texto):
+        """Los ``maximo`` eventos más relevantes; ``relevancia`` es su puesto
+
+        El MATCH y el bm25 se calculan una vez por consulta, no por fila: el
+        ranking se reduce a una cadena ``,id1,id2,...,`` (subconsulta escalar
+        sin correlación, que SQLite evalúa una sola vez) y la relevancia de
+        cada evento es la posición de su id en ella.
+        """
+        consulta = self.construir_consulta(texto)
+        if not consulta:
+            return super().buscar(queryset, texto)
+
+        sql, params = self._coincidencias(consulta, self.maximo)
+        # group_concat respeta el orden de la subconsulta
+        ranking = RawSQL(
+            f"SELECT ',' || group_concat(rowid, ',') || ',' FROM ({sql})",
+            params,
+            output_field=TextField(),
+        )
+        puesto = Concat(Value(','), Cast('pk', CharField()), Value(','))
+        return queryset.filter(pk__in=RawSQL(sql, params)).annotate(
+            relevancia=StrIndex(ranking, puesto)
+        )
+
+    def instalar(self):
+        """Crea la tabla FTS5 y los triggers si faltan
+
+        Las migraciones de SQLite que reconstruyen ``eventos_evento`` eliminan
+        los triggers, por eso se comprueban después de cada ``migrate``.
+        """
+        if self.tabla_eventos not in connection.introspection.table_names():
+            return
+        triggers = {f'{self.tabla}_ai', f'{self.tabla}_ad', f'{self.tabla}_au'}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = %s OR "
+                "(type = 'trigger' AND tbl_name = %s)",
+                [self.tabla, self.tabla_eventos]
+            )
+            existentes = {fila[0] for fila in cursor.fetchall()}
+            if self.tabla in existentes and triggers <= existentes:
+                return
+
+            columnas = 'titulo, descripcion, ubicacion'
+            nuevas = 'new.titulo, new.descripcion, new.ubicacion'
+            viejas = 'old.titulo, old.descripcion, old.ubicacion'
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.tabla} USING fts5("
+                f"{columnas}, content='{self.tabla_eventos}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.tabla}_ai AFTER INSERT ON {self.tabla_eventos} BEGIN "
+                f"INSERT INTO {self.tabla}(rowid, {columnas}) VALUES (new.id, {nuevas}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.tabla}_ad AFTER DELETE ON {self.tabla_eventos} BEGIN "
+                f"INSERT INTO {self.tabla}({self.tabla}, rowid, {columnas}) "
+                f"VALUES ('delete', old.id, {viejas}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.tabla}_au "
+                f"AFTER UPDATE OF {columnas} ON {self.tabla_eventos} BEGIN "
+                f"INSERT INTO {self.tabla}({self.tabla}, rowid, {columnas}) "
+                f"VALUES ('delete', old.id, {viejas}); "
+                f"INSERT INTO {self.tabla}(rowid, {columnas}) VALUES (new.id, {nuevas}); END"
+            )
+        # Los triggers faltaban: el índice puede estar desfasado
+        self.reconstruir()
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.tabla}({self.tabla}) VALUES ('rebuild')")
+            cursor.execute(f'SELECT COUNT(*) FROM {self.tabla_eventos}')
+            return cursor.fetchone()[0]
+
+
+def filtro_prefijo(campo, texto):
+    """Q que busca ``texto`` como prefijo de ``campo`` sin distinguir mayúsculas
+
+    Compara un rango sobre ``LOWER(campo)``, que aprovecha un índice de
+    expresión sobre ``Lower(campo)`` en cualquier base de datos (a diferencia
+    de ``istartswith``, que usa ``LIKE``). Los índices de username y email
+    están en la migración usuarios 0003.
+    """
+    texto = texto.lower()
+    return Q(
+        GreaterThanOrEqual(Lower(campo), texto),
+        LessThan(Lower(campo), texto + '\U0010ffff'),
+    )
+
+
+def obtener_buscador():
+    """Devuelve una instancia del motor de búsqueda configurado"""
+    ruta = getattr(settings, 'EVENTOS_BUSCADOR', None)
+    if ruta:
+        return import_string(ruta)()
+    if connection.vendor == 'sqlite':
+        return BuscadorSQLite()
+    return BuscadorBasico()
+
+
+def instalar_buscador(sender, using=None, **kwargs):
+    """Receptor de post_migrate que prepara el índice de búsqueda"""
+    if using and using != connection.alias:
+        return
+    obtener_buscador().instalar()
@@ -0,0 +1,180 @@
+"""Caché de respuestas completas para visitantes anónimos
+
+Los anónimos solo ven eventos públicos publicados, así que la lista y el
+detalle son idénticos para todos ellos. ``cache_anonima`` guarda la respuesta
+renderizada por URL (ruta + parámetros normalizados) y la sirve sin tocar el
+ORM. Cualquier cambio en eventos, tipos o registros incrementa la generación
+de la caché (ver ``eventos.signals``), lo que invalida todas las entradas.
+
+Para evitar estampidas, cuando una entrada falta solo una petición la
+recalcula; las demás esperan brevemente a que aparezca.
+"""
+import asyncio
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe, urlencode
+
+CLAVE_GENERACION = 'respuestas:generacion'
+TIEMPO_CACHE = 5 * 60
+TIEMPO_CANDADO = 30
+ESPERA_MAXIMA = 2.0
+INTERVALO_ESPERA = 0.05
+
+
+def generacion():
+    return cache.get_or_set(CLAVE_GENERACION, 1, None)
+
+
+def _incrementar_generacion():
+    try:
+        cache.incr(CLAVE_GENERACION)
+    except ValueError:
+        cache.set(CLAVE_GENERACION, 2, None)
+
+
+def invalidar_respuestas():
+    """Invalida todas las respuestas cacheadas
+
+    Se invalida ahora y otra vez al confirmar la transacción, para que una
+    petición concurrente no guarde datos previos al commit con la generación nueva.
+    """
+    _incrementar_generacion()
+    transaction.on_commit(_incrementar_generacion)
+
+
+def _clave(request):
+    parametros = urlencode(sorted(request.GET.lists()), doseq=True)
+    ruta = hashlib.md5(f'{request.path}?{parametros}'.encode()).hexdigest()
+    return f'respuestas:v{generacion()}:{ruta}'
+
+
+def _es_cacheable(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # Los mensajes pendientes se muestran en la página: no servir ni guardar esa versión
+    return not len(get_messages(request))
+
+
+def _construir_respuesta(request, entrada):
+    modificado = entrada.get('modificado')
+    response = get_conditional_response(
+        request,
+        etag=entrada['etag'],
+        last_modified=parse_http_date_safe(modificado) if modificado else None,
+    )
+    if response is None:
+        response = HttpResponse(entrada['contenido'], content_type=entrada['tipo'])
+    response['ETag'] = entrada['etag']
+    if modificado:
+        response['Last-Modified'] = modificado
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _guardar(clave, response):
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    # Solo respuestas 200 completas y sin cookies (p. ej. CSRF) son comunes a todos
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    # Se conservan los validadores de la vista (eventos.condicional) si los hay
+    entrada = {
+        'contenido': response.content,
+        'tipo': response['Content-Type'],
+        'etag': response.get('ETag') or '"%s"' % hashlib.md5(response.content).hexdigest(),
+        'modificado': response.get('Last-Modified'),
+    }
+    cache.set(clave, entrada, TIEMPO_CACHE)
+    return entrada
+
+
+def cache_anonima(vista):
+    """Decorador que cachea la respuesta de ``vista`` para visitantes anónimos"""
+    if iscoroutinefunction(vista):
+        return _cache_anonima_async(vista)
+
+    @wraps(vista)
+    def envoltorio(request, *args, **kwargs):
+        if not _es_cacheable(request):
+            response = vista(request, *args, **kwargs)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
+        clave = _clave(request)
+        entrada = cache.get(clave)
+        if entrada is None:
+            candado = f'{clave}:candado'
+            if cache.add(candado, 1, TIEMPO_CANDADO):
+                # Esta petición es la única que recalcula la entrada
+                try:
+                    response = vista(request, *args, **kwargs)
+                    entrada = _guardar(clave, response)
+                finally:
+                    cache.delete(candado)
+                if entrada is None:
+                    patch_vary_headers(response, ['Cookie'])
+                    return response
+            else:
+                limite = time.monotonic() + ESPERA_MAXIMA
+                while entrada is None and time.monotonic() < limite:
+                    time.sleep(INTERVALO_ESPERA)
+                    entrada = cache.get(clave)
+                if entrada is None:
+                    # Quien recalculaba tardó demasiado: responder sin caché
+                    response = vista(request, *args, **kwargs)
+                    patch_vary_headers(response, ['Cookie'])
+                    return response
+
+        return _construir_respuesta(request, entrada)
+
+    return envoltorio
+
+
+def _cache_anonima_async(vista):
+    """``cache_anonima`` para vistas async: mismo algoritmo, sin bloquear el bucle
+
+    Comprobar la sesión y renderizar pueden consultar la base de datos, así
+    que esos pasos se ejecutan con sync_to_async.
+    """
+
+    @wraps(vista)
+    async def envoltorio(request, *args, **kwargs):
+        if not await sync_to_async(_es_cacheable)(request):
+            response = await vista(request, *args, **kwargs)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
+        clave = _clave(request)
+        entrada = cache.get(clave)
+        if entrada is None:
+            candado = f'{clave}:candado'
+            if cache.add(candado, 1, TIEMPO_CANDADO):
+                try:
+                    response = await vista(request, *args, **kwargs)
+                    entrada = await sync_to_async(_guardar)(clave, response)
+                finally:
+                    cache.delete(candado)
+                if entrada is None:
+                    patch_vary_headers(response, ['Cookie'])
+                    return response
+            else:
+                limite = time.monotonic() + ESPERA_MAXIMA
+                while entrada is None and time.monotonic() < limite:
+                    await asyncio.sleep(INTERVALO_ESPERA)
+                    entrada = cache.get(clave)
+                if entrada is None:
+                    response = await vista(request, *args, **kwargs)
+                    patch_vary_headers(response, ['Cookie'])
+                    return response
+
+        return _construir_respuesta(request, entrada)
+
+    return envoltorio
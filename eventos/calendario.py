@@ -0,0 +1,244 @@
+"""Calendarios iCalendar (.ics) de eventos para suscribirse desde otras apps
+
+Hay cuatro calendarios: todos los eventos públicos, los de un tipo, los de un
+organizador y los eventos en los que un usuario tiene un registro confirmado.
+Las aplicaciones de calendario no inician sesión, así que los tres primeros
+muestran lo que vería un anónimo y el del usuario se identifica con un enlace
+firmado con su ``ClaveCalendario`` (``enlace_usuario``); renovar la clave
+revoca el enlace anterior.
+
+El calendario se genera en streaming: se recorren solo ``(id,
+fecha_actualizacion, tipo)`` de los eventos y cada bloque VEVENT se toma de la
+caché (clave por evento, ``fecha_actualizacion`` y nombre del tipo); solo los
+eventos que faltan se leen completos, por lotes. Los calendarios responden
+además a GET condicional con un agregado sobre los mismos eventos y los tipos
+(``eventos.condicional``).
+"""
+import hashlib
+from datetime import timezone as dt_timezone
+from itertools import islice
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import signing
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from usuarios.models import ClaveCalendario, generar_clave_calendario
+
+from . import condicional
+from .models import Evento, RegistroEvento, TipoEvento
+
+SALT_USUARIO = 'eventos.calendario.usuario'
+TAMANO_LOTE = 2000
+TIEMPO_CACHE = 7 * 24 * 60 * 60
+LARGO_LINEA = 75
+
+# Estado del evento -> STATUS de iCalendar
+ESTADOS = {
+    'publicado': 'CONFIRMED',
+    'finalizado': 'CONFIRMED',
+    'cancelado': 'CANCELLED',
+}
+
+
+def _firmante(clave):
+    return signing.Signer(salt=f'{SALT_USUARIO}:{clave}')
+
+
+def enlace_usuario(usuario):
+    """Ruta del calendario personal de ``usuario`` (firmada, sin sesión)"""
+    # Sin fecha en la firma: el enlace no caduca, solo se revoca al renovar la clave
+    clave = ClaveCalendario.objects.get_or_create(usuario=usuario)[0].clave
+    token = _firmante(clave).sign(str(usuario.pk))
+    return reverse('eventos:calendario_usuario', args=[token])
+
+
+def renovar_enlace_usuario(usuario):
+    """Cambia la clave del calendario de ``usuario``: el enlace anterior deja de valer"""
+    ClaveCalendario.objects.update_or_create(
+        usuario=usuario, defaults={'clave': generar_clave_calendario()}
+    )
+
+
+def _usuario_del_enlace(token):
+    usuario_id = token.partition(':')[0]
+    if usuario_id.isdigit():
+        clave = (
+            ClaveCalendario.objects.select_related('usuario')
+            .filter(usuario_id=usuario_id, usuario__is_active=True)
+            .first()
+        )
+        if clave is not None:
+            try:
+                _firmante(clave.clave).unsign(token)
+            except signing.BadSignature:
+                pass
+            else:
+                return clave.usuario
+    raise Http404('Calendario no encontrado')
+
+
+def _escapar(texto):
+    """Escapa un valor TEXT según RFC 5545"""
+    texto = str(texto).replace('\r\n', '\n').replace('\r', '\n')
+    return (
+        texto.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\n', '\\n')
+    )
+
+
+def _plegar(linea):
+    """Parte la línea en trozos de como mucho 75 octetos (RFC 5545, 3.1)"""
+    datos = linea.encode()
+    partes = []
+    inicio, limite = 0, LARGO_LINEA
+    while len(datos) - inicio > limite:
+        fin = inicio + limite
+        # No cortar en mitad de un carácter UTF-8
+        while datos[fin] & 0xC0 == 0x80:
+            fin -= 1
+        partes.append(datos[inicio:fin].decode())
+        # Las continuaciones empiezan con un espacio, que cuenta en el límite
+        inicio, limite = fin, LARGO_LINEA - 1
+    partes.append(datos[inicio:].decode())
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def _fecha(valor):
+    return valor.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def vevent(evento, sitio):
+    """Bloque VEVENT de un evento (con el tipo cargado); ``sitio`` es esquema y host"""
+    url = sitio + evento.get_absolute_url()
+    lineas = [
+        'BEGIN:VEVENT',
+        f'UID:evento-{evento.pk}@{sitio.split("://", 1)[-1]}',
+        f'DTSTAMP:{_fecha(evento.fecha_actualizacion)}',
+        f'LAST-MODIFIED:{_fecha(evento.fecha_actualizacion)}',
+        f'DTSTART:{_fecha(evento.fecha_inicio)}',
+        f'DTEND:{_fecha(evento.fecha_fin)}',
+        f'SUMMARY:{_escapar(evento.titulo)}',
+        f'DESCRIPTION:{_escapar(evento.descripcion)}',
+        f'LOCATION:{_escapar(evento.ubicacion)}',
+        f'CATEGORIES:{_escapar(evento.tipo_evento.nombre)}',
+        f'STATUS:{ESTADOS.get(evento.estado, "TENTATIVE")}',
+        f'URL:{url}',
+        'END:VEVENT',
+    ]
+    return ''.join(_plegar(linea) for linea in lineas)
+
+
+def _clave(sitio, pk, fecha_actualizacion, tipo):
+    # CATEGORIES muestra el nombre del tipo: renombrarlo cambia la clave
+    huella = hashlib.md5(tipo.encode()).hexdigest()
+    return f'ics:{sitio}:{pk}:{fecha_actualizacion.timestamp()}:{huella}'
+
+
+def _lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def _bloques(queryset, sitio):
+    """VEVENT de cada evento de ``queryset``: desde la caché o, si faltan, por lotes"""
+    filas = (
+        queryset.order_by('fecha_inicio', 'id')
+        .values_list('pk', 'fecha_actualizacion', 'tipo_evento__nombre')
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+    for lote in _lotes(filas, TAMANO_LOTE):
+        claves = {pk: _clave(sitio, pk, actualizacion, tipo) for pk, actualizacion, tipo in lote}
+        en_cache = cache.get_many(claves.values())
+        faltan = [pk for pk, clave in claves.items() if clave not in en_cache]
+        if faltan:
+            eventos = Evento.objects.select_related('tipo_evento').in_bulk(faltan)
+            nuevos = {}
+            for pk in faltan:
+                evento = eventos.get(pk)
+                # Puede haberse eliminado mientras se recorría la lista
+                if evento is not None:
+                    claves[pk] = _clave(
+                        sitio, pk, evento.fecha_actualizacion, evento.tipo_evento.nombre
+                    )
+                    nuevos[claves[pk]] = vevent(evento, sitio)
+            cache.set_many(nuevos, TIEMPO_CACHE)
+            en_cache.update(nuevos)
+        for clave in claves.values():
+            if clave in en_cache:
+                yield en_cache[clave]
+
+
+def _calendario(queryset, nombre, sitio):
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield 'PRODID:-//Plataforma de Eventos//ES\r\n'
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield _plegar(f'X-WR-CALNAME:{_escapar(nombre)}')
+    yield from _bloques(queryset, sitio)
+    yield 'END:VCALENDAR\r\n'
+
+
+def _responder(request, queryset, nombre):
+    sitio = request.build_absolute_uri('/').rstrip('/')
+    # Los datos no dependen de quién pide el calendario, solo de sus eventos y
+    # de los nombres de los tipos (CATEGORIES), que no cambian fecha_actualizacion:
+    # por eso no se envía Last-Modified
+    agregado = condicional.datos_lista(queryset)
+    validadores = condicional.validadores(
+        request,
+        AnonymousUser(),
+        [
+            agregado['ultima_modificacion'], agregado['total'], agregado['suma_ids'],
+            condicional.datos_tipos(TipoEvento.objects.all()), sitio, nombre,
+        ],
+    )
+    return condicional.responder(
+        request,
+        validadores,
+        lambda: StreamingHttpResponse(
+            _calendario(queryset, nombre, sitio), content_type='text/calendar; charset=utf-8'
+        ),
+    )
+
+
+def _publicos():
+    return Evento.objects.visible_para(AnonymousUser())
+
+
+@require_GET
+def calendario(request):
+    """Todos los eventos públicos publicados"""
+    return _responder(request, _publicos(), 'Eventos')
+
+
+@require_GET
+def calendario_tipo(request, tipo_id):
+    tipo = get_object_or_404(TipoEvento, pk=tipo_id)
+    return _responder(request, _publicos().filter(tipo_evento=tipo), f'Eventos: {tipo.nombre}')
+
+
+@require_GET
+def calendario_organizador(request, organizador_id):
+    organizador = get_object_or_404(User, pk=organizador_id)
+    return _responder(
+        request,
+        _publicos().filter(organizador=organizador),
+        f'Eventos de {organizador.username}',
+    )
+
+
+@require_GET
+def calendario_usuario(request, token):
+    """Eventos en los que el usuario del enlace tiene un registro confirmado"""
+    usuario = _usuario_del_enlace(token)
+    # Se parte de los registros del usuario (índice usuario, evento), no de todos los eventos
+    registros = RegistroEvento.objects.filter(usuario=usuario, estado='confirmado')
+    eventos = Evento.objects.filter(pk__in=registros.values('evento_id'), estado__in=ESTADOS)
+    return _responder(request, eventos, f'Mis eventos ({usuario.username})')
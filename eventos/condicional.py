@@ -0,0 +1,166 @@
+"""GET condicional (ETag / Last-Modified) para la lista y el detalle
+
+Los validadores salen de los mismos datos que la vista ya necesita: la fila
+de ``Evento.objects.para_detalle`` en el detalle (con su tipo y organizador) y,
+en la lista, un único agregado (``MAX(fecha_actualizacion)``, número y suma de
+ids y de plazas confirmadas de los eventos) más los tipos del desplegable y los
+nombres de los organizadores. El agregado se calcula sobre las filas de la
+página con paginación por cursor, o sobre toda la lista con paginación
+numerada, que reutiliza ese número como total. Si el cliente ya tiene esa
+versión se responde 304 sin renderizar la plantilla.
+
+Las plazas confirmadas no renuevan ``fecha_actualizacion`` sino
+``fecha_plazas``: ``Last-Modified`` es la más reciente de las dos (el máximo de
+cada una en la lista). Para usuarios autenticados el ETag incluye además lo que
+la página muestra de ellos (usuario, permisos, token CSRF); ``Last-Modified``
+solo se envía a los anónimos, porque esos datos del usuario no tienen fecha de
+modificación. Los clientes que envían ``If-None-Match`` validan por ETag, que
+además cubre los eventos que salen de la lista y los cambios de nombre de tipos
+y organizadores.
+"""
+import hashlib
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+Validadores = namedtuple('Validadores', ['etag', 'ultima_modificacion'])
+
+
+def validadores(request, usuario, datos, ultima_modificacion=None):
+    """Validadores de la página que muestra ``datos`` a ``usuario``
+
+    Devuelve None si la respuesta no debe validarse: métodos distintos de
+    GET/HEAD o mensajes pendientes (se muestran una sola vez en la página).
+    """
+    if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+        return None
+    partes = [*datos]
+    if usuario.is_authenticated:
+        partes += [
+            usuario.pk,
+            usuario.get_username(),
+            usuario.is_staff,
+            sorted(usuario.get_all_permissions()),
+            request.META.get('CSRF_COOKIE', ''),
+        ]
+        ultima_modificacion = None
+    etag = 'W/"%s"' % hashlib.md5(repr(partes).encode()).hexdigest()
+    return Validadores(etag, ultima_modificacion)
+
+
+# Los mensajes y los permisos pueden consultar la sesión o la base de datos
+avalidadores = sync_to_async(validadores)
+
+
+def _agregado_lista(queryset):
+    # Una consulta sobre una página ya recortada no se puede reordenar
+    if not queryset.query.is_sliced:
+        queryset = queryset.order_by()
+    return queryset, {
+        'ultima_modificacion': Max('fecha_actualizacion'),
+        'total': Count('pk'),
+        # Cambia si un evento entra o sale aunque no cambie el máximo ni el total
+        'suma_ids': Sum('pk'),
+        # Las plazas no renuevan fecha_actualizacion
+        'confirmados': Sum('confirmados'),
+        'ultima_plaza': Max('fecha_plazas'),
+    }
+
+
+def datos_lista(queryset):
+    """Agregado de una sola consulta que cambia con cualquier evento de ``queryset``
+
+    ``queryset`` puede ser la lista completa o solo las filas de la página.
+    """
+    queryset, agregados = _agregado_lista(queryset)
+    return queryset.aggregate(**agregados)
+
+
+async def adatos_lista(queryset):
+    """Versión async de ``datos_lista``"""
+    queryset, agregados = _agregado_lista(queryset)
+    return await queryset.aaggregate(**agregados)
+
+
+def _organizadores(queryset):
+    # Una página ya recortada se usa tal cual como subconsulta
+    if not queryset.query.is_sliced:
+        queryset = queryset.order_by()
+    return (
+        User.objects
+        .filter(pk__in=queryset.values('organizador_id'))
+        .order_by('pk')
+        .values_list('pk', 'username')
+    )
+
+
+def organizadores_lista(queryset):
+    """Nombres de los organizadores de ``queryset``, que se muestran en las tarjetas"""
+    return list(_organizadores(queryset))
+
+
+async def aorganizadores_lista(queryset):
+    """Versión async de ``organizadores_lista``"""
+    return [fila async for fila in _organizadores(queryset)]
+
+
+def datos_tipos(tipos):
+    """Huella de los tipos del desplegable (y de las tarjetas) de la lista"""
+    return [(tipo.pk, tipo.nombre) for tipo in tipos]
+
+
+def modificacion_lista(agregado):
+    """Last-Modified de la lista: la última edición o variación de plazas"""
+    fechas = [agregado['ultima_modificacion'], agregado['ultima_plaza']]
+    return max((fecha for fecha in fechas if fecha), default=None)
+
+
+def modificacion_detalle(evento):
+    """Last-Modified del detalle: la última edición o variación de plazas"""
+    return max(evento.fecha_actualizacion, evento.fecha_plazas)
+
+
+def datos_detalle(evento):
+    """Datos de un evento anotado con ``para_detalle`` que muestra su página"""
+    return (
+        evento.pk, evento.fecha_actualizacion, evento.confirmados, evento.estado_registro,
+        evento.tipo_evento.nombre, evento.organizador.username,
+    )
+
+
+def _marca_de_tiempo(validadores):
+    if validadores.ultima_modificacion:
+        return int(validadores.ultima_modificacion.timestamp())
+    return None
+
+
+def no_modificado(request, validadores):
+    """Respuesta 304 si el cliente tiene la versión actual; None si hay que renderizar"""
+    if validadores is None:
+        return None
+    response = get_conditional_response(
+        request, etag=validadores.etag, last_modified=_marca_de_tiempo(validadores)
+    )
+    return con_validadores(response, validadores) if response is not None else None
+
+
+def con_validadores(response, validadores):
+    """Añade ``ETag`` y ``Last-Modified`` a una respuesta 200 o 304"""
+    if validadores is not None and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', validadores.etag)
+        if marca := _marca_de_tiempo(validadores):
+            response.headers.setdefault('Last-Modified', http_date(marca))
+    return response
+
+
+def responder(request, validadores, renderizar):
+    """304 antes de renderizar si es posible; si no, ``renderizar()`` con validadores"""
+    response = no_modificado(request, validadores)
+    if response is None:
+        response = con_validadores(renderizar(), validadores)
+    return response
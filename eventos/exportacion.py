@@ -0,0 +1,114 @@
+"""Exportación de registros de eventos a CSV y XLSX
+
+Las filas se leen con un iterador del lado del servidor (``values_list`` con
+los JOIN de usuario y evento, sin instanciar modelos) y se escriben a medida
+que llegan: el CSV se envía en streaming y el XLSX se genera con openpyxl en
+modo ``write_only`` sobre un fichero temporal. Ninguno de los dos carga el
+queryset completo en memoria.
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import RegistroEvento
+
+TAMANO_LOTE = 5000
+
+COLUMNAS = [
+    ('Usuario', 'usuario__username'),
+    ('Email', 'usuario__email'),
+    ('Evento', 'evento__titulo'),
+    ('Estado', 'estado'),
+    ('Fecha de registro', 'fecha_registro'),
+    ('Comentarios', 'comentarios'),
+]
+
+INDICE_FECHA = [campo for _, campo in COLUMNAS].index('fecha_registro')
+
+ESTADOS = dict(RegistroEvento.ESTADO_CHOICES)
+
+# Caracteres con los que Excel y otras hojas de cálculo interpretan una celda
+# como fórmula (inyección de fórmulas en CSV/XLSX)
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+try:
+    import openpyxl
+except ImportError:  # dependencia opcional, solo para XLSX
+    openpyxl = None
+
+
+def xlsx_disponible():
+    return openpyxl is not None
+
+
+def neutralizar(valor):
+    """Antepone un apóstrofo a los textos que se ejecutarían como fórmula"""
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def filas_registros(queryset):
+    """Genera las filas de la exportación listas para escribir"""
+    campos = [campo for _, campo in COLUMNAS]
+    indice_estado = campos.index('estado')
+    filas = (
+        queryset
+        .order_by('evento_id', 'fecha_registro', 'pk')
+        .values_list(*campos)
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+    for fila in filas:
+        # Usuario, email, título y comentarios los escriben los usuarios
+        fila = [neutralizar(valor) for valor in fila]
+        fila[indice_estado] = ESTADOS.get(fila[indice_estado], fila[indice_estado])
+        # Hora local sin zona horaria (Excel no admite fechas con tzinfo)
+        fila[INDICE_FECHA] = timezone.localtime(fila[INDICE_FECHA]).replace(tzinfo=None)
+        yield fila
+
+
+class _Eco:
+    """Pseudo-buffer que devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def respuesta_csv(queryset, nombre):
+    escritor = csv.writer(_Eco())
+
+    def contenido():
+        # BOM para que Excel detecte UTF-8 (tildes y eñes)
+        yield '\ufeff'
+        yield escritor.writerow([titulo for titulo, _ in COLUMNAS])
+        for fila in filas_registros(queryset):
+            fila[INDICE_FECHA] = fila[INDICE_FECHA].strftime('%Y-%m-%d %H:%M:%S')
+            yield escritor.writerow(fila)
+
+    response = StreamingHttpResponse(contenido(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.csv"'
+    return response
+
+
+def respuesta_xlsx(queryset, nombre):
+    if openpyxl is None:
+        raise RuntimeError('La exportación a XLSX requiere el paquete openpyxl')
+
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('Registros')
+    hoja.append([titulo for titulo, _ in COLUMNAS])
+    for fila in filas_registros(queryset):
+        hoja.append(fila)
+
+    # El XLSX es un zip: se escribe en disco y se envía por partes
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f'{nombre}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
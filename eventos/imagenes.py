@@ -0,0 +1,131 @@
+"""Variantes redimensionadas de ``Evento.imagen`` para ``srcset``
+
+Cada imagen subida se convierte en varias versiones más pequeñas (WebP y JPEG
+a distintos anchos). Los nombres llevan el hash del contenido original, así que
+volver a procesar la misma imagen no duplica ficheros y las URLs se pueden
+cachear indefinidamente. El procesamiento se hace en un pool de hilos después
+del commit, nunca en el hilo de la petición; Pillow libera el GIL al
+redimensionar y comprimir.
+
+El resultado se guarda en ``Evento.imagen_variantes``::
+
+    {'origen': 'eventos/foto.jpg',
+     'variantes': {'webp': [[320, 'eventos/variantes/<hash>-320.webp'], ...],
+                   'jpeg': [[320, 'eventos/variantes/<hash>-320.jpg'], ...]}}
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import invalidar_respuestas
+
+logger = logging.getLogger(__name__)
+
+ANCHOS = (320, 640, 1024)
+# formato -> (formato de Pillow, extensión, opciones de guardado)
+FORMATOS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DIRECTORIO = 'eventos/variantes'
+
+_pool = None
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'EVENTOS_IMAGENES_HILOS', 2),
+            thread_name_prefix='imagenes',
+        )
+    return _pool
+
+
+def generar_variantes(nombre, storage=default_storage):
+    """Crea las variantes de la imagen ``nombre`` y devuelve su descripción"""
+    with storage.open(nombre, 'rb') as archivo:
+        contenido = archivo.read()
+    huella = hashlib.sha256(contenido).hexdigest()[:16]
+
+    original = ImageOps.exif_transpose(Image.open(BytesIO(contenido)))
+    original = original.convert('RGB')
+    # No ampliar: solo anchos menores que el original (al menos el más pequeño)
+    anchos = [ancho for ancho in ANCHOS if ancho < original.width] or [ANCHOS[0]]
+
+    variantes = {formato: [] for formato in FORMATOS}
+    for ancho in anchos:
+        copia = original.copy()
+        copia.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+        for formato, (formato_pil, extension, opciones) in FORMATOS.items():
+            ruta = f'{DIRECTORIO}/{huella}-{ancho}.{extension}'
+            if not storage.exists(ruta):
+                salida = BytesIO()
+                copia.save(salida, formato_pil, **opciones)
+                ruta = storage.save(ruta, ContentFile(salida.getvalue()))
+            variantes[formato].append([copia.width, ruta])
+    return {'origen': nombre, 'variantes': variantes}
+
+
+def procesar_imagen(evento_id):
+    """Genera y guarda las variantes de la imagen actual de un evento"""
+    from .models import Evento
+
+    nombre = Evento.objects.filter(pk=evento_id).values_list('imagen', flat=True).first()
+    if not nombre:
+        return False
+    datos = generar_variantes(nombre)
+    # Solo si la imagen no cambió mientras se procesaba. Se actualiza
+    # fecha_actualizacion para renovar la clave de la tarjeta en caché
+    actualizados = Evento.objects.filter(pk=evento_id, imagen=nombre).update(
+        imagen_variantes=datos, fecha_actualizacion=timezone.now()
+    )
+    if actualizados:
+        invalidar_respuestas()
+    return bool(actualizados)
+
+
+def procesar_en_hilo(evento_id):
+    """``procesar_imagen`` para hilos trabajadores: cierra su conexión al terminar"""
+    try:
+        return procesar_imagen(evento_id)
+    finally:
+        connections.close_all()
+
+
+def encolar(evento_id):
+    """Programa el procesamiento de la imagen para después del commit"""
+    def enviar():
+        futuro = _obtener_pool().submit(procesar_en_hilo, evento_id)
+        futuro.add_done_callback(_registrar_error)
+
+    transaction.on_commit(enviar)
+
+
+def _registrar_error(futuro):
+    error = futuro.exception()
+    if error is not None:
+        logger.error('Error al procesar la imagen de un evento', exc_info=error)
+
+
+def necesita_variantes(evento):
+    """True si el evento tiene imagen y sus variantes no corresponden a ella"""
+    return bool(evento.imagen) and (evento.imagen_variantes or {}).get('origen') != evento.imagen.name
+
+
+def srcset(evento, formato):
+    """Valor del atributo ``srcset`` para un formato ('' si no hay variantes)"""
+    if not evento.imagen or necesita_variantes(evento):
+        return ''
+    variantes = evento.imagen_variantes.get('variantes', {}).get(formato, [])
+    return ', '.join(
+        f'{default_storage.url(ruta)} {ancho}w' for ancho, ruta in variantes
+    )
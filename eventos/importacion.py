@@ -0,0 +1,169 @@
+"""Importación masiva de tipos, eventos y registros desde CSV o JSONL
+
+La lectura y la validación de los valores (fechas, números, opciones) no
+necesitan la base de datos, así que se hacen por lotes en procesos
+trabajadores. El proceso principal resuelve las claves foráneas con mapas
+precargados en memoria (nombre de tipo, username, id de evento) y escribe cada
+lote con un ``bulk_create`` dentro de su propia transacción.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField
+from django.utils import timezone
+
+from .models import Evento, RegistroEvento, TipoEvento
+
+
+@dataclass(frozen=True)
+class Especificacion:
+    """Cómo convertir una fila del fichero en una instancia del modelo"""
+    modelo: type
+    campos: tuple
+    # Columna del fichero -> campo FK del modelo
+    relaciones: dict = field(default_factory=dict)
+    # Campos que identifican una fila existente (update_conflicts)
+    unicos: tuple = ()
+
+
+# BooleanField.clean no acepta las minúsculas habituales en CSV ("true")
+BOOLEANOS = {'true': True, 'false': False}
+
+
+ESPECIFICACIONES = {
+    'tipos': Especificacion(
+        modelo=TipoEvento,
+        campos=('nombre', 'descripcion'),
+        unicos=('nombre',),
+    ),
+    'eventos': Especificacion(
+        modelo=Evento,
+        campos=(
+            'id', 'titulo', 'descripcion', 'fecha_inicio', 'fecha_fin', 'ubicacion',
+            'capacidad_maxima', 'lista_espera', 'estado', 'privacidad', 'precio',
+        ),
+        relaciones={'tipo': 'tipo_evento', 'organizador': 'organizador'},
+        unicos=('id',),
+    ),
+    'registros': Especificacion(
+        modelo=RegistroEvento,
+        campos=('estado', 'comentarios'),
+        relaciones={'usuario': 'usuario', 'evento': 'evento'},
+        unicos=('usuario', 'evento'),
+    ),
+}
+
+
+def leer_filas(ruta, formato=None):
+    """Genera (número de línea, fila) de un fichero CSV o JSONL"""
+    formato = formato or ('jsonl' if ruta.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+        if formato == 'csv':
+            # La cabecera es la línea 1
+            for numero, fila in enumerate(csv.DictReader(archivo), start=2):
+                yield numero, fila
+            return
+        for numero, linea in enumerate(archivo, start=1):
+            if linea.strip():
+                yield numero, json.loads(linea)
+
+
+def lotes(filas, tamano):
+    """Agrupa un iterable en listas de ``tamano`` elementos"""
+    filas = iter(filas)
+    while lote := list(islice(filas, tamano)):
+        yield lote
+
+
+def validar_lote(tipo, lote):
+    """Valida y convierte un lote de filas; devuelve (válidas, errores)
+
+    No consulta la base de datos: las relaciones se devuelven sin resolver.
+    """
+    especificacion = ESPECIFICACIONES[tipo]
+    opciones = especificacion.modelo._meta
+    validas, errores = [], []
+
+    for numero, fila in lote:
+        datos, problemas = {}, []
+        for nombre in especificacion.campos:
+            campo = opciones.get_field(nombre)
+            valor = fila.get(nombre)
+            if valor in (None, ''):
+                if campo.primary_key or campo.has_default():
+                    continue
+                if campo.blank:
+                    datos[nombre] = ''
+                    continue
+            if isinstance(campo, BooleanField) and isinstance(valor, str):
+                valor = BOOLEANOS.get(valor.strip().lower(), valor)
+            try:
+                valor = campo.clean(valor, None)
+            except ValidationError as error:
+                problemas.append(f'{nombre}: {" ".join(error.messages)}')
+                continue
+            if hasattr(valor, 'tzinfo') and timezone.is_naive(valor):
+                valor = timezone.make_aware(valor)
+            datos[nombre] = valor
+
+        for columna in especificacion.relaciones:
+            valor = str(fila.get(columna) or '').strip()
+            if not valor:
+                problemas.append(f'{columna}: Este campo es obligatorio.')
+            datos[columna] = valor
+
+        if (datos.get('fecha_inicio') and datos.get('fecha_fin')
+                and datos['fecha_fin'] <= datos['fecha_inicio']):
+            problemas.append('fecha_fin: debe ser posterior a la fecha de inicio')
+
+        if problemas:
+            errores.append((numero, '; '.join(problemas)))
+        else:
+            validas.append((numero, datos))
+    return validas, errores
+
+
+def validar_lote_en_proceso(argumentos):
+    """Punto de entrada de los procesos trabajadores (compatible con spawn)"""
+    import django
+    django.setup()
+    return validar_lote(*argumentos)
+
+
+def cargar_mapas(tipo):
+    """Mapas en memoria para resolver las columnas de relación de ``tipo``"""
+    mapas = {}
+    relaciones = ESPECIFICACIONES[tipo].relaciones
+    if 'tipo' in relaciones:
+        mapas['tipo'] = dict(TipoEvento.objects.values_list('nombre', 'pk'))
+    if 'organizador' in relaciones or 'usuario' in relaciones:
+        usuarios = dict(User.objects.values_list('username', 'pk').iterator(chunk_size=10000))
+        mapas['organizador'] = mapas['usuario'] = usuarios
+    if 'evento' in relaciones:
+        mapas['evento'] = {
+            str(pk): pk
+            for pk in Evento.objects.values_list('pk', flat=True).iterator(chunk_size=10000)
+        }
+    return mapas
+
+
+def construir_instancias(tipo, validas, mapas):
+    """Resuelve las relaciones y crea las instancias; devuelve (objetos, errores)"""
+    especificacion = ESPECIFICACIONES[tipo]
+    objetos, errores = [], []
+    for numero, datos in validas:
+        desconocidas = []
+        for columna, campo in especificacion.relaciones.items():
+            pk = mapas[columna].get(datos.pop(columna))
+            if pk is None:
+                desconocidas.append(columna)
+            datos[f'{campo}_id'] = pk
+        if desconocidas:
+            errores.append((numero, f'{", ".join(desconocidas)}: no existe'))
+            continue
+        objetos.append(especificacion.modelo(**datos))
+    return objetos, errores
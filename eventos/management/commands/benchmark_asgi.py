@@ -0,0 +1,156 @@
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from eventos.benchmarks import formatear_resumen
+
+# servidor -> (módulo que debe estar instalado, comando, vistas async)
+SERVIDORES = {
+    'wsgi': (None, ['manage.py', 'runserver', '--noreload', '127.0.0.1:{puerto}'], False),
+    'uvicorn': ('uvicorn', ['-m', 'uvicorn', 'event_platform.asgi:application',
+                            '--port', '{puerto}', '--log-level', 'warning'], True),
+    'daphne': ('daphne', ['-m', 'daphne', '-p', '{puerto}', 'event_platform.asgi:application'], True),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Comparar la capacidad de peticiones concurrentes de las vistas async bajo '
+        'uvicorn o daphne con las vistas síncronas bajo WSGI'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servidor', action='append', dest='servidores',
+                            choices=sorted(SERVIDORES),
+                            help='Servidor a medir (se puede repetir; por defecto wsgi y uvicorn)')
+        parser.add_argument('--concurrencia', type=int, nargs='+', default=[1, 10, 50],
+                            help='Clientes simultáneos (por defecto 1 10 50)')
+        parser.add_argument('--peticiones', type=int, default=200,
+                            help='Peticiones por nivel de concurrencia (por defecto 200)')
+        parser.add_argument('--ruta', action='append', dest='rutas',
+                            help='Ruta a pedir (se puede repetir; por defecto /eventos/)')
+        parser.add_argument('--usuario',
+                            help='Username con el que autenticarse (sin él la lista '
+                                 'anónima sale de la caché de respuestas)')
+        parser.add_argument('--puerto', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        servidores = options['servidores'] or ['wsgi', 'uvicorn']
+        for nombre in servidores:
+            modulo = SERVIDORES[nombre][0]
+            # Dependencias opcionales: solo se comprueban, no se importan aquí
+            if modulo and importlib.util.find_spec(modulo) is None:
+                raise CommandError(f'{nombre} no está instalado (pip install {modulo})')
+
+        rutas = options['rutas'] or ['/eventos/']
+        cabeceras = {}
+        sesion = None
+        if options['usuario']:
+            sesion = self._crear_sesion(options['usuario'])
+            cabeceras['Cookie'] = f'{settings.SESSION_COOKIE_NAME}={sesion.session_key}'
+
+        try:
+            for nombre in servidores:
+                with self._servidor(nombre, options['puerto']) as base:
+                    urls = [base + ruta for ruta in rutas]
+                    for concurrencia in options['concurrencia']:
+                        latencias, errores, duracion = self._carga(
+                            urls, cabeceras, concurrencia, options['peticiones']
+                        )
+                        linea = formatear_resumen(
+                            f'{nombre} x{concurrencia}', latencias, duracion
+                        )
+                        if errores:
+                            linea += f' ({errores} errores)'
+                        self.stdout.write(linea)
+        finally:
+            if sesion is not None:
+                sesion.delete()
+
+    def _crear_sesion(self, username):
+        try:
+            usuario = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'No existe el usuario {username}')
+        sesion = SessionStore()
+        sesion[SESSION_KEY] = str(usuario.pk)
+        sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sesion.create()
+        return sesion
+
+    def _servidor(self, nombre, puerto):
+        _, argumentos, vistas_async = SERVIDORES[nombre]
+        entorno = {**os.environ, 'EVENTOS_VISTAS_ASYNC': '1' if vistas_async else '0'}
+        comando = [sys.executable] + [a.format(puerto=puerto) for a in argumentos]
+        return _Servidor(comando, entorno, puerto, str(settings.BASE_DIR))
+
+    @staticmethod
+    def _carga(urls, cabeceras, concurrencia, total):
+        def pedir(i):
+            peticion = urllib.request.Request(urls[i % len(urls)], headers=cabeceras)
+            inicio = time.perf_counter()
+            try:
+                with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+                    respuesta.read()
+                    ok = respuesta.status < 500
+            except urllib.error.HTTPError as error:
+                # Los 4xx son respuestas válidas (p. ej. 404 de un evento privado)
+                ok = error.code < 500
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - inicio, ok
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            resultados = list(pool.map(pedir, range(total)))
+        duracion = time.perf_counter() - inicio
+        latencias = [latencia for latencia, ok in resultados if ok]
+        return latencias, total - len(latencias), duracion
+
+
+class _Servidor:
+    """Lanza el servidor en un subproceso y espera a que acepte conexiones"""
+
+    def __init__(self, comando, entorno, puerto, directorio):
+        self.comando = comando
+        self.entorno = entorno
+        self.puerto = puerto
+        self.directorio = directorio
+        self.proceso = None
+
+    def __enter__(self):
+        self.proceso = subprocess.Popen(
+            self.comando, env=self.entorno, cwd=self.directorio,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if self.proceso.poll() is not None:
+                raise CommandError(f'El servidor terminó al arrancar: {" ".join(self.comando)}')
+            try:
+                socket.create_connection(('127.0.0.1', self.puerto), timeout=0.5).close()
+                return f'http://127.0.0.1:{self.puerto}'
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise CommandError(f'El servidor no respondió en el puerto {self.puerto}')
+
+    def __exit__(self, *excepcion):
+        self.proceso.terminate()
+        try:
+            self.proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proceso.kill()
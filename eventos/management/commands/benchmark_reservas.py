@@ -0,0 +1,139 @@
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from eventos import reservas
+from eventos.benchmarks import formatear_resumen
+from eventos.models import Evento, RegistroEvento, TipoEvento
+
+PREFIJO_USUARIO = 'bench_reserva_'
+
+
+def _reservar_lote(evento_id, usuario_ids):
+    """Reserva una plaza para cada usuario y devuelve (resultados, latencias)"""
+    evento = Evento.objects.get(pk=evento_id)
+    resultados, latencias = [], []
+    try:
+        for usuario_id in usuario_ids:
+            inicio = time.perf_counter()
+            resultados.append(reservas.reservar_plaza(evento, User(pk=usuario_id)))
+            latencias.append(time.perf_counter() - inicio)
+    finally:
+        connections.close_all()
+    return resultados, latencias
+
+
+def _reservar_lote_en_proceso(argumentos):
+    """Punto de entrada de los procesos hijo (compatible con spawn)"""
+    import django
+    django.setup()
+    return _reservar_lote(*argumentos)
+
+
+class Command(BaseCommand):
+    help = 'Prueba de estrés de reservas concurrentes sobre un único evento (sin sobreventa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=400,
+                            help='Usuarios que intentan reservar (por defecto 400)')
+        parser.add_argument('--capacidad', type=int, default=100,
+                            help='Capacidad del evento (por defecto 100)')
+        parser.add_argument('--hilos', type=int, default=16,
+                            help='Hilos concurrentes (por defecto 16)')
+        parser.add_argument('--procesos', type=int, default=4,
+                            help='Procesos concurrentes (por defecto 4)')
+        parser.add_argument('--modo', choices=['hilos', 'procesos', 'ambos'],
+                            default='ambos')
+        parser.add_argument('--conservar', action='store_true',
+                            help='No borrar el evento ni los usuarios generados')
+
+    def handle(self, *args, **options):
+        usuario_ids = self._crear_usuarios(options['usuarios'])
+        modos = ['hilos', 'procesos'] if options['modo'] == 'ambos' else [options['modo']]
+
+        try:
+            for modo in modos:
+                evento = self._crear_evento(options['capacidad'])
+                lotes = self._repartir(
+                    usuario_ids, options['hilos'] if modo == 'hilos' else options['procesos']
+                )
+
+                # Cerrar conexiones antes de abrir hilos o hacer fork
+                connections.close_all()
+                inicio = time.perf_counter()
+                if modo == 'hilos':
+                    with ThreadPoolExecutor(max_workers=len(lotes)) as pool:
+                        partes = list(pool.map(lambda lote: _reservar_lote(evento.pk, lote), lotes))
+                else:
+                    with multiprocessing.Pool(len(lotes)) as pool:
+                        partes = pool.map(
+                            _reservar_lote_en_proceso, [(evento.pk, lote) for lote in lotes]
+                        )
+                duracion = time.perf_counter() - inicio
+
+                resultados = [r for parte, _ in partes for r in parte]
+                latencias = [l for _, parte in partes for l in parte]
+                self._verificar(evento, resultados)
+                self.stdout.write(formatear_resumen(f'Reservas ({modo})', latencias, duracion))
+                if not options['conservar']:
+                    evento.delete()
+        finally:
+            if not options['conservar']:
+                User.objects.filter(pk__in=usuario_ids).delete()
+
+        self.stdout.write(self.style.SUCCESS('Sin sobreventa en ninguna ejecución'))
+
+    def _crear_usuarios(self, total):
+        User.objects.filter(username__startswith=PREFIJO_USUARIO).delete()
+        User.objects.bulk_create([
+            User(username=f'{PREFIJO_USUARIO}{i}') for i in range(total)
+        ])
+        return list(
+            User.objects.filter(username__startswith=PREFIJO_USUARIO)
+            .values_list('pk', flat=True)
+        )
+
+    def _crear_evento(self, capacidad):
+        tipo, _ = TipoEvento.objects.get_or_create(nombre='Conferencia')
+        organizador = User.objects.filter(username__startswith=PREFIJO_USUARIO).first()
+        inicio = timezone.now() + timedelta(days=1)
+        return Evento.objects.create(
+            titulo='Benchmark de reservas',
+            descripcion='Evento generado por benchmark_reservas',
+            tipo_evento=tipo,
+            fecha_inicio=inicio,
+            fecha_fin=inicio + timedelta(hours=2),
+            ubicacion='Benchmark',
+            capacidad_maxima=capacidad,
+            estado='publicado',
+            organizador=organizador,
+        )
+
+    @staticmethod
+    def _repartir(elementos, partes):
+        partes = max(1, min(partes, len(elementos)))
+        return [elementos[i::partes] for i in range(partes)]
+
+    def _verificar(self, evento, resultados):
+        evento.refresh_from_db()
+        reales = RegistroEvento.objects.filter(evento=evento, estado='confirmado').count()
+        exitos = resultados.count(reservas.CONFIRMADO)
+        esperados = min(evento.capacidad_maxima, len(resultados))
+
+        self.stdout.write(
+            f'Confirmados: {reales}/{evento.capacidad_maxima} '
+            f'(contador={evento.confirmados}, agotados={resultados.count(reservas.AGOTADO)})'
+        )
+        if reales > evento.capacidad_maxima:
+            raise CommandError(f'Sobreventa: {reales} confirmados para {evento.capacidad_maxima} plazas')
+        if not (reales == evento.confirmados == exitos == esperados):
+            raise CommandError(
+                f'Resultado inconsistente: registros={reales}, contador={evento.confirmados}, '
+                f'reservas confirmadas={exitos}, esperadas={esperados}'
+            )
@@ -0,0 +1,76 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from eventos.models import Evento, TipoEvento
+
+
+class Command(BaseCommand):
+    help = 'Comparar el render de lista.html con la caché de tarjetas fría y caliente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tarjetas', type=int, nargs='+', default=[10, 100, 1000],
+            help='Número de tarjetas por página a medir (por defecto 10 100 1000)',
+        )
+        parser.add_argument(
+            '--repeticiones', type=int, default=5,
+            help='Renders por medición; se informa la mediana (por defecto 5)',
+        )
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/eventos/')
+        request.user = AnonymousUser()
+
+        self.stdout.write(f'{"Tarjetas":>9} {"Fría (ms)":>11} {"Caliente (ms)":>14} {"Mejora":>8}')
+        for cantidad in options['tarjetas']:
+            fria = []
+            caliente = []
+            for _ in range(options['repeticiones']):
+                # Una fecha de actualización nueva garantiza claves sin cachear
+                eventos = self._eventos(cantidad, timezone.now())
+                fria.append(self._render(request, eventos))
+                caliente.append(self._render(request, eventos))
+            fria_ms = sorted(fria)[len(fria) // 2] * 1000
+            caliente_ms = sorted(caliente)[len(caliente) // 2] * 1000
+            self.stdout.write(
+                f'{cantidad:>9} {fria_ms:>11.1f} {caliente_ms:>14.1f} '
+                f'{fria_ms / caliente_ms if caliente_ms else 0:>7.1f}x'
+            )
+
+    def _render(self, request, eventos):
+        contexto = {'eventos': eventos, 'tipos_eventos': [], 'search': '', 'tipo_seleccionado': ''}
+        inicio = time.perf_counter()
+        render_to_string('eventos/lista.html', contexto, request=request)
+        return time.perf_counter() - inicio
+
+    def _eventos(self, cantidad, actualizacion):
+        """Eventos en memoria (sin base de datos) con ids que no chocan con los reales"""
+        tipo = TipoEvento(pk=1, nombre='Conferencia')
+        organizador = User(pk=1, username='benchmark')
+        inicio = timezone.now() + timedelta(days=1)
+        return [
+            Evento(
+                pk=10**12 + i,
+                titulo=f'Evento de benchmark {i}',
+                descripcion='Descripción larga del evento de benchmark ' * 10,
+                tipo_evento=tipo,
+                organizador=organizador,
+                fecha_inicio=inicio,
+                fecha_fin=inicio + timedelta(hours=2),
+                ubicacion='Santiago',
+                capacidad_maxima=100,
+                confirmados=i % 100,
+                estado='publicado',
+                privacidad='privado' if i % 5 == 0 else 'publico',
+                precio=Decimal(i % 3 * 1000),
+                fecha_actualizacion=actualizacion,
+            )
+            for i in range(cantidad)
+        ]
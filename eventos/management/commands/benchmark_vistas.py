@@ -0,0 +1,187 @@
+import json
+import logging
+import time
+from itertools import cycle
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from eventos.benchmarks import cache_aislada, cliente_de_pruebas, percentiles
+from eventos.models import Evento, TipoEvento
+
+BUSQUEDAS = ['congreso', 'festival', 'taller', 'santiago', 'prueba', 'jornada']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Medir latencia, consultas por petición y throughput de las vistas principales '
+        '(usar tras generar_datos)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=200,
+                            help='Peticiones medidas por escenario (por defecto 200)')
+        parser.add_argument('--calentamiento', type=int, default=10,
+                            help='Peticiones previas sin medir por escenario')
+        parser.add_argument('--escenario', action='append', dest='escenarios',
+                            help='Ejecutar solo este escenario (se puede repetir)')
+        parser.add_argument('--guardar', metavar='RUTA',
+                            help='Guardar los resultados como línea base JSON')
+        parser.add_argument('--comparar', metavar='RUTA',
+                            help='Comparar con una línea base JSON y fallar si hay regresiones')
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help='Aumento de p95 aceptado respecto a la base (por defecto 0.25)')
+
+    def handle(self, *args, **options):
+        escenarios = self._escenarios()
+        if options['escenarios']:
+            desconocidos = set(options['escenarios']) - set(escenarios)
+            if desconocidos:
+                raise CommandError(
+                    f'Escenarios desconocidos: {", ".join(sorted(desconocidos))}. '
+                    f'Disponibles: {", ".join(escenarios)}'
+                )
+            escenarios = {nombre: escenarios[nombre] for nombre in options['escenarios']}
+
+        resultados = {}
+        # Los errores 500 se cuentan en el resumen y el log por petición de
+        # la instrumentación SQL distorsionaría las latencias
+        loggers = [logging.getLogger(nombre) for nombre in ('django.request', 'event_platform.sql')]
+        desactivados = [logger.disabled for logger in loggers]
+        for logger in loggers:
+            logger.disabled = True
+        try:
+            # Las escrituras (registrarse) se descartan al terminar
+            with cache_aislada('benchmark_vistas'), transaction.atomic():
+                for nombre, (usuario, urls) in escenarios.items():
+                    resultados[nombre] = self._medir(usuario, urls, options)
+                    self._mostrar(nombre, resultados[nombre])
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            for logger, desactivado in zip(loggers, desactivados):
+                logger.disabled = desactivado
+
+        if options['guardar']:
+            with open(options['guardar'], 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'fecha': timezone.now().isoformat(),
+                    'peticiones': options['peticiones'],
+                    'escenarios': resultados,
+                }, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f'Línea base guardada en {options["guardar"]}')
+
+        if options['comparar']:
+            self._comparar(resultados, options['comparar'], options['tolerancia'])
+
+    def _escenarios(self):
+        """Escenario -> (usuario, iterador infinito de URLs)"""
+        asistente = self._usuario('Asistentes')
+        organizador = self._usuario('Organizadores')
+        administrador = self._usuario('Administradores', is_staff=True)
+
+        publicos = list(
+            Evento.objects.filter(privacidad='publico', estado='publicado')
+            .order_by('-fecha_inicio').values_list('pk', flat=True)[:500]
+        )
+        tipos = list(TipoEvento.objects.values_list('pk', flat=True))
+        if not publicos or not tipos:
+            raise CommandError('No hay eventos publicados; ejecuta antes generar_datos')
+
+        lista = reverse('eventos:lista')
+        return {
+            'lista_anonimo': (None, cycle([lista])),
+            'lista': (asistente, cycle([lista])),
+            'lista_busqueda': (asistente, cycle(f'{lista}?search={t}' for t in BUSQUEDAS)),
+            'lista_tipo': (asistente, cycle(f'{lista}?tipo={pk}' for pk in tipos)),
+            'detalle': (asistente, cycle(reverse('eventos:detalle', args=[pk]) for pk in publicos)),
+            'registrarse': (
+                asistente, cycle(reverse('eventos:registrarse', args=[pk]) for pk in publicos)
+            ),
+            'perfil': (organizador, cycle([reverse('usuarios:perfil')])),
+            'admin_eventos': (
+                administrador, cycle([reverse('admin:eventos_evento_changelist')])
+            ),
+            'admin_registros': (
+                administrador, cycle([reverse('admin:eventos_registroevento_changelist')])
+            ),
+        }
+
+    @staticmethod
+    def _usuario(grupo, **filtros):
+        usuario = User.objects.filter(groups__name=grupo, **filtros).order_by('pk').first()
+        if usuario is None:
+            raise CommandError(f'No hay usuarios en el grupo {grupo}; ejecuta antes generar_datos')
+        return usuario
+
+    def _medir(self, usuario, urls, options):
+        cliente = cliente_de_pruebas(usuario)
+        for _ in range(options['calentamiento']):
+            cliente.get(next(urls))
+
+        latencias, consultas, errores = [], [], 0
+        inicio = time.perf_counter()
+        for _ in range(options['peticiones']):
+            antes = time.perf_counter()
+            respuesta = cliente.get(next(urls))
+            latencias.append(time.perf_counter() - antes)
+            consultas.append(respuesta.wsgi_request.consultas_sql.total)
+            errores += respuesta.status_code >= 500
+        duracion = time.perf_counter() - inicio
+
+        return {
+            **{clave: round(valor, 2) for clave, valor in percentiles(latencias).items()},
+            'consultas': round(sum(consultas) / len(consultas), 1) if consultas else 0,
+            'consultas_max': max(consultas, default=0),
+            'rps': round(len(latencias) / duracion, 1) if duracion else 0,
+            'errores': errores,
+        }
+
+    def _mostrar(self, nombre, resultado):
+        linea = (
+            f'{nombre:<16} p50={resultado["p50"]:.1f}ms p95={resultado["p95"]:.1f}ms '
+            f'p99={resultado["p99"]:.1f}ms consultas={resultado["consultas"]} '
+            f'(máx {resultado["consultas_max"]}) {resultado["rps"]} pet/s'
+        )
+        if resultado['errores']:
+            self.stdout.write(self.style.ERROR(f'{linea} errores={resultado["errores"]}'))
+        else:
+            self.stdout.write(linea)
+
+    def _comparar(self, resultados, ruta, tolerancia):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                base = json.load(archivo)['escenarios']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'No se pudo leer la línea base {ruta}: {error}')
+
+        regresiones = []
+        for nombre, actual in resultados.items():
+            anterior = base.get(nombre)
+            if anterior is None:
+                continue
+            cambio = (actual['p95'] / anterior['p95'] - 1) if anterior['p95'] else 0.0
+            self.stdout.write(
+                f'{nombre:<16} p95 {anterior["p95"]:.1f} -> {actual["p95"]:.1f}ms ({cambio:+.0%}), '
+                f'consultas {anterior["consultas"]} -> {actual["consultas"]}'
+            )
+            if cambio > tolerancia:
+                regresiones.append(f'{nombre}: p95 {cambio:+.0%}')
+            if actual['consultas'] > anterior['consultas']:
+                regresiones.append(
+                    f'{nombre}: {anterior["consultas"]} -> {actual["consultas"]} consultas'
+                )
+            if actual['errores'] > anterior.get('errores', 0):
+                regresiones.append(f'{nombre}: {actual["errores"]} errores')
+
+        if regresiones:
+            raise CommandError('Regresiones respecto a la base: ' + '; '.join(regresiones))
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la línea base'))
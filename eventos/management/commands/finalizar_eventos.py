@@ -0,0 +1,98 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from eventos.cache import invalidar_respuestas
+from eventos.models import Evento, RegistroEvento
+
+
+class Command(BaseCommand):
+    help = (
+        'Marcar como finalizados, por lotes, los eventos publicados que ya '
+        'terminaron y cancelar sus registros pendientes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Eventos por transacción (por defecto 500)')
+        parser.add_argument('--pausa', type=float, default=0,
+                            help='Segundos de espera entre lotes para ceder la base de datos')
+        parser.add_argument('--bucle', action='store_true',
+                            help='Repetir indefinidamente en lugar de una sola pasada')
+        parser.add_argument('--intervalo', type=float, default=300,
+                            help='Segundos entre pasadas con --bucle (por defecto 300)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo contar lo que se finalizaría, sin modificar nada')
+
+    def handle(self, *args, **options):
+        if not options['bucle']:
+            self._pasada(options)
+            return
+        try:
+            while True:
+                self._pasada(options)
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Detenido')
+
+    def _pasada(self, options):
+        # Hora fija durante la pasada: los eventos que terminan mientras tanto
+        # quedan para la siguiente y la pasada siempre acaba
+        ahora = timezone.now()
+        if options['simular']:
+            eventos = Evento.objects.por_finalizar(ahora)
+            pendientes = RegistroEvento.objects.filter(evento__in=eventos, estado='pendiente')
+            self.stdout.write(
+                f'{eventos.count()} eventos por finalizar con '
+                f'{pendientes.count()} registros pendientes'
+            )
+            return
+
+        eventos = registros = 0
+        inicio = time.perf_counter()
+        while resultado := self._finalizar_lote(ahora, options['lote']):
+            eventos += resultado[0]
+            registros += resultado[1]
+            if options['verbosity'] >= 2:
+                self.stdout.write(
+                    f'Lote: {resultado[0]} eventos, {resultado[1]} registros pendientes'
+                )
+            if options['pausa']:
+                time.sleep(options['pausa'])
+        duracion = time.perf_counter() - inicio
+
+        filas = eventos + registros
+        self.stdout.write(self.style.SUCCESS(
+            f'{eventos} eventos finalizados y {registros} registros pendientes '
+            f'cancelados en {duracion:.1f}s ({filas / duracion if duracion else 0:.0f} filas/s)'
+        ))
+
+    def _finalizar_lote(self, ahora, tamano):
+        """Finaliza hasta ``tamano`` eventos en una transacción; None si no queda ninguno
+
+        No se guarda ningún progreso: lo ya finalizado deja de cumplir la
+        condición, así que tras una interrupción basta con volver a ejecutar.
+        """
+        with transaction.atomic():
+            pks = list(
+                Evento.objects.por_finalizar(ahora)
+                .order_by('fecha_fin', 'id')
+                .values_list('pk', flat=True)[:tamano]
+            )
+            if not pks:
+                return None
+            # La condición se repite en el UPDATE: un evento editado entre tanto
+            # (p. ej. con una nueva fecha de fin) no se toca. update() invalida
+            # las estadísticas de los organizadores y fecha_actualizacion
+            # renueva los validadores (eventos.condicional) y el calendario
+            eventos = Evento.objects.por_finalizar(ahora).filter(pk__in=pks).update(
+                estado='finalizado', fecha_actualizacion=timezone.now()
+            )
+            registros = RegistroEvento.objects.filter(
+                evento__in=Evento.objects.filter(pk__in=pks, estado='finalizado')
+            ).cancelar_pendientes()
+            if eventos:
+                invalidar_respuestas()
+        return eventos, registros
@@ -0,0 +1,181 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from eventos.cache import invalidar_respuestas
+from eventos.models import Evento, RegistroEvento, TipoEvento
+
+PREFIJO = 'sintetico_'
+CONTRASENA = 'sintetico123'
+
+# (estado, peso) y proporción de eventos privados
+ESTADOS_EVENTO = [('publicado', 70), ('borrador', 15), ('finalizado', 10), ('cancelado', 5)]
+PROPORCION_PRIVADOS = 0.2
+
+
+class Command(BaseCommand):
+    help = 'Generar usuarios, tipos, eventos y registros sintéticos para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--asistentes', type=int, default=5000)
+        parser.add_argument('--organizadores', type=int, default=200)
+        parser.add_argument('--administradores', type=int, default=5)
+        parser.add_argument('--tipos', type=int, default=10,
+                            help='Tipos de evento adicionales a los de configurar_grupos')
+        parser.add_argument('--eventos', type=int, default=5000)
+        parser.add_argument('--registros', type=int, default=100000,
+                            help='Registros totales (se reparten con una distribución de Zipf)')
+        parser.add_argument('--sesgo', type=float, default=1.1,
+                            help='Exponente de Zipf para la popularidad de los eventos')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Borrar antes los datos sintéticos generados previamente')
+
+    def handle(self, *args, **options):
+        self.azar = random.Random(options['semilla'])
+        self.lote = options['lote']
+        inicio = time.perf_counter()
+
+        if options['limpiar']:
+            self._limpiar()
+        elif User.objects.filter(username__startswith=PREFIJO).exists():
+            raise CommandError('Ya existen datos sintéticos; usa --limpiar para regenerarlos')
+
+        # Grupos, permisos y tipos básicos
+        call_command('configurar_grupos', stdout=StringIO())
+
+        with transaction.atomic():
+            usuarios = self._crear_usuarios(options)
+            tipos = self._crear_tipos(options['tipos'])
+            eventos = self._crear_eventos(options['eventos'], tipos, usuarios['Organizadores'])
+        total = self._crear_registros(
+            options['registros'], options['sesgo'], eventos,
+            usuarios['Asistentes'] + usuarios['Organizadores'],
+        )
+        # bulk_create de eventos no emite señales
+        invalidar_respuestas()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generados {sum(len(ids) for ids in usuarios.values())} usuarios, '
+            f'{len(eventos)} eventos y {total} registros '
+            f'en {time.perf_counter() - inicio:.1f}s (contraseña: {CONTRASENA})'
+        ))
+
+    def _limpiar(self):
+        # Los eventos y registros se borran en cascada con sus usuarios
+        User.objects.filter(username__startswith=PREFIJO).delete()
+        TipoEvento.objects.filter(nombre__startswith=PREFIJO).delete()
+
+    def _crear_usuarios(self, options):
+        contrasena = make_password(CONTRASENA)
+        usuarios = {}
+        for grupo, cantidad, staff in [
+            ('Asistentes', options['asistentes'], False),
+            ('Organizadores', options['organizadores'], False),
+            ('Administradores', options['administradores'], True),
+        ]:
+            prefijo = f'{PREFIJO}{grupo.lower()}_'
+            User.objects.bulk_create(
+                (
+                    User(
+                        username=f'{prefijo}{i}',
+                        email=f'{prefijo}{i}@example.com',
+                        password=contrasena,
+                        is_staff=staff,
+                    )
+                    for i in range(cantidad)
+                ),
+                batch_size=self.lote,
+            )
+            ids = list(
+                User.objects.filter(username__startswith=prefijo).values_list('pk', flat=True)
+            )
+            grupo_id = Group.objects.get(name=grupo).pk
+            relacion = User.groups.through
+            relacion.objects.bulk_create(
+                (relacion(user_id=pk, group_id=grupo_id) for pk in ids),
+                batch_size=self.lote,
+            )
+            usuarios[grupo] = ids
+        return usuarios
+
+    def _crear_tipos(self, cantidad):
+        TipoEvento.objects.bulk_create([
+            TipoEvento(nombre=f'{PREFIJO}tipo_{i}', descripcion='Tipo generado')
+            for i in range(cantidad)
+        ])
+        return list(TipoEvento.objects.values_list('pk', flat=True))
+
+    def _crear_eventos(self, cantidad, tipos, organizadores):
+        if not organizadores:
+            raise CommandError('Hace falta al menos un organizador para crear eventos')
+        ahora = timezone.now()
+        estados, pesos = zip(*ESTADOS_EVENTO)
+        palabras = ['Congreso', 'Festival', 'Encuentro', 'Jornada', 'Taller', 'Foro', 'Ciclo']
+        ciudades = ['Santiago', 'Valparaíso', 'Concepción', 'La Serena', 'Temuco']
+
+        def evento(i):
+            # Eventos entre hace seis meses y dentro de un año
+            inicio = ahora + timedelta(days=self.azar.uniform(-180, 365))
+            estado = self.azar.choices(estados, pesos)[0]
+            if inicio < ahora and estado == 'publicado':
+                estado = 'finalizado'
+            return Evento(
+                titulo=f'{self.azar.choice(palabras)} de prueba {i}',
+                descripcion=f'Evento sintético número {i} generado para pruebas de carga.',
+                tipo_evento_id=self.azar.choice(tipos),
+                fecha_inicio=inicio,
+                fecha_fin=inicio + timedelta(hours=self.azar.choice([1, 2, 4, 8, 48])),
+                ubicacion=self.azar.choice(ciudades),
+                capacidad_maxima=self.azar.choice([20, 50, 100, 500, 2000]),
+                estado=estado,
+                privacidad='privado' if self.azar.random() < PROPORCION_PRIVADOS else 'publico',
+                organizador_id=self.azar.choice(organizadores),
+                precio=Decimal(self.azar.choice([0, 0, 0, 5000, 15000])),
+            )
+
+        Evento.objects.bulk_create((evento(i) for i in range(cantidad)), batch_size=self.lote)
+        return list(
+            Evento.objects.filter(organizador__username__startswith=PREFIJO)
+            .values_list('pk', 'capacidad_maxima')
+        )
+
+    def _crear_registros(self, total, sesgo, eventos, usuarios):
+        """Reparte ``total`` registros con popularidad de Zipf entre los eventos"""
+        if not eventos or not usuarios:
+            return 0
+        pesos = [1 / (rango ** sesgo) for rango in range(1, len(eventos) + 1)]
+        suma = sum(pesos)
+        orden = list(eventos)
+        self.azar.shuffle(orden)
+
+        creados = 0
+        pendientes = []
+        for (evento_id, capacidad), peso in zip(orden, pesos):
+            cantidad = min(round(total * peso / suma), len(usuarios))
+            for posicion, usuario_id in enumerate(self.azar.sample(usuarios, cantidad)):
+                if posicion < capacidad:
+                    estado = 'cancelado' if self.azar.random() < 0.05 else 'confirmado'
+                else:
+                    estado = 'pendiente'
+                pendientes.append(
+                    RegistroEvento(evento_id=evento_id, usuario_id=usuario_id, estado=estado)
+                )
+            if len(pendientes) >= self.lote:
+                RegistroEvento.objects.bulk_create(pendientes, batch_size=self.lote)
+                creados += len(pendientes)
+                pendientes = []
+        if pendientes:
+            RegistroEvento.objects.bulk_create(pendientes, batch_size=self.lote)
+            creados += len(pendientes)
+        return creados
@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+
+from eventos import importacion
+from eventos.cache import invalidar_respuestas
+
+MAX_ERRORES_MOSTRADOS = 20
+
+
+class Command(BaseCommand):
+    help = 'Importar tipos de evento, eventos o registros desde un fichero CSV o JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del fichero CSV o JSONL')
+        parser.add_argument('--modelo', required=True,
+                            choices=sorted(importacion.ESPECIFICACIONES),
+                            help='Qué contiene el fichero')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'],
+                            help='Formato del fichero (por defecto según la extensión)')
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Filas por bulk_create y por transacción (por defecto 5000)')
+        parser.add_argument('--procesos', type=int, default=multiprocessing.cpu_count(),
+                            help='Procesos que validan filas (0 = validar en este proceso)')
+        conflictos = parser.add_mutually_exclusive_group()
+        conflictos.add_argument('--actualizar', action='store_true',
+                                help='Actualizar las filas existentes (update_conflicts)')
+        conflictos.add_argument('--ignorar-existentes', action='store_true',
+                                help='Omitir las filas que ya existen (ignore_conflicts)')
+
+    def handle(self, *args, **options):
+        tipo = options['modelo']
+        especificacion = importacion.ESPECIFICACIONES[tipo]
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        opciones_bulk = {'batch_size': options['lote']}
+        if options['actualizar']:
+            opciones_bulk.update(
+                update_conflicts=True,
+                unique_fields=list(especificacion.unicos),
+                update_fields=self._campos_actualizables(especificacion),
+            )
+        elif options['ignorar_existentes']:
+            opciones_bulk['ignore_conflicts'] = True
+
+        if not os.path.isfile(options['archivo']):
+            raise CommandError(f'No existe el fichero {options["archivo"]}')
+
+        filas = importacion.leer_filas(options['archivo'], options['formato'])
+        lotes = ((tipo, lote) for lote in importacion.lotes(filas, options['lote']))
+        mapas = importacion.cargar_mapas(tipo)
+        importadas, errores = 0, []
+        inicio = time.perf_counter()
+
+        pool = None
+        if options['procesos'] > 0:
+            # Cerrar conexiones antes de hacer fork
+            connections.close_all()
+            pool = multiprocessing.Pool(options['procesos'])
+            validados = pool.imap(importacion.validar_lote_en_proceso, lotes)
+        else:
+            validados = (importacion.validar_lote(*argumentos) for argumentos in lotes)
+
+        try:
+            for validas, invalidas in validados:
+                errores.extend(invalidas)
+                objetos, desconocidas = importacion.construir_instancias(tipo, validas, mapas)
+                errores.extend(desconocidas)
+                if not objetos:
+                    continue
+                try:
+                    with transaction.atomic():
+                        especificacion.modelo.objects.bulk_create(objetos, **opciones_bulk)
+                except DatabaseError as error:
+                    raise CommandError(
+                        f'Error al guardar el lote que empieza en la línea {validas[0][0]}: {error} '
+                        f'({importadas} filas ya importadas)'
+                    )
+                importadas += len(objetos)
+        except (UnicodeDecodeError, ValueError) as error:
+            raise CommandError(
+                f'No se pudo leer {options["archivo"]}: {error} ({importadas} filas ya importadas)'
+            )
+        finally:
+            if pool is not None:
+                pool.terminate()
+            # bulk_create de tipos y eventos no emite señales
+            invalidar_respuestas()
+
+        duracion = time.perf_counter() - inicio
+        for numero, mensaje in sorted(errores)[:MAX_ERRORES_MOSTRADOS]:
+            self.stderr.write(f'Línea {numero}: {mensaje}')
+        if len(errores) > MAX_ERRORES_MOSTRADOS:
+            self.stderr.write(f'... y {len(errores) - MAX_ERRORES_MOSTRADOS} errores más')
+
+        velocidad = importadas / duracion if duracion else 0.0
+        estilo = self.style.WARNING if errores else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'{importadas} filas importadas, {len(errores)} con errores, '
+            f'en {duracion:.2f}s ({velocidad:.0f} filas/s)'
+        ))
+
+    @staticmethod
+    def _campos_actualizables(especificacion):
+        campos = [
+            campo for campo in especificacion.campos if campo not in especificacion.unicos
+        ]
+        campos += [
+            campo for campo in especificacion.relaciones.values()
+            if campo not in especificacion.unicos
+        ]
+        if any(campo.name == 'fecha_actualizacion' for campo in especificacion.modelo._meta.fields):
+            campos.append('fecha_actualizacion')
+        return campos
@@ -0,0 +1,59 @@
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from eventos import imagenes
+from eventos.models import Evento
+
+
+class Command(BaseCommand):
+    help = 'Generar las variantes (WebP/JPEG redimensionadas) de las imágenes de eventos existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4,
+                            help='Imágenes procesadas en paralelo (0 = en este hilo; por defecto 4)')
+        parser.add_argument('--todas', action='store_true',
+                            help='Reprocesar también las imágenes que ya tienen variantes')
+
+    def handle(self, *args, **options):
+        eventos = Evento.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        pendientes = [
+            evento.pk
+            for evento in eventos.only('pk', 'imagen', 'imagen_variantes').iterator()
+            if options['todas'] or imagenes.necesita_variantes(evento)
+        ]
+        if not pendientes:
+            self.stdout.write(self.style.SUCCESS('Todas las imágenes tienen sus variantes'))
+            return
+
+        procesadas, errores = 0, 0
+        inicio = time.perf_counter()
+        if options['hilos'] > 0:
+            # Cada hilo abre su propia conexión
+            connections.close_all()
+            pool = ThreadPoolExecutor(max_workers=options['hilos'])
+            futuros = {pool.submit(imagenes.procesar_en_hilo, pk): pk for pk in pendientes}
+            resultados = ((futuros[futuro], futuro.result) for futuro in as_completed(futuros))
+        else:
+            pool = None
+            resultados = ((pk, partial(imagenes.procesar_imagen, pk)) for pk in pendientes)
+
+        try:
+            for pk, resultado in resultados:
+                try:
+                    procesadas += resultado()
+                except Exception as error:
+                    errores += 1
+                    self.stderr.write(f'Evento {pk}: {error}')
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        duracion = time.perf_counter() - inicio
+
+        estilo = self.style.WARNING if errores else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'{procesadas} imágenes procesadas, {errores} con errores, en {duracion:.1f}s'
+        ))
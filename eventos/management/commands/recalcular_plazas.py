@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Q
+from eventos.models import Evento
+
+class Command(BaseCommand):
+    help = 'Reconstruir y verificar el contador de registros confirmados de cada evento'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo comprobar el contador sin modificarlo (falla si hay diferencias)',
+        )
+        parser.add_argument(
+            '--evento',
+            type=int,
+            action='append',
+            dest='eventos',
+            help='ID de un evento concreto (se puede repetir)',
+        )
+
+    def handle(self, *args, **options):
+        eventos = Evento.objects.all()
+        if options['eventos']:
+            eventos = eventos.filter(pk__in=options['eventos'])
+
+        # Comparar el contador guardado con el conteo real
+        desajustados = (
+            eventos
+            .annotate(reales=Count('registros', filter=Q(registros__estado='confirmado')))
+            .exclude(confirmados=F('reales'))
+            .values_list('pk', 'titulo', 'confirmados', 'reales')
+        )
+
+        diferencias = list(desajustados)
+        for pk, titulo, guardados, reales in diferencias:
+            self.stdout.write(
+                f'Evento {pk} "{titulo}": contador={guardados}, confirmados reales={reales}'
+            )
+
+        if options['verificar']:
+            if diferencias:
+                raise CommandError(f'{len(diferencias)} eventos con el contador desajustado')
+            self.stdout.write(self.style.SUCCESS('Todos los contadores son correctos'))
+            return
+
+        actualizados = eventos.recalcular_confirmados()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Contadores recalculados para {actualizados} eventos '
+                f'({len(diferencias)} tenían diferencias)'
+            )
+        )
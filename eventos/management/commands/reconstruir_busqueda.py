@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from eventos.busqueda import obtener_buscador
+
+class Command(BaseCommand):
+    help = 'Reconstruir el índice de búsqueda de texto de los eventos'
+
+    def handle(self, *args, **options):
+        buscador = obtener_buscador()
+        buscador.instalar()
+        total = buscador.reconstruir()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Índice de búsqueda ({type(buscador).__name__}) reconstruido: {total} eventos'
+            )
+        )
@@ -0,0 +1,154 @@
+import logging
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from eventos.benchmarks import cache_aislada, cliente_de_pruebas
+from eventos.models import Evento, RegistroEvento, TipoEvento
+
+# "SCAN tabla" sin índice = recorrido completo de la tabla
+ESCANEO_COMPLETO = re.compile(r'\bSCAN (\w+)(?: AS \w+)?$')
+
+# Tablas pequeñas de catálogo donde un recorrido completo es aceptable.
+# "subquery" es la tabla derivada de Django al agregar sobre una página ya
+# recortada (LIMIT), p. ej. los validadores de eventos.condicional
+TABLAS_PERMITIDAS = {'eventos_tipoevento', 'subquery'}
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecutar EXPLAIN QUERY PLAN sobre las consultas de cada vista y fallar '
+        'si alguna recorre una tabla completa'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--permitir',
+            action='append',
+            default=[],
+            metavar='TABLA',
+            help='Tabla adicional en la que se acepta un recorrido completo',
+        )
+        parser.add_argument(
+            '--mostrar-planes',
+            action='store_true',
+            help='Mostrar el plan de todas las consultas, no solo de las que fallan',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Este comando usa EXPLAIN QUERY PLAN de SQLite')
+
+        permitidas = TABLAS_PERMITIDAS | set(options['permitir'])
+        fallos = []
+        # Las plantillas que falten no importan aquí: solo interesan las consultas
+        logger = logging.getLogger('django.request')
+        logger_desactivado, logger.disabled = logger.disabled, True
+        try:
+            # Los datos de ejemplo se crean y se descartan en una transacción
+            with cache_aislada('verificar_indices'), transaction.atomic():
+                for nombre, consultas in self._ejecutar_vistas():
+                    fallos.extend(self._revisar(nombre, consultas, permitidas, options))
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            logger.disabled = logger_desactivado
+
+        if fallos:
+            raise CommandError(f'{len(fallos)} consultas recorren tablas completas')
+        self.stdout.write(self.style.SUCCESS('Todas las consultas usan índices'))
+
+    def _revisar(self, nombre, consultas, permitidas, options):
+        fallos = []
+        for sql in dict.fromkeys(consultas):
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [fila[-1] for fila in cursor.fetchall()]
+            escaneos = [
+                linea for linea in plan
+                if (m := ESCANEO_COMPLETO.search(linea)) and m.group(1) not in permitidas
+            ]
+            if escaneos:
+                fallos.append(sql)
+                self.stdout.write(self.style.ERROR(f'[{nombre}] {sql}'))
+            elif options['mostrar_planes']:
+                self.stdout.write(f'[{nombre}] {sql}')
+            if escaneos or options['mostrar_planes']:
+                for linea in plan:
+                    self.stdout.write(f'    {linea}')
+        return fallos
+
+    def _ejecutar_vistas(self):
+        """Recorre las vistas con cada tipo de usuario y devuelve sus consultas"""
+        datos = self._crear_datos()
+        evento = datos['evento']
+        privado = datos['privado']
+        casos = [
+            ('lista', reverse('eventos:lista'), {}),
+            ('lista (búsqueda)', reverse('eventos:lista'), {'search': 'benchmark'}),
+            ('lista (tipo)', reverse('eventos:lista'), {'tipo': evento.tipo_evento_id}),
+            ('lista (próximos)', reverse('eventos:lista'), {'cuando': 'proximos'}),
+            ('lista (en curso)', reverse('eventos:lista'), {'cuando': 'ahora'}),
+            ('lista (rango)', reverse('eventos:lista'), {
+                'desde': evento.fecha_inicio.date().isoformat(),
+                'hasta': evento.fecha_fin.date().isoformat(),
+            }),
+            ('detalle', reverse('eventos:detalle', args=[evento.pk]), {}),
+            ('detalle (privado)', reverse('eventos:detalle', args=[privado.pk]), {}),
+            ('mis eventos', reverse('eventos:mis_eventos'), {}),
+            ('perfil', reverse('usuarios:perfil'), {}),
+            ('registrarse', reverse('eventos:registrarse', args=[evento.pk]), {}),
+            ('cancelar registro', reverse('eventos:cancelar_registro', args=[evento.pk]), {}),
+        ]
+        for rol, usuario in [('anónimo', None)] + list(datos['usuarios'].items()):
+            cliente = cliente_de_pruebas(usuario)
+            for nombre, url, parametros in casos:
+                with CaptureQueriesContext(connection) as capturadas:
+                    cliente.get(url, parametros)
+                yield f'{nombre} / {rol}', [q['sql'] for q in capturadas.captured_queries]
+
+    def _crear_datos(self):
+        tipo, _ = TipoEvento.objects.get_or_create(nombre='Conferencia')
+        permisos = {
+            codename: Permission.objects.get(codename=codename)
+            for codename in ('can_manage_all_events', 'can_view_private_events', 'add_evento')
+        }
+        usuarios = {}
+        for rol, codenames in [
+            ('asistente', []),
+            ('organizador', ['can_view_private_events', 'add_evento']),
+            ('administrador', ['can_manage_all_events']),
+        ]:
+            usuario = User.objects.create_user(f'verificar_indices_{rol}')
+            usuario.user_permissions.add(*(permisos[c] for c in codenames))
+            usuarios[rol] = usuario
+
+        inicio = timezone.now() + timedelta(days=1)
+        comunes = {
+            'descripcion': 'Evento de benchmark',
+            'tipo_evento': tipo,
+            'fecha_inicio': inicio,
+            'fecha_fin': inicio + timedelta(hours=1),
+            'ubicacion': 'Santiago',
+            'estado': 'publicado',
+            'organizador': usuarios['organizador'],
+        }
+        evento = Evento.objects.create(titulo='Benchmark público', **comunes)
+        privado = Evento.objects.create(titulo='Benchmark privado', privacidad='privado', **comunes)
+        RegistroEvento.objects.create(
+            evento=privado, usuario=usuarios['asistente'], estado='confirmado'
+        )
+        return {'usuarios': usuarios, 'evento': evento, 'privado': privado}
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_confirmados(apps, schema_editor):
+    Evento = apps.get_model('eventos', 'Evento')
+    RegistroEvento = apps.get_model('eventos', 'RegistroEvento')
+    confirmados = (
+        RegistroEvento.objects
+        .filter(evento=OuterRef('pk'), estado='confirmado')
+        .order_by()
+        .values('evento')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Evento.objects.update(confirmados=Coalesce(Subquery(confirmados), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='confirmados',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Registros confirmados'),
+        ),
+        migrations.RunPython(calcular_confirmados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0002_evento_confirmados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['-fecha_inicio', '-id'], name='evento_fecha_inicio_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['privacidad', 'estado', '-fecha_inicio', '-id'], name='evento_priv_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['organizador', '-fecha_creacion'], name='evento_org_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroevento',
+            index=models.Index(fields=['evento', 'estado'], name='registro_evento_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroevento',
+            index=models.Index(fields=['usuario', 'evento', 'estado'], name='registro_usr_evt_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0004_evento_imagen_variantes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='registroevento',
+            name='registro_evento_estado_idx',
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='lista_espera',
+            field=models.BooleanField(default=False, help_text='Con el evento completo, los nuevos registros quedan pendientes y se confirman por orden de llegada cuando se liberan plazas', verbose_name='Lista de espera'),
+        ),
+        migrations.AddIndex(
+            model_name='registroevento',
+            index=models.Index(fields=['evento', 'estado', 'fecha_registro', 'id'], name='registro_evt_estado_fecha_idx'),
+        ),
+    ]
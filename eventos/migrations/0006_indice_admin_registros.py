@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0005_lista_espera'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroevento',
+            index=models.Index(fields=['-fecha_registro', '-id'], name='registro_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0006_indice_admin_registros'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['estado', 'fecha_fin'], name='evento_estado_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['ubicacion', 'fecha_fin', 'fecha_inicio'], name='evento_ubicacion_fechas_idx'),
+        ),
+    ]
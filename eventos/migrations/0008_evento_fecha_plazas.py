@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0007_indices_fechas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='fecha_plazas',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,8 +1,19 @@
-from django.db import models
+from collections import Counter
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import (
+    Case, Count, Exists, ExpressionWrapper, F, OuterRef, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 
+from usuarios import estadisticas
+
+from .cache import invalidar_respuestas
+
 # Modelo para diferentes tipos de eventos
 class TipoEvento(models.Model):
     """Modelo para definir los tipos de eventos (Conferencia, Concierto, Seminario, etc.)"""
@@ -17,6 +28,240 @@ class TipoEvento(models.Model):
     def __str__(self):
         return self.nombre
 
+# QuerySet de eventos con operaciones sobre el contador de plazas
+class EventoQuerySet(models.QuerySet):
+    """Operaciones en bloque y reglas de visibilidad para eventos"""
+
+    def visible_para(self, usuario):
+        """Eventos que ``usuario`` puede ver
+
+        Es la única definición de las reglas de visibilidad: la usan tanto la
+        lista como ``Evento.puede_ver_evento``. El acceso a eventos privados se
+        resuelve con un EXISTS sobre el índice único (usuario, evento) de
+        RegistroEvento, así que no hay JOIN ni hace falta DISTINCT.
+        """
+        if not usuario.is_authenticated:
+            return self._visibles(usuario)
+        return self._visibles(
+            usuario,
+            usuario.has_perm('eventos.can_manage_all_events'),
+            usuario.has_perm('eventos.can_view_private_events'),
+        )
+
+    async def avisible_para(self, usuario):
+        """Versión async de ``visible_para`` (comprueba los permisos con ahas_perm)"""
+        if not usuario.is_authenticated:
+            return self._visibles(usuario)
+        return self._visibles(
+            usuario,
+            await usuario.ahas_perm('eventos.can_manage_all_events'),
+            await usuario.ahas_perm('eventos.can_view_private_events'),
+        )
+
+    def _visibles(self, usuario, gestiona_todos=False, ve_privados=False):
+        return self.filter(self._regla_visibilidad(usuario, gestiona_todos, ve_privados))
+
+    @staticmethod
+    def _regla_visibilidad(usuario, gestiona_todos=False, ve_privados=False):
+        """Condición (Q) que cumplen los eventos visibles para ``usuario``"""
+        publicados = Q(privacidad='publico', estado='publicado')
+
+        # Anónimos: solo eventos públicos publicados
+        if not usuario.is_authenticated:
+            return publicados
+
+        # Administradores ven todo
+        if gestiona_todos:
+            return Q()
+
+        registrado = Exists(
+            RegistroEvento.objects.filter(evento=OuterRef('pk'), usuario=usuario)
+        )
+        # La condición barata va primero para no evaluar el EXISTS en eventos públicos
+        privados_registrado = Q(privacidad='privado') & Q(registrado)
+
+        # Organizadores: públicos + sus eventos + privados donde están registrados
+        if ve_privados:
+            return Q(privacidad='publico') | Q(organizador=usuario) | privados_registrado
+
+        # Asistentes: públicos publicados + privados donde están registrados
+        return publicados | privados_registrado
+
+    def para_detalle(self, usuario):
+        """Eventos con todo lo que necesita su página de detalle para ``usuario``
+
+        Una sola consulta trae el tipo y el organizador y anota ``visible`` (las
+        reglas de ``visible_para``) y ``estado_registro`` (estado del registro
+        del usuario en el evento, o None).
+        """
+        if not usuario.is_authenticated:
+            return self._para_detalle(usuario)
+        return self._para_detalle(
+            usuario,
+            usuario.has_perm('eventos.can_manage_all_events'),
+            usuario.has_perm('eventos.can_view_private_events'),
+        )
+
+    async def apara_detalle(self, usuario):
+        """Versión async de ``para_detalle``"""
+        if not usuario.is_authenticated:
+            return self._para_detalle(usuario)
+        return self._para_detalle(
+            usuario,
+            await usuario.ahas_perm('eventos.can_manage_all_events'),
+            await usuario.ahas_perm('eventos.can_view_private_events'),
+        )
+
+    def _para_detalle(self, usuario, gestiona_todos=False, ve_privados=False):
+        regla = self._regla_visibilidad(usuario, gestiona_todos, ve_privados)
+        if usuario.is_authenticated:
+            estado_registro = Subquery(
+                RegistroEvento.objects
+                .filter(evento=OuterRef('pk'), usuario=usuario)
+                .order_by()
+                .values('estado')[:1]
+            )
+        else:
+            estado_registro = Value(None, output_field=models.CharField())
+        return self.select_related('tipo_evento', 'organizador').annotate(
+            # Q() vacío (ve todo) no se puede compilar como expresión
+            visible=ExpressionWrapper(regla, output_field=models.BooleanField())
+            if regla else Value(True),
+            estado_registro=estado_registro,
+        )
+
+    def proximos(self, ahora=None):
+        """Eventos que aún no han empezado"""
+        return self.filter(fecha_inicio__gt=ahora or timezone.now())
+
+    def en_curso(self, ahora=None):
+        """Eventos que ya empezaron y aún no han terminado"""
+        ahora = ahora or timezone.now()
+        return self.filter(fecha_inicio__lte=ahora, fecha_fin__gt=ahora)
+
+    def por_finalizar(self, ahora=None):
+        """Eventos publicados que ya terminaron (índice estado, fecha_fin)"""
+        return self.filter(estado='publicado', fecha_fin__lte=ahora or timezone.now())
+
+    def en_rango(self, desde=None, hasta=None):
+        """Eventos que transcurren (aunque sea en parte) entre ``desde`` y ``hasta``
+
+        Es la condición de solapamiento de intervalos: empieza antes de
+        ``hasta`` y termina después de ``desde``. Cualquiera de los extremos
+        puede omitirse.
+        """
+        condicion = Q()
+        if desde is not None:
+            condicion &= Q(fecha_fin__gt=desde)
+        if hasta is not None:
+            condicion &= Q(fecha_inicio__lt=hasta)
+        return self.filter(condicion)
+
+    def esta_semana(self, ahora=None):
+        """Eventos que transcurren en la semana actual (de lunes a domingo, hora local)"""
+        hoy = timezone.localtime(ahora or timezone.now())
+        lunes = (hoy - timedelta(days=hoy.weekday())).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        return self.en_rango(lunes, lunes + timedelta(days=7))
+
+    def en_ventana(self, ventana, ahora=None):
+        """Filtra por una de las ventanas de ``Evento.VENTANA_CHOICES``"""
+        filtros = {
+            'proximos': self.proximos,
+            'semana': self.esta_semana,
+            'ahora': self.en_curso,
+        }
+        if ventana not in filtros:
+            raise ValueError(f'Ventana de fechas no válida: {ventana}')
+        return filtros[ventana](ahora)
+
+    def solapados(self, ubicacion, inicio, fin, excluir=None):
+        """Eventos no cancelados en ``ubicacion`` que se solapan con [inicio, fin)
+
+        La consulta recorre el índice (ubicacion, fecha_fin, fecha_inicio)
+        solo desde ``inicio``: los eventos ya terminados de esa ubicación no
+        se leen.
+        """
+        queryset = (
+            self.filter(ubicacion=ubicacion)
+            .en_rango(inicio, fin)
+            .exclude(estado='cancelado')
+        )
+        if excluir is not None:
+            queryset = queryset.exclude(pk=excluir)
+        return queryset
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        organizadores = {obj.organizador_id for obj in objs}
+        with transaction.atomic(using=self.db):
+            cambia_organizador = {'organizador', 'organizador_id'} & set(
+                kwargs.get('update_fields') or ()
+            )
+            if kwargs.get('update_conflicts') and cambia_organizador:
+                # El upsert puede quitarle el evento al organizador anterior. Evento
+                # no tiene más campos únicos que la clave: los conflictos son por pk
+                pks = [obj.pk for obj in objs if obj.pk is not None]
+                organizadores.update(
+                    self.filter(pk__in=pks).order_by()
+                    .values_list('organizador_id', flat=True).distinct()
+                )
+            creados = super().bulk_create(objs, *args, **kwargs)
+            # Sin señales: las estadísticas de los organizadores se recalculan al leerlas
+            estadisticas.invalidar(organizadores)
+        return creados
+
+    def update(self, **kwargs):
+        if not {'estado', 'organizador', 'organizador_id'} & kwargs.keys():
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            organizadores = set(
+                self.order_by().values_list('organizador_id', flat=True).distinct()
+            )
+            filas = super().update(**kwargs)
+            nuevo = kwargs.get('organizador_id', kwargs.get('organizador'))
+            if nuevo is not None:
+                organizadores.add(getattr(nuevo, 'pk', nuevo))
+            if filas:
+                estadisticas.invalidar(organizadores)
+        return filas
+
+    def ajustar_confirmados(self, delta):
+        """Suma (o resta) ``delta`` al contador de confirmados de forma atómica
+
+        No renueva ``fecha_actualizacion``, que solo cambia al editar el evento,
+        sino ``fecha_plazas`` (el Last-Modified de ``eventos.condicional``).
+        """
+        if not delta:
+            return 0
+        if delta < 0:
+            # Nunca dejar el contador en negativo si hubo desajustes previos
+            return self.update(
+                confirmados=Greatest(F('confirmados') + delta, 0), fecha_plazas=timezone.now()
+            )
+        return self.update(confirmados=F('confirmados') + delta, fecha_plazas=timezone.now())
+
+    def recalcular_confirmados(self):
+        """Reconstruye el contador de confirmados a partir de los registros"""
+        confirmados = (
+            RegistroEvento.objects
+            .filter(evento=OuterRef('pk'), estado='confirmado')
+            .order_by()
+            .values('evento')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        total = Coalesce(Subquery(confirmados), Value(0))
+        return self.update(
+            confirmados=total,
+            # Solo cambia la fecha de los eventos cuyo contador estaba desajustado
+            fecha_plazas=Case(
+                When(confirmados=total, then=F('fecha_plazas')), default=Value(timezone.now())
+            ),
+        )
+
+
 # Modelo principal para los eventos
 class Evento(models.Model):
     """Modelo principal para gestionar eventos"""
@@ -28,6 +273,13 @@ class Evento(models.Model):
         ('finalizado', 'Finalizado'),
     ]
     
+    # Ventanas de fechas de la lista, la API y el admin (EventoQuerySet.en_ventana)
+    VENTANA_CHOICES = [
+        ('proximos', 'Próximos'),
+        ('semana', 'Esta semana'),
+        ('ahora', 'En curso'),
+    ]
+    
     PRIVACIDAD_CHOICES = [
         ('publico', 'Público'),
         ('privado', 'Privado'),
@@ -49,6 +301,18 @@ class Evento(models.Model):
         default=100, 
         verbose_name="Capacidad máxima"
     )
+    lista_espera = models.BooleanField(
+        default=False,
+        verbose_name="Lista de espera",
+        help_text="Con el evento completo, los nuevos registros quedan pendientes "
+                  "y se confirman por orden de llegada cuando se liberan plazas"
+    )
+    # Contador desnormalizado de registros confirmados (ver RegistroEvento.save)
+    confirmados = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Registros confirmados"
+    )
     
     # Configuraciones del evento
     estado = models.CharField(
@@ -86,6 +350,13 @@ class Evento(models.Model):
         null=True,
         verbose_name="Imagen del evento"
     )
+    # Versiones redimensionadas de la imagen (ver eventos/imagenes.py)
+    imagen_variantes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Variantes de la imagen"
+    )
     precio = models.DecimalField(
         max_digits=10, 
         decimal_places=2, 
@@ -96,11 +367,36 @@ class Evento(models.Model):
     # Campos de auditoría
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
+    # Última variación de confirmados (no cambia fecha_actualizacion; ver condicional)
+    fecha_plazas = models.DateTimeField(default=timezone.now, editable=False)
+    
+    objects = EventoQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Evento"
         verbose_name_plural = "Eventos"
         ordering = ['-fecha_inicio']
+        indexes = [
+            # Lista y paginación por cursor: orden (-fecha_inicio, -id)
+            models.Index(fields=['-fecha_inicio', '-id'], name='evento_fecha_inicio_id_idx'),
+            # Filtros de visibilidad por privacidad + estado ordenados por fecha
+            models.Index(
+                fields=['privacidad', 'estado', '-fecha_inicio', '-id'],
+                name='evento_priv_estado_fecha_idx'
+            ),
+            # MisEventosView: eventos del organizador por fecha de creación
+            models.Index(
+                fields=['organizador', '-fecha_creacion'],
+                name='evento_org_creacion_idx'
+            ),
+            # Eventos en curso y por finalizar: estado + fin del evento
+            models.Index(fields=['estado', 'fecha_fin'], name='evento_estado_fin_idx'),
+            # Conflictos de ubicación y horario (EventoQuerySet.solapados)
+            models.Index(
+                fields=['ubicacion', 'fecha_fin', 'fecha_inicio'],
+                name='evento_ubicacion_fechas_idx'
+            ),
+        ]
         permissions = [
             ('can_view_private_events', 'Puede ver eventos privados'),
             ('can_manage_all_events', 'Puede gestionar todos los eventos'),
@@ -112,35 +408,180 @@ class Evento(models.Model):
     def get_absolute_url(self):
         return reverse('eventos:detalle', kwargs={'pk': self.pk})
     
+    def save(self, *args, **kwargs):
+        # El contador de confirmados solo se modifica con UPDATE atómicos y
+        # las variantes de la imagen las escribe el pool de imágenes; no
+        # sobrescribirlos con el valor (posiblemente obsoleto) en memoria
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key
+                and campo.name not in ('confirmados', 'imagen_variantes')
+            ]
+        with transaction.atomic(using=kwargs.get('using')):
+            anterior = self._obtener_estado_guardado()
+            super().save(*args, **kwargs)
+            actual = (self.organizador_id, self.estado)
+            estadisticas.evento_cambiado(anterior, actual)
+        self._estado_guardado = actual
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Recordar organizador y estado persistidos para las estadísticas de usuario
+        if 'estado' in field_names and 'organizador_id' in field_names:
+            instancia._estado_guardado = (instancia.organizador_id, instancia.estado)
+        return instancia
+    
+    def _obtener_estado_guardado(self):
+        if self._state.adding:
+            return None
+        if hasattr(self, '_estado_guardado'):
+            return self._estado_guardado
+        return (
+            type(self).objects
+            .filter(pk=self.pk)
+            .values_list('organizador_id', 'estado')
+            .first()
+        )
+    
     @property
     def esta_activo(self):
-        """Verifica si el evento está activo (no ha finalizado)"""
+        """Verifica si el evento está activo (no ha finalizado)
+
+        Es para un evento ya cargado; para filtrar listas usar las ventanas
+        de fechas de EventoQuerySet, que se evalúan en la base de datos.
+        """
         return timezone.now() < self.fecha_fin
     
+    def conflictos(self):
+        """Otros eventos en la misma ubicación cuyo horario se solapa con este"""
+        return Evento.objects.solapados(
+            self.ubicacion, self.fecha_inicio, self.fecha_fin, excluir=self.pk
+        )
+    
     @property
     def plazas_disponibles(self):
-        """Calcula las plazas disponibles"""
-        registros_confirmados = self.registros.filter(estado='confirmado').count()
-        return self.capacidad_maxima - registros_confirmados
+        """Calcula las plazas disponibles a partir del contador de confirmados"""
+        return self.capacidad_maxima - self.confirmados
     
     def puede_ver_evento(self, usuario):
-        """Verifica si un usuario puede ver este evento"""
-        if self.privacidad == 'publico':
+        """Verifica si un usuario puede ver este evento (reglas de visible_para)"""
+        # Los eventos públicos publicados son visibles para todos sin consultar
+        if self.privacidad == 'publico' and self.estado == 'publicado':
             return True
         
         if not usuario.is_authenticated:
             return False
         
-        # El organizador siempre puede ver su evento
-        if self.organizador == usuario:
+        return type(self).objects.visible_para(usuario).filter(pk=self.pk).exists()
+    
+    async def apuede_ver_evento(self, usuario):
+        """Versión async de ``puede_ver_evento``"""
+        if self.privacidad == 'publico' and self.estado == 'publicado':
             return True
         
-        # Usuarios con permisos especiales
-        if usuario.has_perm('eventos.can_view_private_events'):
-            return True
+        if not usuario.is_authenticated:
+            return False
         
-        # Asistentes registrados pueden ver eventos privados
-        return self.asistentes.filter(id=usuario.id).exists()
+        visibles = await type(self).objects.avisible_para(usuario)
+        return await visibles.filter(pk=self.pk).aexists()
+
+# QuerySet de registros que mantiene el contador de confirmados en operaciones masivas
+class RegistroEventoQuerySet(models.QuerySet):
+    """Mantiene Evento.confirmados y las estadísticas de usuario en bulk_create y update"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            creados = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('update_conflicts') or kwargs.get('ignore_conflicts'):
+                # Con conflictos no sabemos qué filas cambiaron: recalcular
+                eventos = {obj.evento_id for obj in objs}
+                Evento.objects.filter(pk__in=eventos).recalcular_confirmados()
+            else:
+                por_evento = Counter(
+                    obj.evento_id for obj in objs if obj.estado == 'confirmado'
+                )
+                for evento_id, total in por_evento.items():
+                    Evento.objects.filter(pk=evento_id).ajustar_confirmados(total)
+            # Las estadísticas de estos usuarios se recalculan al leerlas
+            estadisticas.invalidar({obj.usuario_id for obj in objs})
+        # bulk_create no emite post_save
+        invalidar_respuestas()
+        return creados
+
+    def update(self, **kwargs):
+        if not {'estado', 'evento', 'evento_id', 'usuario', 'usuario_id'} & kwargs.keys():
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            afectados = list(self.order_by().values_list('evento_id', 'usuario_id').distinct())
+            eventos = {evento_id for evento_id, _ in afectados}
+            usuarios = {usuario_id for _, usuario_id in afectados}
+            filas = super().update(**kwargs)
+            nuevo_evento = kwargs.get('evento_id', kwargs.get('evento'))
+            if nuevo_evento is not None:
+                eventos.add(getattr(nuevo_evento, 'pk', nuevo_evento))
+            nuevo_usuario = kwargs.get('usuario_id', kwargs.get('usuario'))
+            if nuevo_usuario is not None:
+                usuarios.add(getattr(nuevo_usuario, 'pk', nuevo_usuario))
+            if filas:
+                Evento.objects.filter(pk__in=eventos).recalcular_confirmados()
+                estadisticas.invalidar(usuarios)
+                invalidar_respuestas()
+        return filas
+
+    def delete(self):
+        """Borra con un solo DELETE y recalcula los contadores de lo afectado
+
+        RegistroEvento no tiene señales de borrado, así que Django puede borrar
+        sin cargar cada fila (también en cascada, ver ``eventos.signals``).
+        """
+        with transaction.atomic(using=self.db):
+            afectados = list(self.order_by().values_list('evento_id', 'usuario_id').distinct())
+            borrados, por_modelo = super().delete()
+            if borrados:
+                Evento.objects.filter(
+                    pk__in={evento_id for evento_id, _ in afectados}
+                ).recalcular_confirmados()
+                estadisticas.invalidar({usuario_id for _, usuario_id in afectados})
+        if borrados:
+            invalidar_respuestas()
+        return borrados, por_modelo
+
+    def confirmar_pendientes(self):
+        """Confirma los registros pendientes del queryset sin tocar el contador
+
+        Solo para quien ya reservó esas plazas en ``Evento.confirmados``
+        (ver ``reservas.promover_lista_espera``).
+        """
+        pendientes = self.filter(estado='pendiente')
+        usuarios = list(pendientes.order_by().values_list('usuario_id', flat=True))
+        # QuerySet.update sin el recálculo de RegistroEventoQuerySet.update
+        filas = models.QuerySet.update(pendientes, estado='confirmado')
+        estadisticas.registros_movidos(usuarios, 'pendiente', 'confirmado')
+        return filas
+
+    def cancelar_pendientes(self):
+        """Cancela los registros pendientes del queryset con un solo UPDATE
+
+        Los pendientes no ocupan plaza, así que el contador de confirmados no
+        cambia y no hace falta el recálculo de ``update``.
+        """
+        pendientes = self.filter(estado='pendiente')
+        with transaction.atomic(using=self.db):
+            # Bloquear las filas: una promoción concurrente no debe contarse dos veces
+            usuarios = list(
+                pendientes.select_for_update().order_by().values_list('usuario_id', flat=True)
+            )
+            if not usuarios:
+                return 0
+            filas = models.QuerySet.update(pendientes, estado='cancelado')
+            estadisticas.registros_movidos(usuarios, 'pendiente', 'cancelado')
+        invalidar_respuestas()
+        return filas
+
 
 # Modelo para el registro de asistentes a eventos
 class RegistroEvento(models.Model):
@@ -182,6 +623,81 @@ class RegistroEvento(models.Model):
         verbose_name_plural = "Registros de Eventos"
         unique_together = ['usuario', 'evento']
         ordering = ['-fecha_registro']
+        indexes = [
+            # Conteo de plazas por evento y estado, y lista de espera en orden
+            # de llegada: la promoción lee solo los primeros pendientes
+            models.Index(
+                fields=['evento', 'estado', 'fecha_registro', 'id'],
+                name='registro_evt_estado_fecha_idx'
+            ),
+            # Orden por defecto del admin de registros (-fecha_registro, -pk)
+            models.Index(fields=['-fecha_registro', '-id'], name='registro_fecha_id_idx'),
+            # Comprobación "esta_registrado" del detalle (índice cubriente)
+            models.Index(
+                fields=['usuario', 'evento', 'estado'],
+                name='registro_usr_evt_estado_idx'
+            ),
+        ]
+    
+    objects = RegistroEventoQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.usuario.username} - {self.evento.titulo}"
+    
+    def save(self, *args, ajustar_contador=True, **kwargs):
+        """Guarda el registro y actualiza Evento.confirmados y las estadísticas
+        del usuario en la misma transacción
+
+        ``ajustar_contador=False`` lo usan las rutas que ya reservaron la plaza.
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            anterior = self._obtener_estado_guardado(kwargs.get('using'))
+            super().save(*args, **kwargs)
+            actual = (self.evento_id, self.estado, self.usuario_id)
+            if ajustar_contador:
+                self._ajustar_contador(anterior, actual)
+            estadisticas.registro_cambiado(
+                anterior and (anterior[2], anterior[1]), (self.usuario_id, self.estado)
+            )
+    
+    def delete(self, using=None, keep_parents=False):
+        """Elimina el registro y descuenta su estado guardado (no el de la instancia)"""
+        using = using or self._state.db
+        with transaction.atomic(using=using):
+            anterior = self._obtener_estado_guardado(using)
+            resultado = super().delete(using, keep_parents)
+            if anterior:
+                # Una copia obsoleta ya eliminada no encuentra la fila: nada que descontar
+                self._ajustar_contador(anterior, None)
+                estadisticas.registro_cambiado((anterior[2], anterior[1]), None)
+        if anterior:
+            invalidar_respuestas()
+        return resultado
+    
+    def _obtener_estado_guardado(self, using=None):
+        """Estado persistido (evento_id, estado, usuario_id), con la fila bloqueada
+
+        Se lee siempre de la base de datos y no de la instancia: dos copias
+        obsoletas del mismo registro (p. ej. un formulario de cancelación
+        enviado dos veces) no deben descontar la misma plaza dos veces.
+        """
+        if self._state.adding:
+            return None
+        return (
+            type(self).objects
+            .using(using or self._state.db)
+            .select_for_update()
+            .filter(pk=self.pk)
+            .values_list('evento_id', 'estado', 'usuario_id')
+            .first()
+        )
+    
+    @staticmethod
+    def _ajustar_contador(anterior, actual):
+        """Aplica la diferencia entre dos estados (evento_id, estado, usuario_id) al contador"""
+        if anterior == actual:
+            return
+        if anterior and anterior[1] == 'confirmado':
+            Evento.objects.filter(pk=anterior[0]).ajustar_confirmados(-1)
+        if actual and actual[1] == 'confirmado':
+            Evento.objects.filter(pk=actual[0]).ajustar_confirmados(1)
@@ -0,0 +1,202 @@
+"""Paginación por cursor (keyset) para listas de eventos
+
+En lugar de ``OFFSET`` se filtra a partir del último elemento visto usando el
+par ``(fecha_inicio, id)``, que coincide con el orden ``-fecha_inicio`` de la
+lista, o ``(relevancia, id)`` para los resultados de una búsqueda. Cualquier página cuesta lo mismo que la primera y no hace falta contar
+el total de resultados. El cursor es opaco y está firmado; además de la
+posición guarda los filtros activos para que no se pierdan al navegar.
+
+``PaginadorConteoEstimado`` es para los listados del admin: evita el
+``COUNT(*)`` exacto sobre tablas grandes.
+"""
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+SALT_CURSOR = 'eventos.paginacion.cursor'
+
+SIGUIENTE = 's'
+ANTERIOR = 'a'
+
+
+def codificar_cursor(evento, direccion, filtros, por_relevancia=False):
+    datos = {'id': evento.pk, 'd': direccion, 'q': filtros}
+    if por_relevancia:
+        datos['r'] = evento.relevancia
+    else:
+        datos['f'] = evento.fecha_inicio.isoformat()
+    return signing.dumps(datos, salt=SALT_CURSOR, compress=True)
+
+
+def decodificar_cursor(valor):
+    """Devuelve los datos del cursor o None si falta o no es válido"""
+    if not valor:
+        return None
+    try:
+        datos = signing.loads(valor, salt=SALT_CURSOR)
+        if 'r' in datos:
+            if isinstance(datos['r'], bool) or not isinstance(datos['r'], (int, float)):
+                return None
+        else:
+            datos['f'] = parse_datetime(datos['f'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+    if datos.get('f', datos.get('r')) is None or datos.get('d') not in (SIGUIENTE, ANTERIOR):
+        return None
+    return datos
+
+
+class PaginaCursor:
+    """Página de resultados con enlaces al cursor anterior y siguiente"""
+
+    def __init__(self, object_list, paginador, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginador
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def cursor_siguiente(self):
+        if not self._has_next:
+            return None
+        return codificar_cursor(
+            self.object_list[-1], SIGUIENTE, self.paginator.filtros, self.paginator.por_relevancia
+        )
+
+    @cached_property
+    def cursor_anterior(self):
+        if not self._has_previous:
+            return None
+        return codificar_cursor(
+            self.object_list[0], ANTERIOR, self.paginator.filtros, self.paginator.por_relevancia
+        )
+
+
+class PaginadorCursor:
+    """Pagina un queryset de eventos por ``(fecha_inicio, id)`` descendente
+
+    Con ``por_relevancia`` pagina por ``(relevancia, id)`` ascendente: el
+    queryset debe venir de ``buscar`` (ver ``eventos.busqueda``).
+    """
+
+    def __init__(self, queryset, por_pagina, filtros=None, por_relevancia=False):
+        self.queryset = queryset
+        self.per_page = por_pagina
+        self.filtros = filtros or {}
+        self.por_relevancia = por_relevancia
+
+    @cached_property
+    def count(self):
+        """Total exacto; solo se calcula si alguien lo pide explícitamente"""
+        return self.queryset.count()
+
+    def pagina(self, cursor=None):
+        datos = self._datos(cursor)
+        consulta = self._consulta(datos)
+        return self._construir(list(consulta), datos)
+
+    async def apagina(self, cursor=None):
+        """Versión async de ``pagina`` (lee las filas con iteración async)"""
+        datos = self._datos(cursor)
+        consulta = self._consulta(datos)
+        return self._construir([evento async for evento in consulta], datos)
+
+    def consulta(self, cursor=None):
+        """Queryset (sin evaluar) de las filas que leería ``pagina(cursor)``"""
+        datos = self._datos(cursor)
+        return self._consulta(datos)
+
+    def _datos(self, cursor):
+        datos = decodificar_cursor(cursor) if isinstance(cursor, str) else cursor
+        # Un cursor del otro orden no sirve como posición: primera página
+        if datos is not None and ('r' in datos) != self.por_relevancia:
+            return None
+        return datos
+
+    def _consulta(self, datos):
+        """Consulta de una página (con una fila extra para saber si hay más)"""
+        queryset = self.queryset
+        if self.por_relevancia:
+            campo, clave, signo, despues, antes = 'relevancia', 'r', '', 'gt', 'lt'
+        else:
+            campo, clave, signo, despues, antes = 'fecha_inicio', 'f', '-', 'lt', 'gt'
+        inverso = '' if signo else '-'
+        if datos is None:
+            return queryset.order_by(f'{signo}{campo}', f'{signo}id')[:self.per_page + 1]
+
+        valor, pk = datos[clave], datos['id']
+        if datos['d'] == SIGUIENTE:
+            return (
+                queryset
+                .filter(Q(**{f'{campo}__{despues}': valor}) | Q(**{campo: valor, f'id__{despues}': pk}))
+                .order_by(f'{signo}{campo}', f'{signo}id')[:self.per_page + 1]
+            )
+
+        # Página anterior: recorrer en orden inverso y dar la vuelta al resultado
+        return (
+            queryset
+            .filter(Q(**{f'{campo}__{antes}': valor}) | Q(**{campo: valor, f'id__{antes}': pk}))
+            .order_by(f'{inverso}{campo}', f'{inverso}id')[:self.per_page + 1]
+        )
+
+    def _construir(self, filas, datos):
+        hay_mas = len(filas) > self.per_page
+        if datos is None:
+            return PaginaCursor(filas[:self.per_page], self, hay_mas, False)
+        if datos['d'] == SIGUIENTE:
+            return PaginaCursor(filas[:self.per_page], self, hay_mas, True)
+        return PaginaCursor(filas[:self.per_page][::-1], self, True, hay_mas)
+
+
+class PaginadorConteoEstimado(Paginator):
+    """Paginator con un total aproximado para tablas de millones de filas
+
+    Sin filtros, el total se estima a partir de las estadísticas del motor
+    (``reltuples`` en PostgreSQL) o del ``MAX(id)``, que se resuelve con el
+    índice de la clave primaria. Si la estimación es pequeña, o hay filtros, se
+    cuenta de verdad pero como mucho ``limite_conteo`` filas.
+    """
+
+    umbral_estimacion = 10000
+    limite_conteo = 10000
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list.query
+        if not consulta.where and not consulta.distinct:
+            estimado = self._estimar(self.object_list)
+            if estimado is not None and estimado > self.umbral_estimacion:
+                return estimado
+        return self.object_list.order_by()[:self.limite_conteo].count()
+
+    @staticmethod
+    def _estimar(queryset):
+        conexion = connections[queryset.db]
+        tabla = queryset.model._meta.db_table
+        if conexion.vendor == 'postgresql':
+            with conexion.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [tabla])
+                fila = cursor.fetchone()
+            if fila and fila[0] > 0:
+                return int(fila[0])
+        if queryset.model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+            return queryset.order_by().aggregate(maximo=Max('pk'))['maximo'] or 0
+        return None
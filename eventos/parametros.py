@@ -0,0 +1,42 @@
+"""Parámetros de filtrado comunes a la lista, la API y el admin
+
+Las fechas ``desde``/``hasta`` se interpretan igual en los tres sitios y se
+aplican con ``EventoQuerySet.en_rango`` (eventos que transcurren en el rango).
+"""
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def parsear_fecha(valor, fin_del_dia=False):
+    """Acepta fecha u hora ISO; una fecha sola cubre el día completo
+
+    Lanza ParametroInvalido si el valor no es una fecha o no existe (2024-02-30).
+    """
+    try:
+        # La fecha primero: parse_datetime también acepta una fecha sola (medianoche)
+        fecha = parse_date(valor)
+        fecha_hora = parse_datetime(valor) if fecha is None else None
+    except ValueError:
+        # Formato correcto pero fecha inexistente
+        fecha = fecha_hora = None
+    if fecha is not None:
+        fecha_hora = datetime.combine(fecha, time.max if fin_del_dia else time.min)
+    elif fecha_hora is None:
+        raise ParametroInvalido(f'Fecha no válida: {valor}')
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
+
+
+def rango_fechas(desde, hasta):
+    """``(desde, hasta)`` para ``en_rango``; los parámetros vacíos quedan en None"""
+    return (
+        parsear_fecha(desde) if desde else None,
+        parsear_fecha(hasta, fin_del_dia=True) if hasta else None,
+    )
@@ -0,0 +1,190 @@
+"""Reserva de plazas sin condiciones de carrera
+
+La plaza se reclama con un único UPDATE condicional sobre ``Evento.confirmados``
+(``confirmados < capacidad_maxima``). La base de datos serializa esa escritura,
+así que dos peticiones concurrentes nunca pueden ocupar la misma última plaza y
+no hace falta leer las plazas disponibles antes de escribir.
+
+Con ``Evento.lista_espera`` activado, los registros que no consiguen plaza
+quedan ``pendiente`` y se confirman por orden de ``fecha_registro`` cuando se
+liberan plazas (``promover_lista_espera``). La promoción lee solo los primeros
+pendientes con el índice (evento, estado, fecha_registro, id), así que su coste
+depende de las plazas liberadas y no del tamaño de la lista.
+"""
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from usuarios import estadisticas
+
+from .cache import invalidar_respuestas
+from .models import Evento, RegistroEvento
+
+# Resultados posibles de una reserva
+CONFIRMADO = 'confirmado'
+YA_REGISTRADO = 'ya_registrado'
+PENDIENTE = 'pendiente'
+AGOTADO = 'agotado'
+EN_ESPERA = 'en_espera'
+
+
+class _ReservaRevertida(Exception):
+    """Fuerza el rollback de la plaza reclamada cuando el registro ya existía"""
+
+
+def reclamar_plaza(evento_id):
+    """Ocupa una plaza si queda alguna; devuelve True si se pudo reclamar"""
+    return bool(
+        Evento.objects
+        .filter(pk=evento_id, confirmados__lt=F('capacidad_maxima'))
+        .update(confirmados=F('confirmados') + 1, fecha_plazas=timezone.now())
+    )
+
+
+def reservar_plaza(evento, usuario):
+    """Registra al usuario en el evento si quedan plazas
+
+    Cubre tanto registros nuevos como la reactivación de registros cancelados.
+    Devuelve una de las constantes CONFIRMADO, YA_REGISTRADO, PENDIENTE,
+    EN_ESPERA (evento completo con lista de espera) o AGOTADO.
+    """
+    # Lectura previa sin bloqueo: evita reclamar plaza si ya hay registro activo
+    estado_actual = (
+        RegistroEvento.objects
+        .filter(evento=evento, usuario=usuario)
+        .values_list('estado', flat=True)
+        .first()
+    )
+    if estado_actual == 'confirmado':
+        return YA_REGISTRADO
+    if estado_actual == 'pendiente':
+        return PENDIENTE
+
+    try:
+        with transaction.atomic():
+            # Primero escribir: en SQLite toma el bloqueo de escritura sin
+            # tener que promocionar un bloqueo de lectura (evita "database is locked")
+            if not reclamar_plaza(evento.pk):
+                if evento.lista_espera:
+                    return _poner_en_espera(evento, usuario)
+                return AGOTADO
+
+            registro = (
+                RegistroEvento.objects
+                .select_for_update()
+                .filter(evento=evento, usuario=usuario)
+                .first()
+            )
+            if registro is None:
+                registro = RegistroEvento(
+                    evento=evento, usuario=usuario, estado='confirmado'
+                )
+            elif registro.estado == 'cancelado':
+                registro.estado = 'confirmado'
+            else:
+                # Otra petición del mismo usuario se adelantó
+                raise _ReservaRevertida(registro.estado)
+
+            registro.save(ajustar_contador=False)
+    except _ReservaRevertida as exc:
+        return YA_REGISTRADO if str(exc) == 'confirmado' else PENDIENTE
+    except IntegrityError:
+        # unique_together (usuario, evento): registro concurrente del mismo usuario
+        return YA_REGISTRADO
+
+    return CONFIRMADO
+
+
+def _poner_en_espera(evento, usuario):
+    """Añade al usuario al final de la lista de espera (dentro de la transacción)"""
+    registro = (
+        RegistroEvento.objects
+        .select_for_update()
+        .filter(evento=evento, usuario=usuario)
+        .first()
+    )
+    if registro is None:
+        registro = RegistroEvento(evento=evento, usuario=usuario, estado='pendiente')
+    elif registro.estado == 'cancelado':
+        # Vuelve a la cola por el final, no en su posición original
+        registro.estado = 'pendiente'
+        registro.fecha_registro = timezone.now()
+    else:
+        raise _ReservaRevertida(registro.estado)
+    registro.save()
+    return EN_ESPERA
+
+
+def cancelar_registro(registro):
+    """Cancela un registro y cede la plaza liberada a la lista de espera
+
+    Devuelve el número de registros promovidos.
+    """
+    with transaction.atomic():
+        anterior = _marcar_cancelado(registro.pk)
+        registro.estado = 'cancelado'
+        if anterior is None:
+            # Otra petición (p. ej. el mismo formulario enviado dos veces) ya lo canceló
+            return 0
+        estadisticas.registro_cambiado(
+            (registro.usuario_id, anterior), (registro.usuario_id, 'cancelado')
+        )
+        promovidos = 0
+        if anterior == 'confirmado':
+            Evento.objects.filter(pk=registro.evento_id).ajustar_confirmados(-1)
+            promovidos = promover_lista_espera(registro.evento_id)
+    invalidar_respuestas()
+    return promovidos
+
+
+def _marcar_cancelado(registro_id):
+    """Cancela el registro con un UPDATE condicional y devuelve su estado previo
+
+    Primero escribir (como en ``reclamar_plaza``): de dos cancelaciones
+    concurrentes solo una cambia la fila, así que la plaza se libera una vez.
+    Devuelve None si el registro ya no estaba confirmado ni pendiente.
+    """
+    for estado in ('confirmado', 'pendiente'):
+        # QuerySet.update sin el recálculo de RegistroEventoQuerySet.update
+        if models.QuerySet.update(
+            RegistroEvento.objects.filter(pk=registro_id, estado=estado), estado='cancelado'
+        ):
+            return estado
+    return None
+
+
+def promover_lista_espera(evento_id):
+    """Confirma, en orden de llegada, tantos pendientes como plazas libres haya
+
+    Todo ocurre en una transacción: primero se bloquea la fila del evento con
+    un UPDATE (también en SQLite, donde toma el bloqueo de escritura antes de
+    leer), luego se leen las plazas libres y solo esos N primeros pendientes,
+    y se confirman con dos UPDATE. Devuelve el número de registros promovidos.
+    """
+    with transaction.atomic():
+        if not Evento.objects.filter(pk=evento_id, lista_espera=True).update(
+            confirmados=F('confirmados')
+        ):
+            return 0
+        capacidad, confirmados = (
+            Evento.objects.filter(pk=evento_id)
+            .values_list('capacidad_maxima', 'confirmados')
+            .get()
+        )
+        libres = capacidad - confirmados
+        if libres <= 0:
+            return 0
+
+        siguientes = list(
+            RegistroEvento.objects
+            .filter(evento_id=evento_id, estado='pendiente')
+            .order_by('fecha_registro', 'id')
+            .values_list('pk', flat=True)[:libres]
+        )
+        if not siguientes:
+            return 0
+
+        promovidos = RegistroEvento.objects.filter(pk__in=siguientes).confirmar_pendientes()
+        Evento.objects.filter(pk=evento_id).ajustar_confirmados(promovidos)
+    invalidar_respuestas()
+    return promovidos
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from usuarios import estadisticas
+
+from . import imagenes
+from .cache import invalidar_respuestas
+from .models import Evento, RegistroEvento, TipoEvento
+
+
+# RegistroEvento no tiene receptores de borrado: así Django borra sus filas en
+# cascada con un solo DELETE. Los borrados directos los descuentan
+# RegistroEvento.delete y RegistroEventoQuerySet.delete; las cascadas, estos
+# receptores con una consulta agrupada antes del DELETE.
+
+def _por_total(filas):
+    """``{total: [id, ...]}`` a partir de filas (id, total)"""
+    por_total = defaultdict(list)
+    for pk, total in filas:
+        por_total[total].append(pk)
+    return por_total
+
+
+@receiver(pre_delete, sender=Evento)
+def descontar_registros_del_evento(sender, instance, **kwargs):
+    """Descuenta de las estadísticas de los asistentes los registros del evento eliminado"""
+    estadisticas.registros_eliminados(
+        RegistroEvento.objects.filter(evento_id=instance.pk)
+        .order_by()
+        .values_list('usuario_id', 'estado')
+        .annotate(total=Count('pk'))
+    )
+
+
+@receiver(pre_delete, sender=User)
+def liberar_plazas_del_usuario(sender, instance, **kwargs):
+    """Libera las plazas confirmadas del usuario eliminado"""
+    plazas = (
+        RegistroEvento.objects.filter(usuario_id=instance.pk, estado='confirmado')
+        .order_by()
+        .values_list('evento_id')
+        .annotate(total=Count('pk'))
+    )
+    por_total = _por_total(plazas)
+    for total, eventos in por_total.items():
+        Evento.objects.filter(pk__in=eventos).ajustar_confirmados(-total)
+    if por_total:
+        invalidar_respuestas()
+
+
+@receiver(post_delete, sender=Evento)
+def descontar_evento_eliminado(sender, instance, **kwargs):
+    """Descuenta el evento eliminado de las estadísticas de su organizador"""
+    estadisticas.evento_cambiado((instance.organizador_id, instance.estado), None)
+
+
+@receiver(post_save, sender=Evento)
+@receiver(post_delete, sender=Evento)
+@receiver(post_save, sender=TipoEvento)
+@receiver(post_delete, sender=TipoEvento)
+@receiver(post_save, sender=RegistroEvento)
+def invalidar_cache_respuestas(sender, **kwargs):
+    """Cualquier cambio visible en la lista o el detalle invalida la caché de anónimos"""
+    invalidar_respuestas()
+
+
+@receiver(post_save, sender=Evento)
+def procesar_imagen_evento(sender, instance, **kwargs):
+    """Genera en segundo plano las variantes de una imagen nueva o cambiada"""
+    if imagenes.necesita_variantes(instance):
+        imagenes.encolar(instance.pk)
@@ -0,0 +1,25 @@
+from django import template
+
+from eventos import imagenes
+
+register = template.Library()
+
+
+@register.inclusion_tag('eventos/_imagen_evento.html')
+def imagen_evento(evento, clase='', sizes='100vw'):
+    """<picture> con srcset WebP/JPEG; usa la imagen original si aún no hay variantes"""
+    srcset_jpeg = imagenes.srcset(evento, 'jpeg')
+    if srcset_jpeg:
+        # Respaldo para navegadores sin srcset: la variante JPEG más grande
+        src = srcset_jpeg.rsplit(', ', 1)[-1].rsplit(' ', 1)[0]
+    else:
+        src = evento.imagen.url
+    return {
+        'evento': evento,
+        'src': src,
+        'srcset_webp': imagenes.srcset(evento, 'webp'),
+        'srcset_jpeg': srcset_jpeg,
+        'clase': clase,
+        'sizes': sizes,
+    }
+
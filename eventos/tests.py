@@ -1,3 +1,1753 @@
-from django.test import TestCase
+import csv
+import importlib
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from event_platform.presupuestos import PresupuestoConsultasMixin
+from usuarios import estadisticas
+
+from . import calendario, exportacion, imagenes, reservas
+from .busqueda import filtro_prefijo, obtener_buscador
+from .cache import CLAVE_GENERACION, generacion
+from .models import Evento, RegistroEvento, TipoEvento
+from .paginacion import PaginadorConteoEstimado, PaginadorCursor
+from .parametros import ParametroInvalido, parsear_fecha
+
+
+def crear_evento(organizador, **kwargs):
+    """Crea un evento publicado y público con valores por defecto"""
+    tipo, _ = TipoEvento.objects.get_or_create(nombre='Conferencia')
+    inicio = kwargs.pop('fecha_inicio', timezone.now() + timedelta(days=7))
+    datos = {
+        'titulo': 'Evento de prueba',
+        'descripcion': 'Descripción del evento',
+        'tipo_evento': tipo,
+        'fecha_inicio': inicio,
+        'fecha_fin': inicio + timedelta(hours=2),
+        'ubicacion': 'Santiago',
+        'capacidad_maxima': 10,
+        'estado': 'publicado',
+        'privacidad': 'publico',
+        'organizador': organizador,
+    }
+    datos.update(kwargs)
+    return Evento.objects.create(**datos)
+
+
+class ContadorConfirmadosTests(TestCase):
+    """Pruebas del contador desnormalizado Evento.confirmados"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user('organizador')
+        self.usuarios = [
+            User.objects.create_user(f'usuario{i}') for i in range(3)
+        ]
+        self.evento = crear_evento(self.organizador)
+
+    def confirmados(self):
+        self.evento.refresh_from_db()
+        return self.evento.confirmados
+
+    def test_crear_confirmar_y_cancelar(self):
+        registro = RegistroEvento.objects.create(
+            evento=self.evento, usuario=self.usuarios[0], estado='pendiente'
+        )
+        self.assertEqual(self.confirmados(), 0)
+
+        registro.estado = 'confirmado'
+        registro.save()
+        self.assertEqual(self.confirmados(), 1)
+        self.assertEqual(self.evento.plazas_disponibles, 9)
+
+        registro = RegistroEvento.objects.get(pk=registro.pk)
+        registro.estado = 'cancelado'
+        registro.save()
+        self.assertEqual(self.confirmados(), 0)
+
+    def test_copias_obsoletas_no_descuentan_dos_veces(self):
+        for usuario in self.usuarios[:2]:
+            RegistroEvento.objects.create(evento=self.evento, usuario=usuario, estado='confirmado')
+        registro = RegistroEvento.objects.get(usuario=self.usuarios[0])
+        copias = [RegistroEvento.objects.get(pk=registro.pk) for _ in range(2)]
+        for copia in copias:
+            copia.estado = 'cancelado'
+            copia.save()
+        self.assertEqual(self.confirmados(), 1)
+        call_command('recalcular_plazas', '--verificar', stdout=StringIO())
+        call_command('recalcular_estadisticas', '--verificar', stdout=StringIO())
+
+    def test_eliminar_registro_confirmado(self):
+        registro = RegistroEvento.objects.create(
+            evento=self.evento, usuario=self.usuarios[0], estado='confirmado'
+        )
+        self.assertEqual(self.confirmados(), 1)
+        registro.delete()
+        self.assertEqual(self.confirmados(), 0)
+
+    def test_copias_obsoletas_no_se_eliminan_dos_veces(self):
+        registro = RegistroEvento.objects.create(
+            evento=self.evento, usuario=self.usuarios[0], estado='confirmado'
+        )
+        copias = [RegistroEvento.objects.get(pk=registro.pk) for _ in range(2)]
+        # La copia cree que sigue confirmado, pero se canceló después de leerla
+        RegistroEvento.objects.get(pk=registro.pk).delete()
+        RegistroEvento.objects.create(evento=self.evento, usuario=self.usuarios[1], estado='confirmado')
+        for copia in copias:
+            copia.delete()
+        self.assertEqual(self.confirmados(), 1)
+        call_command('recalcular_estadisticas', '--verificar', stdout=StringIO())
+
+    def test_borrados_en_cascada_con_un_solo_delete(self):
+        otro = crear_evento(self.organizador, titulo='Otro')
+        for usuario in self.usuarios:
+            RegistroEvento.objects.create(evento=self.evento, usuario=usuario, estado='confirmado')
+            RegistroEvento.objects.create(evento=otro, usuario=usuario, estado='pendiente')
+        for usuario in self.usuarios:
+            estadisticas.obtener(usuario)
+
+        def comprobar_borrado_rapido(capturadas, organizador=0):
+            consultas = [q['sql'] for q in capturadas]
+            # Sin cargar los registros para borrarlos uno a uno (señales por fila)
+            self.assertFalse(any(
+                sql.startswith('SELECT "eventos_registroevento"."id"') for sql in consultas
+            ))
+            self.assertEqual(
+                sum(sql.startswith('DELETE FROM "eventos_registroevento"') for sql in consultas), 1
+            )
+            # Un UPDATE agrupado de estadísticas (más el del organizador), no uno por registro
+            self.assertLessEqual(
+                sum(sql.startswith('UPDATE "usuarios_estadisticasusuario"') for sql in consultas),
+                1 + organizador,
+            )
+
+        with CaptureQueriesContext(connection) as capturadas:
+            self.usuarios[0].delete()
+        comprobar_borrado_rapido(capturadas)
+        self.assertEqual(self.confirmados(), 2)
+
+        with CaptureQueriesContext(connection) as capturadas:
+            otro.delete()
+        comprobar_borrado_rapido(capturadas, organizador=1)
+        self.assertFalse(RegistroEvento.objects.filter(evento_id=otro.pk).exists())
+        self.assertEqual(estadisticas.obtener(self.usuarios[1]).registros_pendientes, 0)
+        call_command('recalcular_plazas', '--verificar', stdout=StringIO())
+        call_command('recalcular_estadisticas', '--verificar', stdout=StringIO())
+
+    def test_operaciones_masivas(self):
+        RegistroEvento.objects.bulk_create([
+            RegistroEvento(evento=self.evento, usuario=usuario, estado='confirmado')
+            for usuario in self.usuarios
+        ])
+        self.assertEqual(self.confirmados(), 3)
+
+        RegistroEvento.objects.filter(usuario=self.usuarios[0]).update(estado='cancelado')
+        self.assertEqual(self.confirmados(), 2)
+
+        RegistroEvento.objects.filter(evento=self.evento).delete()
+        self.assertEqual(self.confirmados(), 0)
+
+    def test_guardar_evento_no_pisa_el_contador(self):
+        obsoleto = Evento.objects.get(pk=self.evento.pk)
+        RegistroEvento.objects.create(
+            evento=self.evento, usuario=self.usuarios[0], estado='confirmado'
+        )
+        obsoleto.titulo = 'Nuevo título'
+        obsoleto.save()
+        self.assertEqual(self.confirmados(), 1)
+
+    def test_comando_recalcular_plazas(self):
+        RegistroEvento.objects.create(
+            evento=self.evento, usuario=self.usuarios[0], estado='confirmado'
+        )
+        Evento.objects.filter(pk=self.evento.pk).update(confirmados=5)
+
+        with self.assertRaises(CommandError):
+            call_command('recalcular_plazas', '--verificar', stdout=StringIO())
+
+        call_command('recalcular_plazas', stdout=StringIO())
+        self.assertEqual(self.confirmados(), 1)
+        call_command('recalcular_plazas', '--verificar', stdout=StringIO())
+
+
+class ReservaPlazaTests(TestCase):
+    """Pruebas de la reserva atómica de plazas"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user('organizador')
+        self.evento = crear_evento(self.organizador, capacidad_maxima=1)
+        self.ana = User.objects.create_user('ana')
+        self.luis = User.objects.create_user('luis')
+
+    def test_agotado_sin_sobreventa(self):
+        self.assertEqual(reservas.reservar_plaza(self.evento, self.ana), reservas.CONFIRMADO)
+        self.assertEqual(reservas.reservar_plaza(self.evento, self.luis), reservas.AGOTADO)
+        self.assertEqual(reservas.reservar_plaza(self.evento, self.ana), reservas.YA_REGISTRADO)
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.confirmados, 1)
+        self.assertFalse(RegistroEvento.objects.filter(usuario=self.luis).exists())
+
+    def test_reactivar_registro_cancelado_respeta_capacidad(self):
+        RegistroEvento.objects.create(evento=self.evento, usuario=self.ana, estado='cancelado')
+        reservas.reservar_plaza(self.evento, self.luis)
+        self.assertEqual(reservas.reservar_plaza(self.evento, self.ana), reservas.AGOTADO)
+
+        RegistroEvento.objects.filter(usuario=self.luis).update(estado='cancelado')
+        self.assertEqual(reservas.reservar_plaza(self.evento, self.ana), reservas.CONFIRMADO)
+        self.assertEqual(
+            RegistroEvento.objects.get(usuario=self.ana).estado, 'confirmado'
+        )
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.confirmados, 1)
+
+    def test_vista_registrarse(self):
+        self.client.force_login(self.ana)
+        respuesta = self.client.get(reverse('eventos:registrarse', args=[self.evento.pk]))
+        self.assertRedirects(
+            respuesta, reverse('eventos:detalle', args=[self.evento.pk]),
+            fetch_redirect_response=False
+        )
+        self.assertTrue(
+            RegistroEvento.objects.filter(usuario=self.ana, estado='confirmado').exists()
+        )
+
+
+class ListaEsperaTests(TestCase):
+    """Pruebas de la lista de espera con promoción por orden de llegada"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = User.objects.create_user('organizador')
+        self.evento = crear_evento(self.organizador, capacidad_maxima=1, lista_espera=True)
+        self.ana = User.objects.create_user('ana')
+        reservas.reservar_plaza(self.evento, self.ana)
+
+    def poner_en_espera(self, cantidad):
+        """Crea ``cantidad`` usuarios en espera, del más antiguo al más reciente"""
+        usuarios = []
+        inicio = timezone.now() - timedelta(hours=1)
+        for i in range(cantidad):
+            usuario = User.objects.create_user(f'espera{i}')
+            self.assertEqual(reservas.reservar_plaza(self.evento, usuario), reservas.EN_ESPERA)
+            RegistroEvento.objects.filter(usuario=usuario).update(
+                fecha_registro=inicio + timedelta(seconds=i)
+            )
+            usuarios.append(usuario)
+        return usuarios
+
+    def confirmados(self):
+        return set(
+            RegistroEvento.objects.filter(evento=self.evento, estado='confirmado')
+            .values_list('usuario__username', flat=True)
+        )
+
+    def test_evento_completo_pasa_a_espera(self):
+        luis, = self.poner_en_espera(1)
+        self.assertEqual(RegistroEvento.objects.get(usuario=luis).estado, 'pendiente')
+        self.assertEqual(reservas.reservar_plaza(self.evento, luis), reservas.PENDIENTE)
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.confirmados, 1)
+
+    def test_sin_lista_espera_sigue_agotado(self):
+        Evento.objects.filter(pk=self.evento.pk).update(lista_espera=False)
+        self.evento.refresh_from_db()
+        luis = User.objects.create_user('luis')
+        self.assertEqual(reservas.reservar_plaza(self.evento, luis), reservas.AGOTADO)
+        self.assertEqual(reservas.promover_lista_espera(self.evento.pk), 0)
+
+    def test_cancelar_promueve_al_primero(self):
+        self.poner_en_espera(3)
+        self.client.force_login(self.ana)
+        self.client.post(reverse('eventos:cancelar_registro', args=[self.evento.pk]))
+
+        self.assertEqual(self.confirmados(), {'espera0'})
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.confirmados, 1)
+
+    def test_cancelacion_duplicada_libera_una_sola_plaza(self):
+        self.poner_en_espera(2)
+        copias = [RegistroEvento.objects.get(usuario=self.ana) for _ in range(2)]
+        self.assertEqual(reservas.cancelar_registro(copias[0]), 1)
+        # La segunda copia (obsoleta) ya no cambia la fila: ni plaza ni promoción
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(reservas.cancelar_registro(copias[1]), 0)
+        self.assertFalse([q for q in consultas if 'eventos_evento' in q['sql']])
+
+        self.assertEqual(self.confirmados(), {'espera0'})
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.confirmados, 1)
+        call_command('recalcular_estadisticas', '--verificar', stdout=StringIO())
+
+    def test_salir_de_la_espera_no_promueve(self):
+        primero, _ = self.poner_en_espera(2)
+        reservas.cancelar_registro(RegistroEvento.objects.get(usuario=primero))
+        self.assertEqual(self.confirmados(), {'ana'})
+        self.assertEqual(
+            RegistroEvento.objects.filter(evento=self.evento, estado='pendiente').count(), 1
+        )
+
+    def test_reapuntarse_vuelve_al_final(self):
+        primero, _ = self.poner_en_espera(2)
+        reservas.cancelar_registro(RegistroEvento.objects.get(usuario=primero))
+        self.assertEqual(reservas.reservar_plaza(self.evento, primero), reservas.EN_ESPERA)
+
+        Evento.objects.filter(pk=self.evento.pk).update(capacidad_maxima=2)
+        self.assertEqual(reservas.promover_lista_espera(self.evento.pk), 1)
+        self.assertEqual(self.confirmados(), {'ana', 'espera1'})
+
+    def test_aumentar_capacidad_promueve_en_orden(self):
+        self.poner_en_espera(5)
+        Evento.objects.filter(pk=self.evento.pk).update(capacidad_maxima=4)
+
+        self.assertEqual(reservas.promover_lista_espera(self.evento.pk), 3)
+        self.assertEqual(self.confirmados(), {'ana', 'espera0', 'espera1', 'espera2'})
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.confirmados, 4)
+        self.assertEqual(reservas.promover_lista_espera(self.evento.pk), 0)
+
+    def test_editar_evento_promueve(self):
+        self.poner_en_espera(2)
+        self.organizador.user_permissions.add(
+            Permission.objects.get(codename='change_evento')
+        )
+        self.client.force_login(self.organizador)
+        datos = {
+            campo: valor for campo, valor in Evento.objects.filter(pk=self.evento.pk).values(
+                'titulo', 'descripcion', 'tipo_evento', 'ubicacion', 'estado',
+                'privacidad', 'precio',
+            ).get().items()
+        }
+        datos.update(
+            capacidad_maxima=2, lista_espera='on',
+            fecha_inicio=timezone.localtime(self.evento.fecha_inicio).strftime('%Y-%m-%dT%H:%M'),
+            fecha_fin=timezone.localtime(self.evento.fecha_fin).strftime('%Y-%m-%dT%H:%M'),
+        )
+        self.client.post(reverse('eventos:editar', args=[self.evento.pk]), datos)
+        self.assertEqual(self.confirmados(), {'ana', 'espera0'})
+
+    def datos_admin(self, url):
+        """Datos POST de un formulario del admin (con sus inlines) tal como se muestra"""
+        respuesta = self.client.get(url)
+        formularios = [respuesta.context['adminform'].form]
+        datos = {}
+        for inline in respuesta.context['inline_admin_formsets']:
+            gestion = inline.formset.management_form
+            datos.update({gestion.add_prefix(k): v for k, v in gestion.initial.items()})
+            # Sin los formularios vacíos de alta
+            datos[gestion.add_prefix('TOTAL_FORMS')] = gestion.initial['INITIAL_FORMS']
+            formularios += inline.formset.initial_forms
+        for formulario in formularios:
+            for nombre, campo in formulario.fields.items():
+                valor = formulario[nombre].value()
+                if campo.widget.needs_multipart_form:
+                    # Sin fichero nuevo se conserva el actual
+                    continue
+                if hasattr(campo.widget, 'decompress'):
+                    for i, parte in enumerate(campo.widget.decompress(valor)):
+                        datos[f'{formulario.add_prefix(nombre)}_{i}'] = parte
+                elif valor is not None and valor is not False:
+                    datos[formulario.add_prefix(nombre)] = 'on' if valor is True else valor
+        return datos
+
+    def test_cancelar_en_el_admin_promueve(self):
+        self.poner_en_espera(2)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(admin)
+        registro = RegistroEvento.objects.get(usuario=self.ana)
+        url = reverse('admin:eventos_registroevento_change', args=[registro.pk])
+        datos = self.datos_admin(url)
+        datos['estado'] = 'cancelado'
+        self.assertEqual(self.client.post(url, datos).status_code, 302)
+        self.assertEqual(self.confirmados(), {'espera0'})
+
+        # Desde el inline de registros del evento
+        url = reverse('admin:eventos_evento_change', args=[self.evento.pk])
+        datos = self.datos_admin(url)
+        registro = RegistroEvento.objects.get(usuario__username='espera0')
+        prefijo, = [
+            clave[:-len('-id')] for clave, valor in datos.items()
+            if clave.endswith('-id') and str(valor) == str(registro.pk)
+        ]
+        datos[f'{prefijo}-estado'] = 'cancelado'
+        self.assertEqual(self.client.post(url, datos).status_code, 302)
+        self.assertEqual(self.confirmados(), {'espera1'})
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.confirmados, 1)
+        call_command('recalcular_plazas', '--verificar', stdout=StringIO())
+
+    def test_promocion_no_recorre_la_lista(self):
+        self.poner_en_espera(40)
+        Evento.objects.filter(pk=self.evento.pk).update(capacidad_maxima=2)
+        with CaptureQueriesContext(connection) as pocas:
+            reservas.promover_lista_espera(self.evento.pk)
+
+        Evento.objects.filter(pk=self.evento.pk).update(capacidad_maxima=12)
+        with CaptureQueriesContext(connection) as muchas:
+            self.assertEqual(reservas.promover_lista_espera(self.evento.pk), 10)
+        self.assertEqual(len(pocas), len(muchas))
+        # La lectura de la cola está limitada a las plazas libres
+        lectura, = [q['sql'] for q in muchas if 'ORDER BY' in q['sql']]
+        self.assertIn('LIMIT 10', lectura)
+
+
+class BusquedaTests(TestCase):
+    """Pruebas del índice de búsqueda de texto"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user('organizador')
+        self.concierto = crear_evento(
+            self.organizador, titulo='Concierto de música clásica',
+            descripcion='Orquesta sinfónica', ubicacion='Teatro Municipal'
+        )
+        self.charla = crear_evento(
+            self.organizador, titulo='Charla de tecnología',
+            descripcion='Incluye un breve concierto al cierre', ubicacion='Valparaíso'
+        )
+        self.buscador = obtener_buscador()
+
+    def buscar(self, texto):
+        return list(
+            self.buscador.buscar(Evento.objects.all(), texto)
+            .order_by('relevancia', '-fecha_inicio')
+        )
+
+    def test_sin_tildes_y_por_prefijo(self):
+        self.assertEqual(self.buscar('musica'), [self.concierto])
+        self.assertEqual(self.buscar('valpara'), [self.charla])
+        self.assertEqual(self.buscar('SINFON orquesta'), [self.concierto])
+
+    def test_resultados_ordenados_por_relevancia(self):
+        # El título pesa más que la descripción
+        self.assertEqual(self.buscar('concierto'), [self.concierto, self.charla])
+
+    def test_indice_sincronizado_con_cambios(self):
+        self.charla.titulo = 'Taller de robótica'
+        self.charla.save()
+        self.assertEqual(self.buscar('robotica'), [self.charla])
+        self.assertEqual(self.buscar('tecnologia'), [])
+
+        Evento.objects.filter(pk=self.charla.pk).update(ubicacion='Concepción')
+        self.assertEqual(self.buscar('concepcion'), [self.charla])
+
+        self.charla.delete()
+        self.assertEqual(self.buscar('robotica'), [])
+
+    def test_comando_reconstruir_busqueda(self):
+        call_command('reconstruir_busqueda', stdout=StringIO())
+        self.assertEqual(self.buscar('clasica'), [self.concierto])
+
+    def test_vista_lista_con_busqueda(self):
+        respuesta = self.client.get(reverse('eventos:lista'), {'search': 'música'})
+        self.assertEqual(list(respuesta.context['eventos']), [self.concierto])
+
+    def test_lista_ordenada_por_relevancia_con_la_paginacion_por_defecto(self):
+        # Por fecha la charla iría primero; por relevancia, el concierto
+        Evento.objects.filter(pk=self.charla.pk).update(
+            fecha_inicio=self.concierto.fecha_inicio + timedelta(days=1)
+        )
+        respuesta = self.client.get(reverse('eventos:lista'), {'search': 'concierto'})
+        self.assertEqual(list(respuesta.context['eventos']), [self.concierto, self.charla])
+        self.assertTrue(respuesta.context['paginacion_cursor'])
+
+    def test_busqueda_paginada_por_cursor(self):
+        for i in range(23):
+            crear_evento(self.organizador, titulo=f'Concierto {i}', descripcion='Gira')
+        url = reverse('eventos:lista')
+        ordenados = self.buscar('concierto')
+        respuesta = self.client.get(url, {'search': 'concierto'})
+        paginas = [respuesta.context['page_obj']]
+        while paginas[-1].has_next():
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(url, {'cursor': paginas[-1].cursor_siguiente})
+            paginas.append(respuesta.context['page_obj'])
+            # Las páginas profundas leen solo su tramo: sin OFFSET
+            self.assertTrue(any('LIMIT 11' in q['sql'] for q in consultas))
+            self.assertFalse(any('OFFSET' in q['sql'] for q in consultas))
+
+        self.assertEqual([e for pagina in paginas for e in pagina], ordenados)
+        self.assertEqual([len(p) for p in paginas], [10, 10, 5])
+        self.assertEqual(respuesta.context['search'], 'concierto')
+
+        respuesta = self.client.get(url, {'cursor': paginas[2].cursor_anterior})
+        self.assertEqual(list(respuesta.context['eventos']), list(paginas[1]))
+
+    @override_settings(EVENTOS_BUSQUEDA_MAXIMO=1)
+    def test_solo_los_mas_relevantes(self):
+        self.assertEqual(self.buscar('concierto'), [self.concierto])
+        # filtrar (API y admin) devuelve todas las coincidencias
+        coincidencias = self.buscador.filtrar(Evento.objects.all(), 'concierto')
+        self.assertEqual(set(coincidencias), {self.concierto, self.charla})
+
+    def pasos_busqueda(self, coincidencias):
+        """Instrucciones de SQLite para una página y el agregado de la lista"""
+        Evento.objects.bulk_create([
+            Evento(titulo=f'Concierto {i}', descripcion='concierto', ubicacion='Santiago',
+                   fecha_inicio=self.concierto.fecha_inicio, fecha_fin=self.concierto.fecha_fin,
+                   capacidad_maxima=10, organizador=self.organizador,
+                   tipo_evento=self.concierto.tipo_evento)
+            for i in range(coincidencias - Evento.objects.count())
+        ])
+        pasos = [0]
+
+        def contar():
+            pasos[0] += 1
+
+        connection.ensure_connection()
+        connection.connection.set_progress_handler(contar, 1)
+        try:
+            consulta = self.buscador.buscar(Evento.objects.all(), 'concierto')
+            list(consulta.order_by('relevancia')[:10])
+            consulta.order_by().aggregate(total=Count('pk'))
+        finally:
+            connection.connection.set_progress_handler(None, 1)
+        return pasos[0]
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 solo en SQLite')
+    @override_settings(EVENTOS_BUSQUEDA_MAXIMO=20)
+    def test_coste_no_crece_con_las_coincidencias(self):
+        # El MATCH se evalúa una vez por consulta: coste lineal, no cuadrático
+        pocas = self.pasos_busqueda(100)
+        muchas = self.pasos_busqueda(400)
+        self.assertLess(muchas, pocas * 5)
+
+
+class PaginacionCursorTests(TestCase):
+    """Pruebas de la paginación por cursor de la lista de eventos"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user('organizador')
+        base = timezone.now() + timedelta(days=1)
+        self.eventos = [
+            # Fechas repetidas para comprobar el desempate por id
+            crear_evento(self.organizador, titulo=f'Evento {i}',
+                         fecha_inicio=base + timedelta(days=i // 2))
+            for i in range(25)
+        ]
+        self.ordenados = sorted(
+            self.eventos, key=lambda e: (e.fecha_inicio, e.pk), reverse=True
+        )
+
+    def test_recorrer_paginas_adelante_y_atras(self):
+        paginador = PaginadorCursor(Evento.objects.all(), 10)
+        paginas = [paginador.pagina()]
+        while paginas[-1].has_next():
+            paginas.append(paginador.pagina(paginas[-1].cursor_siguiente))
+
+        vistos = [e for pagina in paginas for e in pagina]
+        self.assertEqual(vistos, self.ordenados)
+        self.assertEqual([len(p) for p in paginas], [10, 10, 5])
+        self.assertFalse(paginas[0].has_previous())
+
+        anterior = paginador.pagina(paginas[2].cursor_anterior)
+        self.assertEqual(list(anterior), list(paginas[1]))
+        primera = paginador.pagina(anterior.cursor_anterior)
+        self.assertEqual(list(primera), list(paginas[0]))
+        self.assertFalse(primera.has_previous())
+
+    def test_cursor_invalido_devuelve_primera_pagina(self):
+        paginador = PaginadorCursor(Evento.objects.all(), 10)
+        self.assertEqual(list(paginador.pagina('manipulado')), self.ordenados[:10])
+
+    def test_cursor_de_fecha_en_una_busqueda_vuelve_al_principio(self):
+        pagina = PaginadorCursor(Evento.objects.all(), 10).pagina()
+        busqueda = PaginadorCursor(
+            obtener_buscador().buscar(Evento.objects.all(), 'evento'), 10, por_relevancia=True
+        )
+        primera = busqueda.pagina(pagina.cursor_siguiente)
+        self.assertFalse(primera.has_previous())
+        self.assertEqual(list(primera), list(busqueda.pagina()))
+
+    def test_vista_conserva_filtros_en_el_cursor(self):
+        tipo = TipoEvento.objects.create(nombre='Taller')
+        Evento.objects.filter(pk__in=[e.pk for e in self.eventos[:12]]).update(tipo_evento=tipo)
+
+        respuesta = self.client.get(reverse('eventos:lista'), {'tipo': tipo.pk})
+        pagina = respuesta.context['page_obj']
+        self.assertTrue(pagina.has_next())
+
+        # El cursor lleva el filtro aunque no se repita en la URL
+        respuesta = self.client.get(reverse('eventos:lista'), {'cursor': pagina.cursor_siguiente})
+        self.assertEqual(len(respuesta.context['eventos']), 2)
+        self.assertEqual(respuesta.context['tipo_seleccionado'], str(tipo.pk))
+
+    @override_settings(EVENTOS_PAGINACION='offset')
+    def test_modo_offset(self):
+        respuesta = self.client.get(reverse('eventos:lista'), {'page': 3})
+        self.assertEqual(list(respuesta.context['eventos']), self.ordenados[20:])
+
+
+def plan_de_consulta(queryset):
+    """Líneas del EXPLAIN QUERY PLAN de SQLite para un queryset"""
+    return queryset.explain().splitlines()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Los planes de consulta son específicos de SQLite')
+class VisibilidadTests(TestCase):
+    """Pruebas de Evento.objects.visible_para y puede_ver_evento"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user('organizador')
+        self.organizador.user_permissions.add(
+            Permission.objects.get(codename='can_view_private_events')
+        )
+        self.asistente = User.objects.create_user('asistente')
+        self.admin = User.objects.create_user('admin')
+        self.admin.user_permissions.add(
+            Permission.objects.get(codename='can_manage_all_events')
+        )
+        otro = User.objects.create_user('otro')
+
+        self.publico = crear_evento(otro, titulo='Público')
+        self.borrador = crear_evento(otro, titulo='Borrador', estado='borrador')
+        self.propio = crear_evento(self.organizador, titulo='Propio', estado='borrador')
+        self.privado = crear_evento(otro, titulo='Privado', privacidad='privado')
+        self.privado_registrado = crear_evento(otro, titulo='Privado con registro', privacidad='privado')
+        for usuario in (self.organizador, self.asistente):
+            RegistroEvento.objects.create(
+                evento=self.privado_registrado, usuario=usuario, estado='confirmado'
+            )
+        # Un segundo registro en el mismo evento no debe duplicar resultados
+        RegistroEvento.objects.create(evento=self.privado_registrado, usuario=otro)
+
+    def visibles(self, usuario):
+        return set(Evento.objects.visible_para(usuario))
+
+    def test_reglas_por_tipo_de_usuario(self):
+        todos = {self.publico, self.borrador, self.propio, self.privado, self.privado_registrado}
+        self.assertEqual(self.visibles(AnonymousUser()), {self.publico})
+        self.assertEqual(self.visibles(self.asistente), {self.publico, self.privado_registrado})
+        self.assertEqual(
+            self.visibles(self.organizador),
+            {self.publico, self.borrador, self.propio, self.privado_registrado}
+        )
+        self.assertEqual(self.visibles(self.admin), todos)
+
+    def test_sin_duplicados(self):
+        ids = list(Evento.objects.visible_para(self.organizador).values_list('pk', flat=True))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_detalle_coincide_con_lista(self):
+        for usuario in (AnonymousUser(), self.asistente, self.organizador, self.admin):
+            usuario = User.objects.get(pk=usuario.pk) if usuario.pk else usuario
+            visibles = self.visibles(usuario)
+            for evento in Evento.objects.para_detalle(usuario):
+                self.assertEqual(
+                    evento.puede_ver_evento(usuario), evento in visibles,
+                    f'{usuario} / {evento.titulo}'
+                )
+                self.assertEqual(evento.visible, evento in visibles, f'{usuario} / {evento.titulo}')
+
+    def test_detalle_anota_registro_del_usuario(self):
+        eventos = Evento.objects.para_detalle(self.asistente)
+        self.assertEqual(eventos.get(pk=self.privado_registrado.pk).estado_registro, 'confirmado')
+        self.assertIsNone(eventos.get(pk=self.publico.pk).estado_registro)
+        self.assertIsNone(
+            Evento.objects.para_detalle(AnonymousUser()).get(pk=self.publico.pk).estado_registro
+        )
+
+    def test_plan_usa_indice_sin_distinct(self):
+        for usuario in (self.asistente, self.organizador):
+            plan = '\n'.join(plan_de_consulta(Evento.objects.visible_para(usuario)))
+            self.assertNotIn('DISTINCT', plan)
+            self.assertNotIn('SCAN eventos_registroevento', plan)
+            self.assertNotRegex(plan, r'SCAN U\d+\b(?! USING)')
+            self.assertIn('USING COVERING INDEX eventos_registroevento_usuario_id_evento_id', plan)
+
+    def test_lista_usa_indice_compuesto(self):
+        plan = '\n'.join(plan_de_consulta(
+            Evento.objects.visible_para(AnonymousUser()).order_by('-fecha_inicio', '-id')
+        ))
+        self.assertIn('USING INDEX evento_priv_estado_fecha_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_comando_verificar_indices(self):
+        salida = StringIO()
+        cache.clear()
+        call_command('verificar_indices', '--mostrar-planes', stdout=salida)
+        self.assertIn('Todas las consultas usan índices', salida.getvalue())
+        self.assertIn('[detalle (privado) / asistente]', salida.getvalue())
+        # Las páginas con los datos temporales no quedan en la caché real
+        self.assertIsNone(cache.get(CLAVE_GENERACION))
+
+
+class VentanasFechasTests(TestCase):
+    """Filtros por fechas (ventanas, rango y solapamiento) evaluados en SQL"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = User.objects.create_user('organizador')
+        self.ahora = timezone.now()
+        self.pasado = crear_evento(
+            self.organizador, titulo='Pasado', fecha_inicio=self.ahora - timedelta(days=3)
+        )
+        self.en_curso = crear_evento(
+            self.organizador, titulo='En curso', fecha_inicio=self.ahora - timedelta(hours=1)
+        )
+        self.proximo = crear_evento(
+            self.organizador, titulo='Próximo', fecha_inicio=self.ahora + timedelta(days=30)
+        )
+
+    def titulos(self, queryset):
+        return set(queryset.values_list('titulo', flat=True))
+
+    def test_ventanas_del_queryset(self):
+        self.assertEqual(self.titulos(Evento.objects.proximos()), {'Próximo'})
+        self.assertEqual(self.titulos(Evento.objects.en_curso()), {'En curso'})
+        # Rango por solapamiento: incluye el evento que empezó antes de ``desde``
+        self.assertEqual(
+            self.titulos(Evento.objects.en_rango(self.ahora, self.ahora + timedelta(days=1))),
+            {'En curso'},
+        )
+        self.assertEqual(
+            self.titulos(Evento.objects.en_rango(hasta=self.ahora)), {'Pasado', 'En curso'}
+        )
+        with self.assertRaises(ValueError):
+            Evento.objects.en_ventana('siempre')
+
+    def test_esta_semana_de_lunes_a_domingo(self):
+        miercoles = timezone.localtime(self.ahora).replace(hour=12, minute=0)
+        miercoles -= timedelta(days=miercoles.weekday() - 2)
+        lunes = miercoles.replace(hour=0) - timedelta(days=2)
+        crear_evento(self.organizador, titulo='Cruza el lunes', fecha_inicio=lunes - timedelta(hours=1))
+        crear_evento(self.organizador, titulo='Domingo', fecha_inicio=lunes + timedelta(days=6, hours=20))
+        crear_evento(self.organizador, titulo='Semana siguiente', fecha_inicio=lunes + timedelta(days=7))
+        semana = Evento.objects.esta_semana(miercoles).filter(titulo__in=[
+            'Cruza el lunes', 'Domingo', 'Semana siguiente',
+        ])
+        self.assertEqual(self.titulos(semana), {'Cruza el lunes', 'Domingo'})
+
+    def test_lista_filtra_y_conserva_filtros_en_el_cursor(self):
+        for i in range(12):
+            crear_evento(self.organizador, titulo=f'Futuro {i}', fecha_inicio=self.ahora + timedelta(days=i + 1))
+
+        respuesta = self.client.get(reverse('eventos:lista'), {'cuando': 'proximos'})
+        pagina = respuesta.context['page_obj']
+        self.assertEqual(respuesta.context['cuando'], 'proximos')
+        self.assertIn('cuando=proximos', respuesta.context['parametros_filtros'])
+        respuesta = self.client.get(reverse('eventos:lista'), {'cursor': pagina.cursor_siguiente})
+        vistos = list(pagina) + list(respuesta.context['eventos'])
+        self.assertEqual(len(vistos), 13)
+        self.assertTrue(all(evento.fecha_inicio > self.ahora for evento in vistos))
+
+        respuesta = self.client.get(reverse('eventos:lista'), {'cuando': 'ahora'})
+        self.assertEqual(list(respuesta.context['eventos']), [self.en_curso])
+
+        respuesta = self.client.get(reverse('eventos:lista'), {
+            'desde': (self.ahora - timedelta(days=4)).date().isoformat(),
+            'hasta': (self.ahora - timedelta(days=2)).date().isoformat(),
+        })
+        self.assertEqual(list(respuesta.context['eventos']), [self.pasado])
+
+        # Valores no válidos se ignoran en la lista, también fechas inexistentes
+        sin_filtros = list(self.client.get(reverse('eventos:lista')).context['eventos'])
+        for parametros in (
+            {'cuando': 'x', 'desde': 'ayer'}, {'desde': '2024-02-30'}, {'hasta': '2024-13-01T10:00'},
+        ):
+            respuesta = self.client.get(reverse('eventos:lista'), parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(list(respuesta.context['eventos']), sin_filtros)
+
+    def test_parsear_fecha(self):
+        self.assertEqual(
+            timezone.localtime(parsear_fecha('2024-02-29', fin_del_dia=True)).isoformat(),
+            '2024-02-29T23:59:59.999999-03:00',
+        )
+        for valor in ('ayer', '2024-02-30', '2024-13-01T10:00', '2024-01-01T25:00'):
+            with self.assertRaises(ParametroInvalido):
+                parsear_fecha(valor)
+
+    def test_api_y_admin(self):
+        respuesta = self.client.get(reverse('eventos:api_lista'), {'cuando': 'ahora'})
+        datos = json.loads(b''.join(respuesta.streaming_content))
+        self.assertEqual([e['titulo'] for e in datos], ['En curso'])
+        for parametros in ({'cuando': 'siempre'}, {'desde': '2024-02-30'}, {'hasta': '2024-13-01T10:00'}):
+            respuesta = self.client.get(reverse('eventos:api_lista'), parametros)
+            self.assertEqual(respuesta.status_code, 400)
+
+        # desde/hasta por solapamiento, como en la lista: incluye el evento en curso
+        rango = {
+            'desde': self.ahora.isoformat(), 'hasta': (self.ahora + timedelta(days=1)).isoformat(),
+        }
+        respuesta = self.client.get(reverse('eventos:api_lista'), rango)
+        datos = json.loads(b''.join(respuesta.streaming_content))
+        self.assertEqual([e['titulo'] for e in datos], ['En curso'])
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        changelist = reverse('admin:eventos_evento_changelist')
+        respuesta = self.client.get(changelist, {'cuando': 'proximos'})
+        self.assertEqual([e.titulo for e in respuesta.context['cl'].result_list], ['Próximo'])
+        respuesta = self.client.get(changelist, rango)
+        self.assertEqual([e.titulo for e in respuesta.context['cl'].result_list], ['En curso'])
+        self.assertContains(respuesta, 'Próximos 7 días')
+        respuesta = self.client.get(changelist, {'desde': '2024-02-30'})
+        self.assertRedirects(respuesta, changelist + '?e=1', fetch_redirect_response=False)
+
+    def test_conflictos_de_ubicacion(self):
+        otro = crear_evento(
+            self.organizador, titulo='Solapado',
+            fecha_inicio=self.proximo.fecha_inicio + timedelta(hours=1),
+        )
+        crear_evento(
+            self.organizador, titulo='Otra sala', ubicacion='Valparaíso',
+            fecha_inicio=self.proximo.fecha_inicio,
+        )
+        crear_evento(
+            self.organizador, titulo='Cancelado', estado='cancelado',
+            fecha_inicio=self.proximo.fecha_inicio,
+        )
+        crear_evento(
+            self.organizador, titulo='Justo después',
+            fecha_inicio=self.proximo.fecha_fin,
+        )
+        self.assertEqual(list(self.proximo.conflictos()), [otro])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Los planes de consulta son específicos de SQLite')
+    def test_conflictos_usan_el_indice_de_ubicacion(self):
+        plan = '\n'.join(plan_de_consulta(self.proximo.conflictos()))
+        self.assertIn('evento_ubicacion_fechas_idx (ubicacion=? AND fecha_fin>?)', plan)
+        plan = '\n'.join(plan_de_consulta(Evento.objects.en_curso().filter(estado='publicado')))
+        self.assertIn('evento_estado_fin_idx', plan)
+
+    def test_aviso_de_conflicto_al_crear(self):
+        self.organizador.user_permissions.add(Permission.objects.get(codename='add_evento'))
+        self.client.force_login(self.organizador)
+        inicio = timezone.localtime(self.proximo.fecha_inicio)
+        respuesta = self.client.post(reverse('eventos:crear'), {
+            'titulo': 'Nuevo',
+            'descripcion': 'Descripción',
+            'tipo_evento': self.proximo.tipo_evento_id,
+            'fecha_inicio': inicio.strftime('%Y-%m-%dT%H:%M'),
+            'fecha_fin': (inicio + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+            'ubicacion': 'Santiago',
+            'capacidad_maxima': 10,
+            'estado': 'publicado',
+            'privacidad': 'publico',
+            'precio': 0,
+        }, follow=True)
+        avisos = [str(m) for m in respuesta.context['messages']]
+        self.assertIn('Hay 1 eventos en "Santiago" que se solapan con este horario.', avisos)
+
+
+class PresupuestoConsultasEventosTests(PresupuestoConsultasMixin, TestCase):
+    """Las vistas de eventos no deben superar su presupuesto de consultas"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user('organizador')
+        self.organizador.user_permissions.add(
+            Permission.objects.get(codename='can_view_private_events'),
+            Permission.objects.get(codename='add_evento'),
+        )
+        for i in range(10):
+            evento = crear_evento(
+                User.objects.create_user(f'organizador{i}'),
+                titulo=f'Evento {i}',
+                tipo_evento=TipoEvento.objects.get_or_create(nombre=f'Tipo {i % 3}')[0],
+            )
+            RegistroEvento.objects.create(evento=evento, usuario=self.organizador, estado='confirmado')
+
+    def test_lista_anonimo(self):
+        respuesta = self.assertDentroDelPresupuesto('eventos:lista')
+        self.assertEqual(len(respuesta.context['eventos']), 10)
+
+    def test_lista_autenticado_con_filtros(self):
+        self.client.force_login(self.organizador)
+        self.assertDentroDelPresupuesto('eventos:lista')
+        self.assertDentroDelPresupuesto('eventos:lista', datos={'search': 'evento'})
+
+    def test_detalle(self):
+        evento = Evento.objects.filter(organizador__username='organizador0').get()
+        self.assertDentroDelPresupuesto('eventos:detalle', args=[evento.pk])
+        self.client.force_login(self.organizador)
+        respuesta = self.assertDentroDelPresupuesto('eventos:detalle', args=[evento.pk])
+        self.assertTrue(respuesta.context['esta_registrado'])
+
+    def test_detalle_en_una_consulta(self):
+        evento = Evento.objects.filter(organizador__username='organizador0').get()
+        url = reverse('eventos:detalle', args=[evento.pk])
+        self.client.force_login(self.organizador)
+        self.client.get(url)  # Llena la caché de permisos
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(url)
+        # Además de la sesión y el usuario, una sola consulta con evento, tipo,
+        # organizador, visibilidad y registro
+        consultas = [q['sql'] for q in capturadas if 'eventos_' in q['sql']]
+        self.assertEqual(len(consultas), 1, consultas)
+        self.assertEqual(len(capturadas), 3)
+        self.assertContains(respuesta, evento.organizador.username)
+        self.assertContains(respuesta, evento.tipo_evento.nombre)
+
+    def test_cabecera_server_timing(self):
+        respuesta = self.client.get(reverse('eventos:lista'))
+        self.assertRegex(respuesta['Server-Timing'], r'^sql;dur=[\d.]+;desc="\d+ consultas"')
+
+
+class AdminListadosTests(PresupuestoConsultasMixin, TestCase):
+    """Listados del admin con consultas acotadas, total estimado y búsqueda indexada"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(self.admin)
+        self.crear(3)
+
+    def crear(self, cantidad):
+        inicio = User.objects.count()
+        for i in range(inicio, inicio + cantidad):
+            usuario = User.objects.create_user(f'usuario{i}', email=f'usuario{i}@example.com')
+            evento = crear_evento(usuario, titulo=f'Congreso {i}')
+            RegistroEvento.objects.create(evento=evento, usuario=usuario)
+
+    def test_consultas_acotadas_por_pagina(self):
+        for nombre in ('admin:eventos_evento_changelist', 'admin:eventos_registroevento_changelist'):
+            antes = self.assertDentroDelPresupuesto(nombre).wsgi_request.consultas_sql.total
+            self.crear(20)
+            despues = self.assertDentroDelPresupuesto(nombre).wsgi_request.consultas_sql.total
+            self.assertEqual(antes, despues)
+
+    def test_busqueda_por_prefijo_y_titulo(self):
+        url = reverse('admin:eventos_registroevento_changelist')
+        respuesta = self.client.get(url, {'q': 'usuario1'})
+        self.assertEqual(respuesta.context['cl'].result_count, 1)
+        respuesta = self.client.get(url, {'q': 'usuario1@example'})
+        self.assertEqual(respuesta.context['cl'].result_count, 1)
+        respuesta = self.client.get(url, {'q': 'congreso'})
+        self.assertEqual(respuesta.context['cl'].result_count, 3)
+        # Solo prefijos: "suario" no está al principio del username
+        respuesta = self.client.get(url, {'q': 'suario1'})
+        self.assertEqual(respuesta.context['cl'].result_count, 0)
+        # Sin distinguir mayúsculas, como el icontains anterior
+        respuesta = self.client.get(url, {'q': 'USUARIO1@Example'})
+        self.assertEqual(respuesta.context['cl'].result_count, 1)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Los planes de consulta son específicos de SQLite')
+    def test_prefijo_usa_los_indices_en_minusculas(self):
+        plan = '\n'.join(plan_de_consulta(User.objects.filter(
+            filtro_prefijo('username', 'Usuario1') | filtro_prefijo('email', 'Usuario1')
+        )))
+        self.assertIn('usuarios_user_username_low_idx', plan)
+        self.assertIn('usuarios_user_email_low_idx', plan)
+
+    def test_paginador_estimado(self):
+        registros = RegistroEvento.objects.order_by('-pk')
+        paginador = PaginadorConteoEstimado(registros, 2)
+        self.assertEqual(paginador.count, 3)
+
+        paginador = PaginadorConteoEstimado(registros, 2)
+        paginador.umbral_estimacion = 0
+        ultimo = RegistroEvento.objects.order_by('-pk').first().pk
+        with self.assertNumQueries(1):
+            self.assertEqual(paginador.count, ultimo)
+
+        # Con filtros se cuenta, pero como mucho limite_conteo filas
+        paginador = PaginadorConteoEstimado(registros.filter(estado='pendiente'), 2)
+        paginador.limite_conteo = 2
+        self.assertEqual(paginador.count, 2)
+
+    def test_registros_del_evento_paginados(self):
+        evento = Evento.objects.first()
+        for i in range(60):
+            usuario = User.objects.create_user(f'asistente{i}')
+            RegistroEvento.objects.create(evento=evento, usuario=usuario)
+        url = reverse('admin:eventos_evento_change', args=[evento.pk])
+
+        respuesta = self.client.get(url)
+        registros, nuevos = respuesta.context['inline_admin_formsets']
+        self.assertEqual(len(registros.formset.forms), 50)
+        self.assertEqual(len(nuevos.formset.forms), 1)
+        consultas = respuesta.wsgi_request.consultas_sql.total
+        # Ningún <select> con todos los usuarios: solo las opciones de estado
+        self.assertNotContains(respuesta, f'<option value="{self.admin.pk}">')
+
+        respuesta = self.client.get(url, {'registros': 2})
+        registros = respuesta.context['inline_admin_formsets'][0]
+        self.assertEqual(len(registros.formset.forms), 11)
+        self.assertLessEqual(respuesta.wsgi_request.consultas_sql.total, consultas)
+
+        # Una página fuera de rango vuelve a la primera
+        respuesta = self.client.get(url, {'registros': 99})
+        registros = respuesta.context['inline_admin_formsets'][0]
+        self.assertEqual(registros.formset.pagina_registros.number, 1)
+
+    def test_autocompletado_por_prefijo(self):
+        url = reverse('admin:autocomplete')
+        parametros = {'app_label': 'eventos', 'model_name': 'registroevento'}
+        respuesta = self.client.get(url, {**parametros, 'field_name': 'usuario', 'term': 'usuario1'})
+        self.assertEqual([r['text'] for r in respuesta.json()['results']], ['usuario1'])
+        respuesta = self.client.get(url, {**parametros, 'field_name': 'usuario', 'term': 'suario'})
+        self.assertEqual(respuesta.json()['results'], [])
+        respuesta = self.client.get(url, {**parametros, 'field_name': 'evento', 'term': 'congreso'})
+        self.assertEqual(len(respuesta.json()['results']), 3)
+
+
+class CacheTarjetasTests(TestCase):
+    """Pruebas de la caché de fragmentos de las tarjetas de la lista"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = User.objects.create_user('organizador')
+        self.organizador.user_permissions.add(Permission.objects.get(codename='add_evento'))
+        self.evento = crear_evento(self.organizador, titulo='Título original')
+
+    def test_editar_evento_invalida_la_tarjeta(self):
+        self.assertContains(self.client.get(reverse('eventos:lista')), 'Título original')
+        self.evento.titulo = 'Título editado'
+        self.evento.save()
+        respuesta = self.client.get(reverse('eventos:lista'))
+        self.assertContains(respuesta, 'Título editado')
+        self.assertNotContains(respuesta, 'Título original')
+
+    def test_cambio_de_plazas_invalida_la_tarjeta(self):
+        self.assertContains(self.client.get(reverse('eventos:lista')), '10 plazas disponibles')
+        reservas.reservar_plaza(self.evento, User.objects.create_user('asistente'))
+        self.assertContains(self.client.get(reverse('eventos:lista')), '9 plazas disponibles')
+
+    def test_contenido_por_usuario_no_se_comparte(self):
+        self.client.force_login(self.organizador)
+        self.assertContains(self.client.get(reverse('eventos:lista')), 'Crear Evento')
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse('eventos:lista')), 'Crear Evento')
+
+
+class CacheAnonimaTests(TestCase):
+    """Pruebas de la caché de respuestas para visitantes anónimos"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = User.objects.create_user('organizador')
+        self.evento = crear_evento(self.organizador, titulo='Concierto')
+
+    def test_segunda_peticion_no_consulta_la_base_de_datos(self):
+        url = reverse('eventos:lista')
+        self.client.get(url, {'search': 'concierto', 'page': '1'})
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(url, {'page': '1', 'search': 'concierto'})
+        self.assertContains(respuesta, 'Concierto')
+        self.assertIn('Cookie', respuesta['Vary'])
+
+    def test_etag_y_peticion_condicional(self):
+        url = reverse('eventos:lista')
+        etag = self.client.get(url)['ETag']
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_cambios_invalidan_la_cache(self):
+        url = reverse('eventos:lista')
+        self.assertContains(self.client.get(url), 'Concierto')
+        self.evento.titulo = 'Seminario'
+        self.evento.save()
+        self.assertContains(self.client.get(url), 'Seminario')
+
+        RegistroEvento.objects.bulk_create([
+            RegistroEvento(evento=self.evento, usuario=self.organizador, estado='confirmado')
+        ])
+        self.assertContains(self.client.get(url), '9 plazas disponibles')
+
+    def test_usuarios_autenticados_no_usan_la_cache(self):
+        url = reverse('eventos:lista')
+        anonima = self.client.get(url)
+        self.client.force_login(self.organizador)
+        respuesta = self.client.get(url)
+        self.assertIsNotNone(respuesta.context)
+        # El ETag de la vista incluye al usuario: no coincide con la versión cacheada
+        self.assertNotEqual(respuesta['ETag'], anonima['ETag'])
+
+
+class GetCondicionalTests(TestCase):
+    """ETag en la lista y el detalle (eventos.condicional)"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = User.objects.create_user('organizador')
+        self.asistente = User.objects.create_user('asistente')
+        self.evento = crear_evento(self.organizador, titulo='Concierto')
+        self.detalle = reverse('eventos:detalle', args=[self.evento.pk])
+        self.lista = reverse('eventos:lista')
+
+    def get(self, url):
+        # La primera visita puede crear la cookie CSRF, que forma parte del ETag
+        self.client.get(url)
+        return self.client.get(url)
+
+    def revalidar(self, url, respuesta):
+        return self.client.get(url, headers={'If-None-Match': respuesta['ETag']})
+
+    def test_304_antes_de_renderizar(self):
+        self.client.force_login(self.asistente)
+        # Sesión, usuario y los validadores: el evento en el detalle; agregado,
+        # tipos y organizadores en la lista
+        for url, consultas in ((self.detalle, 3), (self.lista, 5)):
+            respuesta = self.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertTrue(respuesta['ETag'].startswith('W/'))
+            with CaptureQueriesContext(connection) as capturadas:
+                revalidada = self.revalidar(url, respuesta)
+            self.assertEqual(revalidada.status_code, 304)
+            self.assertIsNone(revalidada.context)
+            self.assertEqual(len(capturadas), consultas)
+
+    def test_cambios_renuevan_los_validadores(self):
+        otro = crear_evento(self.organizador, titulo='Seminario')
+        self.client.force_login(self.asistente)
+        detalle = self.get(self.detalle)
+        lista = self.get(self.lista)
+
+        # Una plaza ocupada cambia el detalle y la lista, no la fecha de edición
+        actualizacion = self.evento.fecha_actualizacion
+        reservas.reservar_plaza(self.evento, self.organizador)
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.fecha_actualizacion, actualizacion)
+        self.assertEqual(self.revalidar(self.detalle, detalle).status_code, 200)
+        self.assertEqual(self.revalidar(self.lista, lista).status_code, 200)
+
+        # Renombrar el tipo o el organizador cambia lo que muestran ambas páginas
+        for objeto, campo in ((self.evento.tipo_evento, 'nombre'), (self.organizador, 'username')):
+            detalle, lista = self.get(self.detalle), self.get(self.lista)
+            setattr(objeto, campo, 'Renombrado')
+            objeto.save()
+            self.assertEqual(self.revalidar(self.detalle, detalle).status_code, 200)
+            self.assertEqual(self.revalidar(self.lista, lista).status_code, 200)
+
+        # Un tipo nuevo solo aparece en el desplegable de la lista
+        lista = self.get(self.lista)
+        TipoEvento.objects.create(nombre='Feria')
+        self.assertEqual(self.revalidar(self.lista, lista).status_code, 200)
+
+        # Un evento que sale de la lista sin cambiar la última modificación
+        lista = self.get(self.lista)
+        Evento.objects.filter(pk=otro.pk).delete()
+        self.assertEqual(self.revalidar(self.lista, lista).status_code, 200)
+
+        # El registro del propio usuario también cambia su versión del detalle
+        detalle = self.get(self.detalle)
+        RegistroEvento.objects.create(evento=self.evento, usuario=self.asistente, estado='cancelado')
+        self.assertEqual(self.revalidar(self.detalle, detalle).status_code, 200)
+
+    @override_settings(EVENTOS_PAGINACION='offset')
+    def test_paginacion_numerada_reutiliza_el_total(self):
+        self.client.force_login(self.asistente)
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.get(self.lista)
+        self.assertEqual(respuesta.context['paginator'].count, 1)
+        self.assertFalse(any(q['sql'].startswith('SELECT COUNT(*)') for q in capturadas))
+        self.assertEqual(self.revalidar(self.lista, respuesta).status_code, 304)
+
+    def test_cada_usuario_tiene_su_version(self):
+        self.client.force_login(self.asistente)
+        respuesta = self.get(self.detalle)
+        self.assertFalse(respuesta.has_header('Last-Modified'))
+        self.client.force_login(self.organizador)
+        self.assertEqual(self.revalidar(self.detalle, respuesta).status_code, 200)
+
+    def test_anonimos_con_last_modified(self):
+        modificados = {}
+        for url in (self.lista, self.detalle):
+            respuesta = self.client.get(url)
+            modificados[url] = respuesta['Last-Modified']
+            # También desde la caché de respuestas anónimas
+            for _ in range(2):
+                revalidada = self.client.get(url, headers={'If-Modified-Since': modificados[url]})
+                self.assertEqual(revalidada.status_code, 304)
+                self.assertEqual(revalidada['ETag'], respuesta['ETag'])
+
+        # Las plazas no tocan fecha_actualizacion, pero sí la fecha de Last-Modified.
+        # If-Modified-Since tiene resolución de segundos: reservar en el segundo siguiente
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=1)):
+            reservas.reservar_plaza(self.evento, self.asistente)
+        for url, texto in ((self.lista, '9 plazas disponibles'), (self.detalle, '9 de 10 plazas')):
+            respuesta = self.client.get(url, headers={'If-Modified-Since': modificados[url]})
+            self.assertContains(respuesta, texto)
+            self.assertNotEqual(respuesta['Last-Modified'], modificados[url])
+
+    def test_mensajes_pendientes_sin_validadores(self):
+        self.client.force_login(self.asistente)
+        self.client.get(reverse('eventos:registrarse', args=[self.evento.pk]))
+        respuesta = self.client.get(self.detalle)
+        self.assertContains(respuesta, 'alert')
+        self.assertFalse(respuesta.has_header('ETag'))
+        self.assertTrue(self.client.get(self.detalle).has_header('ETag'))
+
+
+class CalendarioTests(TestCase):
+    """Pruebas de los calendarios iCalendar (eventos.calendario)"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = User.objects.create_user('organizador')
+        self.asistente = User.objects.create_user('asistente')
+        self.tipo = TipoEvento.objects.create(nombre='Taller')
+        self.publico = crear_evento(self.organizador, titulo='Concierto')
+        self.taller = crear_evento(User.objects.create_user('otro'), titulo='Taller', tipo_evento=self.tipo)
+        self.privado = crear_evento(self.organizador, titulo='Privado', privacidad='privado')
+        crear_evento(self.organizador, titulo='Borrador', estado='borrador')
+        RegistroEvento.objects.create(evento=self.privado, usuario=self.asistente, estado='confirmado')
+        RegistroEvento.objects.create(evento=self.taller, usuario=self.asistente, estado='cancelado')
+
+    def leer(self, url, **kwargs):
+        respuesta = self.client.get(url, **kwargs)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'text/calendar; charset=utf-8')
+        return respuesta, b''.join(respuesta.streaming_content).decode()
+
+    def resumenes(self, contenido):
+        return sorted(linea[8:] for linea in contenido.split('\r\n') if linea.startswith('SUMMARY:'))
+
+    def test_calendarios(self):
+        _, contenido = self.leer(reverse('eventos:calendario'))
+        self.assertTrue(contenido.startswith('BEGIN:VCALENDAR\r\nVERSION:2.0\r\n'))
+        self.assertTrue(contenido.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(self.resumenes(contenido), ['Concierto', 'Taller'])
+        self.assertIn(f'UID:evento-{self.publico.pk}@testserver', contenido)
+
+        _, contenido = self.leer(reverse('eventos:calendario_tipo', args=[self.tipo.pk]))
+        self.assertEqual(self.resumenes(contenido), ['Taller'])
+        _, contenido = self.leer(reverse('eventos:calendario_organizador', args=[self.organizador.pk]))
+        self.assertEqual(self.resumenes(contenido), ['Concierto'])
+
+    def test_calendario_personal(self):
+        url = calendario.enlace_usuario(self.asistente)
+        self.assertEqual(url, calendario.enlace_usuario(self.asistente))
+        # Sin sesión: solo los registros confirmados, también en eventos privados
+        _, contenido = self.leer(url)
+        self.assertEqual(self.resumenes(contenido), ['Privado'])
+
+        self.assertEqual(self.client.get(url.replace('.ics', 'x.ics')).status_code, 404)
+        otro = reverse('eventos:calendario_usuario', args=['x' + url.split('/')[-1][:-4]])
+        self.assertEqual(self.client.get(otro).status_code, 404)
+        self.client.force_login(self.asistente)
+        self.assertContains(self.client.get(reverse('usuarios:perfil')), url)
+
+        # Renovar la clave revoca el enlace anterior
+        respuesta = self.client.post(reverse('usuarios:renovar_calendario'), follow=True)
+        self.assertContains(respuesta, 'enlace anterior ya no funciona')
+        nuevo = calendario.enlace_usuario(self.asistente)
+        self.assertNotEqual(nuevo, url)
+        self.assertContains(respuesta, nuevo)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.resumenes(self.leer(nuevo)[1]), ['Privado'])
+        self.assertEqual(self.client.get(reverse('usuarios:renovar_calendario')).status_code, 405)
+
+    def test_bloques_cacheados_por_evento(self):
+        url = reverse('eventos:calendario')
+        self.leer(url)
+        with CaptureQueriesContext(connection) as capturadas:
+            _, contenido = self.leer(url)
+        # Agregado y tipos de los validadores y (id, fecha_actualizacion, tipo):
+        # ningún evento completo
+        self.assertEqual(len(capturadas), 3)
+
+        self.publico.titulo = 'Concierto aplazado'
+        self.publico.save()
+        with CaptureQueriesContext(connection) as capturadas:
+            _, contenido = self.leer(url)
+        # Solo se vuelve a leer el evento modificado
+        self.assertEqual(len(capturadas), 4)
+        self.assertIn(f'WHERE "eventos_evento"."id" IN ({self.publico.pk})', capturadas[-1]['sql'])
+        self.assertEqual(self.resumenes(contenido), ['Concierto aplazado', 'Taller'])
+
+        # Renombrar el tipo no cambia fecha_actualizacion pero sí CATEGORIES
+        self.tipo.nombre = 'Taller práctico'
+        self.tipo.save()
+        with CaptureQueriesContext(connection) as capturadas:
+            _, contenido = self.leer(url)
+        self.assertIn(f'WHERE "eventos_evento"."id" IN ({self.taller.pk})', capturadas[-1]['sql'])
+        self.assertIn('CATEGORIES:Taller práctico\r\n', contenido)
+
+    def test_get_condicional(self):
+        url = reverse('eventos:calendario')
+        respuesta, _ = self.leer(url)
+        revalidada = self.client.get(url, headers={'If-None-Match': respuesta['ETag']})
+        self.assertEqual(revalidada.status_code, 304)
+        # Renombrar un tipo no cambia fecha_actualizacion: no hay Last-Modified
+        self.assertFalse(respuesta.has_header('Last-Modified'))
+
+        self.tipo.nombre = 'Taller práctico'
+        self.tipo.save()
+        respuesta, _ = self.leer(url, headers={'If-None-Match': respuesta['ETag']})
+        Evento.objects.filter(pk=self.taller.pk).delete()
+        self.leer(url, headers={'If-None-Match': respuesta['ETag']})
+
+    def test_formato_rfc_5545(self):
+        self.publico.titulo = 'Rock, jazz; y blues'
+        self.publico.descripcion = 'Primera línea\nSegunda línea con acentos ' * 10
+        self.publico.save()
+        _, contenido = self.leer(reverse('eventos:calendario'))
+        self.assertIn('SUMMARY:Rock\\, jazz\\; y blues\r\n', contenido)
+        lineas = contenido.split('\r\n')
+        self.assertLessEqual(max(len(linea.encode()) for linea in lineas), 75)
+        # Al desplegar las continuaciones se recupera el texto original
+        desplegado = contenido.replace('\r\n ', '')
+        self.assertIn('DESCRIPTION:Primera línea\\nSegunda línea con acentos Primera', desplegado)
+
+
+class FinalizarEventosTests(TestCase):
+    """Pruebas del comando que finaliza por lotes los eventos terminados"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = User.objects.create_user('organizador')
+        self.asistente = User.objects.create_user('asistente')
+        pasado = timezone.now() - timedelta(days=2)
+        self.terminados = [
+            crear_evento(self.organizador, titulo=f'Terminado {i}', fecha_inicio=pasado - timedelta(days=i))
+            for i in range(3)
+        ]
+        self.futuro = crear_evento(self.organizador, titulo='Futuro')
+        self.borrador = crear_evento(self.organizador, estado='borrador', fecha_inicio=pasado)
+        for evento in self.terminados[:2]:
+            RegistroEvento.objects.create(evento=evento, usuario=self.asistente, estado='pendiente')
+        RegistroEvento.objects.create(evento=self.terminados[2], usuario=self.asistente, estado='confirmado')
+        RegistroEvento.objects.create(evento=self.futuro, usuario=self.asistente, estado='pendiente')
+        for usuario in (self.organizador, self.asistente):
+            estadisticas.obtener(usuario)
+
+    def ejecutar(self, *args):
+        salida = StringIO()
+        call_command('finalizar_eventos', *args, stdout=salida)
+        return salida.getvalue()
+
+    def test_finaliza_por_lotes_y_es_idempotente(self):
+        antes = {e.pk: e.fecha_actualizacion for e in self.terminados}
+        generacion_anterior = generacion()
+
+        salida = self.ejecutar('--lote', '2', '-v', '2')
+        self.assertEqual(salida.count('Lote:'), 2)
+        self.assertIn('3 eventos finalizados y 2 registros pendientes cancelados', salida)
+        self.assertIn('filas/s', salida)
+
+        for evento in Evento.objects.filter(pk__in=antes):
+            self.assertEqual(evento.estado, 'finalizado')
+            self.assertGreater(evento.fecha_actualizacion, antes[evento.pk])
+        self.assertEqual(Evento.objects.get(pk=self.futuro.pk).estado, 'publicado')
+        self.assertEqual(Evento.objects.get(pk=self.borrador.pk).estado, 'borrador')
+        estados = dict(
+            RegistroEvento.objects.values_list('evento_id', 'estado')
+        )
+        self.assertEqual(estados, {
+            self.terminados[0].pk: 'cancelado',
+            self.terminados[1].pk: 'cancelado',
+            self.terminados[2].pk: 'confirmado',
+            self.futuro.pk: 'pendiente',
+        })
+        self.assertGreater(generacion(), generacion_anterior)
+
+        # Contadores del perfil y plazas coherentes con las operaciones masivas
+        call_command('recalcular_estadisticas', '--verificar', stdout=StringIO())
+        call_command('recalcular_plazas', '--verificar', stdout=StringIO())
+        datos = estadisticas.obtener(self.asistente)
+        self.assertEqual((datos.registros_pendientes, datos.registros_cancelados), (1, 2))
+
+        # Una segunda pasada (o tras una interrupción) no encuentra nada más
+        self.assertIn('0 eventos finalizados', self.ejecutar())
+
+    def test_simular_no_modifica(self):
+        salida = self.ejecutar('--simular')
+        self.assertIn('3 eventos por finalizar con 2 registros pendientes', salida)
+        self.assertEqual(Evento.objects.filter(estado='finalizado').count(), 0)
+
+    def test_bucle_hasta_interrumpir(self):
+        with mock.patch('eventos.management.commands.finalizar_eventos.time.sleep',
+                        side_effect=KeyboardInterrupt) as dormir:
+            salida = self.ejecutar('--bucle', '--intervalo', '60')
+        dormir.assert_called_once_with(60)
+        self.assertIn('3 eventos finalizados', salida)
+        self.assertIn('Detenido', salida)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Los planes de consulta son específicos de SQLite')
+    def test_seleccion_usa_el_indice_estado_fin(self):
+        plan = '\n'.join(plan_de_consulta(
+            Evento.objects.por_finalizar().order_by('fecha_fin', 'id')[:500]
+        ))
+        self.assertIn('evento_estado_fin_idx (estado=? AND fecha_fin<?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ApiEventosTests(TestCase):
+    """Pruebas de la API de lectura de eventos"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user('organizador')
+        base = timezone.now() + timedelta(days=1)
+        self.cercano = crear_evento(self.organizador, titulo='Concierto', fecha_inicio=base)
+        self.lejano = crear_evento(
+            self.organizador, titulo='Seminario', fecha_inicio=base + timedelta(days=30)
+        )
+        crear_evento(self.organizador, titulo='Privado', privacidad='privado')
+
+    def contenido(self, respuesta):
+        return b''.join(respuesta.streaming_content).decode()
+
+    def test_json_visible_para_anonimos(self):
+        respuesta = self.client.get(reverse('eventos:api_lista'))
+        datos = json.loads(self.contenido(respuesta))
+        self.assertEqual([e['titulo'] for e in datos], ['Seminario', 'Concierto'])
+        self.assertEqual(datos[0]['plazas_disponibles'], 10)
+
+    def test_ndjson_con_campos_y_rango(self):
+        respuesta = self.client.get(reverse('eventos:api_lista'), {
+            'formato': 'ndjson',
+            'campos': 'id,organizador',
+            'hasta': (self.cercano.fecha_inicio + timedelta(days=1)).date().isoformat(),
+        })
+        self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+        lineas = [json.loads(linea) for linea in self.contenido(respuesta).splitlines()]
+        self.assertEqual(lineas, [{'id': self.cercano.pk, 'organizador': 'organizador'}])
+
+    def test_busqueda_y_parametros_invalidos(self):
+        respuesta = self.client.get(reverse('eventos:api_lista'), {'search': 'semin'})
+        self.assertEqual(len(json.loads(self.contenido(respuesta))), 1)
+        for parametros in ({'campos': 'clave'}, {'desde': 'ayer'}, {'formato': 'xml'}):
+            self.assertEqual(
+                self.client.get(reverse('eventos:api_lista'), parametros).status_code, 400
+            )
+
+
+class ExportacionRegistrosTests(TestCase):
+    """Pruebas de la exportación de registros a CSV y XLSX"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user('organizador')
+        self.evento = crear_evento(self.organizador, titulo='Taller')
+        for nombre in ('ana', 'luis'):
+            RegistroEvento.objects.create(
+                evento=self.evento,
+                usuario=User.objects.create_user(nombre, email=f'{nombre}@example.com'),
+                comentarios='Llegaré temprano',
+            )
+        self.url_csv = reverse('eventos:exportar_registros', args=[self.evento.pk, 'csv'])
+
+    def test_csv_en_streaming_para_el_organizador(self):
+        self.client.force_login(self.organizador)
+        respuesta = self.client.get(self.url_csv)
+        self.assertTrue(respuesta.streaming)
+        lineas = b''.join(respuesta.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lineas[0], 'Usuario,Email,Evento,Estado,Fecha de registro,Comentarios')
+        self.assertEqual(len(lineas), 3)
+        self.assertTrue(lineas[1].startswith('ana,ana@example.com,Taller,Pendiente,'))
+
+    def test_neutraliza_formulas(self):
+        RegistroEvento.objects.create(
+            evento=self.evento,
+            usuario=User.objects.create_user('-1+1', email='x@example.com'),
+            comentarios='=HYPERLINK("http://example.com","clic")',
+        )
+        self.client.force_login(self.organizador)
+        lineas = b''.join(self.client.get(self.url_csv).streaming_content).decode('utf-8-sig').splitlines()
+        fila = next(csv.reader([lineas[-1]]))
+        self.assertEqual(fila[0], "'-1+1")
+        self.assertEqual(fila[-1], "'=HYPERLINK(\"http://example.com\",\"clic\")")
+        self.assertEqual(exportacion.neutralizar('@SUMA(A1)'), "'@SUMA(A1)")
+        self.assertEqual(exportacion.neutralizar('Llegaré temprano'), 'Llegaré temprano')
+
+    def test_solo_organizador_o_administradores(self):
+        self.client.force_login(User.objects.create_user('ajeno'))
+        self.assertEqual(self.client.get(self.url_csv).status_code, 403)
+        self.client.force_login(self.organizador)
+        url = reverse('eventos:exportar_registros', args=[self.evento.pk, 'pdf'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @skipUnless(exportacion.xlsx_disponible(), 'openpyxl no está instalado')
+    def test_xlsx_en_modo_write_only(self):
+        import openpyxl
+
+        RegistroEvento.objects.filter(usuario__username='luis').update(comentarios='=1+1')
+        self.client.force_login(self.organizador)
+        url = reverse('eventos:exportar_registros', args=[self.evento.pk, 'xlsx'])
+        respuesta = self.client.get(url)
+        libro = openpyxl.load_workbook(BytesIO(b''.join(respuesta.streaming_content)))
+        filas = list(libro['Registros'].values)
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[2][:4], ('luis', 'luis@example.com', 'Taller', 'Pendiente'))
+        # Texto, no fórmula
+        self.assertEqual(filas[2][-1], "'=1+1")
+
+    def test_accion_del_admin(self):
+        admin = User.objects.create_superuser('admin', email='admin@example.com')
+        self.client.force_login(admin)
+        respuesta = self.client.post(reverse('admin:eventos_evento_changelist'), {
+            'action': 'exportar_asistentes_csv',
+            '_selected_action': [self.evento.pk],
+        })
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(b''.join(respuesta.streaming_content).splitlines()), 3)
+
+
+class ImportarEventosTests(TestCase):
+    """Pruebas del comando importar_eventos"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.organizador = User.objects.create_user('organizador')
+        TipoEvento.objects.create(nombre='Taller')
+
+    def archivo(self, nombre, contenido):
+        ruta = os.path.join(self.directorio.name, nombre)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        return ruta
+
+    def importar(self, ruta, modelo, *args):
+        salida, errores = StringIO(), StringIO()
+        call_command(
+            'importar_eventos', ruta, modelo=modelo, *args,
+            stdout=salida, stderr=errores,
+        )
+        return salida.getvalue(), errores.getvalue()
+
+    def test_importa_eventos_csv_en_lotes_y_reporta_errores(self):
+        ruta = self.archivo('eventos.csv', (
+            'titulo,descripcion,tipo,fecha_inicio,fecha_fin,ubicacion,capacidad_maxima,estado,organizador\n'
+            'Taller A,Desc,Taller,2030-01-01 10:00,2030-01-01 12:00,Santiago,20,publicado,organizador\n'
+            'Taller B,Desc,Taller,2030-01-02 10:00,2030-01-02 12:00,Santiago,,,organizador\n'
+            'Fechas,Desc,Taller,2030-01-02 10:00,2030-01-01 12:00,Santiago,5,publicado,organizador\n'
+            'Sin tipo,Desc,Charla,2030-01-02 10:00,2030-01-02 12:00,Santiago,5,publicado,organizador\n'
+        ))
+        salida, errores = self.importar(ruta, 'eventos', '--lote', '2', '--procesos', '0')
+        self.assertIn('2 filas importadas, 2 con errores', salida)
+        self.assertIn('Línea 4: fecha_fin', errores)
+        self.assertIn('Línea 5: tipo: no existe', errores)
+        taller_b = Evento.objects.get(titulo='Taller B')
+        self.assertEqual((taller_b.capacidad_maxima, taller_b.estado), (100, 'borrador'))
+        self.assertTrue(timezone.is_aware(taller_b.fecha_inicio))
+
+    def test_registros_jsonl_con_upsert_y_procesos(self):
+        evento = crear_evento(self.organizador)
+        for nombre in ('ana', 'luis'):
+            User.objects.create_user(nombre)
+        lineas = [
+            {'usuario': 'ana', 'evento': evento.pk, 'estado': 'confirmado'},
+            {'usuario': 'luis', 'evento': evento.pk, 'estado': 'pendiente'},
+        ]
+        ruta = self.archivo('registros.jsonl', '\n'.join(json.dumps(l) for l in lineas))
+        self.importar(ruta, 'registros', '--lote', '1', '--procesos', '2')
+        evento.refresh_from_db()
+        self.assertEqual(evento.confirmados, 1)
+
+        # Reimportar con cambios de estado actualiza en lugar de duplicar
+        lineas[1]['estado'] = 'confirmado'
+        ruta = self.archivo('registros.jsonl', '\n'.join(json.dumps(l) for l in lineas))
+        salida, _ = self.importar(ruta, 'registros', '--actualizar', '--procesos', '0')
+        self.assertIn('2 filas importadas, 0 con errores', salida)
+        self.assertEqual(RegistroEvento.objects.filter(evento=evento).count(), 2)
+        evento.refresh_from_db()
+        self.assertEqual(evento.confirmados, 2)
+
+    def test_actualizar_eventos_cambia_organizador_y_booleanos_en_minusculas(self):
+        anterior = User.objects.create_user('anterior')
+        evento = crear_evento(anterior)
+        self.assertEqual(estadisticas.obtener(anterior).eventos_organizados, 1)
+        self.assertEqual(estadisticas.obtener(self.organizador).eventos_organizados, 0)
+
+        ruta = self.archivo('eventos.csv', (
+            'id,titulo,descripcion,tipo,fecha_inicio,fecha_fin,ubicacion,lista_espera,organizador\n'
+            f'{evento.pk},Taller,Desc,Taller,2030-01-01 10:00,2030-01-01 12:00,Santiago,true,organizador\n'
+            ',Nuevo,Desc,Taller,2030-01-02 10:00,2030-01-02 12:00,Santiago,false,organizador\n'
+        ))
+        salida, errores = self.importar(ruta, 'eventos', '--actualizar', '--procesos', '0')
+        self.assertIn('2 filas importadas, 0 con errores', salida)
+        self.assertEqual(errores, '')
+
+        evento.refresh_from_db()
+        self.assertEqual(evento.organizador, self.organizador)
+        self.assertTrue(evento.lista_espera)
+        self.assertFalse(Evento.objects.get(titulo='Nuevo').lista_espera)
+        # Las filas de los dos organizadores se recalculan
+        self.assertEqual(estadisticas.obtener(anterior).eventos_organizados, 0)
+        self.assertEqual(estadisticas.obtener(self.organizador).eventos_organizados, 2)
+        call_command('recalcular_estadisticas', '--verificar', stdout=StringIO())
+
+    def test_opciones_invalidas(self):
+        with self.assertRaises(CommandError):
+            self.importar(os.path.join(self.directorio.name, 'no-existe.csv'), 'tipos')
+        ruta = self.archivo('tipos.jsonl', '{"nombre": "Charla"}\nno es json\n')
+        with self.assertRaises(CommandError):
+            self.importar(ruta, 'tipos', '--procesos', '0')
+
+
+class DatosSinteticosTests(TestCase):
+    """Pruebas de generar_datos y benchmark_vistas"""
+
+    def setUp(self):
+        cache.clear()
+        call_command(
+            'generar_datos', asistentes=20, organizadores=3, administradores=1,
+            tipos=2, eventos=30, registros=100, stdout=StringIO(),
+        )
+
+    def test_genera_volumenes_y_contadores_coherentes(self):
+        self.assertEqual(User.objects.filter(groups__name='Asistentes').count(), 20)
+        self.assertEqual(Evento.objects.count(), 30)
+        self.assertEqual(set(Evento.objects.values_list('privacidad', flat=True)), {'publico', 'privado'})
+        self.assertGreater(RegistroEvento.objects.count(), 0)
+        call_command('recalcular_plazas', verificar=True, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('generar_datos', stdout=StringIO())
+
+    def test_benchmark_guarda_y_compara_linea_base(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = os.path.join(directorio.name, 'base.json')
+        opciones = {'peticiones': 3, 'calentamiento': 0, 'escenarios': ['lista', 'perfil']}
+        cache.clear()
+        call_command('benchmark_vistas', guardar=ruta, stdout=StringIO(), **opciones)
+        with open(ruta, encoding='utf-8') as archivo:
+            base = json.load(archivo)['escenarios']
+        self.assertEqual(set(base), {'lista', 'perfil'})
+        self.assertEqual(base['lista']['errores'], 0)
+        # Las respuestas medidas se cachearon aparte, no en la caché real
+        self.assertIsNone(cache.get(CLAVE_GENERACION))
+
+        # Una base con menos consultas de las actuales es una regresión
+        base['lista']['consultas'] = 0
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump({'escenarios': base}, archivo)
+        with self.assertRaises(CommandError):
+            call_command('benchmark_vistas', comparar=ruta, stdout=StringIO(), **opciones)
+
+
+class ImagenesEventoTests(TestCase):
+    """Pruebas de las variantes de imagen y del srcset"""
+
+    def setUp(self):
+        cache.clear()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.organizador = User.objects.create_user('organizador')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.evento = crear_evento(self.organizador, imagen=self.imagen(1600, 900))
+        # El procesamiento queda programado para después del commit
+        self.assertIn('encolar.<locals>.enviar', [c.__qualname__ for c in callbacks])
+
+    @staticmethod
+    def imagen(ancho, alto):
+        contenido = BytesIO()
+        Image.new('RGB', (ancho, alto), 'purple').save(contenido, 'JPEG')
+        return SimpleUploadedFile('foto.jpg', contenido.getvalue(), content_type='image/jpeg')
+
+    def test_genera_variantes_con_nombre_por_contenido(self):
+        self.assertTrue(imagenes.procesar_imagen(self.evento.pk))
+        self.evento.refresh_from_db()
+        variantes = self.evento.imagen_variantes['variantes']
+        self.assertEqual([ancho for ancho, _ in variantes['webp']], [320, 640, 1024])
+        self.assertTrue(all(ruta.endswith('.jpg') for _, ruta in variantes['jpeg']))
+        self.assertFalse(imagenes.necesita_variantes(self.evento))
+
+        # La misma imagen en otro evento reutiliza los mismos ficheros
+        otro = crear_evento(self.organizador, imagen=self.imagen(1600, 900))
+        imagenes.procesar_imagen(otro.pk)
+        otro.refresh_from_db()
+        self.assertEqual(otro.imagen_variantes['variantes'], variantes)
+
+    def test_srcset_en_lista_y_detalle(self):
+        respuesta = self.client.get(reverse('eventos:detalle', args=[self.evento.pk]))
+        self.assertContains(respuesta, f'src="{self.evento.imagen.url}"')
+        self.assertNotContains(respuesta, 'srcset')
+
+        imagenes.procesar_imagen(self.evento.pk)
+        cache.clear()
+        for url in (reverse('eventos:lista'), reverse('eventos:detalle', args=[self.evento.pk])):
+            respuesta = self.client.get(url)
+            self.assertContains(respuesta, 'type="image/webp"')
+            self.assertContains(respuesta, '-320.webp 320w')
+            self.assertNotContains(respuesta, self.evento.imagen.url)
+
+    def test_comando_de_relleno(self):
+        salida = StringIO()
+        call_command('procesar_imagenes', hilos=0, stdout=salida)
+        self.assertIn('1 imágenes procesadas', salida.getvalue())
+        salida = StringIO()
+        call_command('procesar_imagenes', stdout=salida)
+        self.assertIn('Todas las imágenes tienen sus variantes', salida.getvalue())
+
+
+def recargar_urls():
+    """Vuelve a importar las URLs para aplicar EVENTOS_VISTAS_ASYNC"""
+    import event_platform.urls
+    import eventos.urls
+    importlib.reload(eventos.urls)
+    importlib.reload(event_platform.urls)
+    clear_url_caches()
+
+
+class VistasAsyncTests(TestCase):
+    """Pruebas de las vistas async (EVENTOS_VISTAS_ASYNC)"""
+
+    def setUp(self):
+        cache.clear()
+        ajustes = override_settings(EVENTOS_VISTAS_ASYNC=True)
+        ajustes.enable()
+        # Las limpiezas se ejecutan en orden inverso: primero restaurar el setting
+        self.addCleanup(recargar_urls)
+        self.addCleanup(ajustes.disable)
+        recargar_urls()
+
+        self.organizador = User.objects.create_user('organizador')
+        self.asistente = User.objects.create_user('asistente')
+        self.publico = crear_evento(self.organizador, titulo='Público')
+        self.privado = crear_evento(self.organizador, titulo='Privado', privacidad='privado')
+        self.oculto = crear_evento(self.organizador, titulo='Oculto', privacidad='privado')
+        RegistroEvento.objects.create(evento=self.privado, usuario=self.asistente)
+
+    async def test_lista_async_aplica_visibilidad(self):
+        url = reverse('eventos:lista')
+        self.assertTrue(iscoroutinefunction(resolve(url).func))
+        await self.async_client.aforce_login(self.asistente)
+        respuesta = await self.async_client.get(url)
+        self.assertEqual(
+            [evento.titulo for evento in respuesta.context['eventos']], ['Privado', 'Público']
+        )
+
+        # Anónimos: caché de respuestas también con la vista async
+        await self.async_client.alogout()
+        respuesta = await self.async_client.get(url)
+        self.assertContains(respuesta, 'Público')
+        self.assertNotContains(respuesta, 'Privado')
+        self.assertTrue(respuesta.has_header('ETag'))
+
+    async def test_detalle_async(self):
+        await self.async_client.aforce_login(self.asistente)
+        respuesta = await self.async_client.get(reverse('eventos:detalle', args=[self.privado.pk]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.context['esta_registrado'])
+        self.assertFalse(respuesta.context['puede_editar'])
+        respuesta = await self.async_client.get(reverse('eventos:detalle', args=[self.oculto.pk]))
+        self.assertEqual(respuesta.status_code, 404)
+
+    async def test_get_condicional_async(self):
+        await self.async_client.aforce_login(self.asistente)
+        for url in (reverse('eventos:lista'), reverse('eventos:detalle', args=[self.privado.pk])):
+            await self.async_client.get(url)  # Crea la cookie CSRF
+            respuesta = await self.async_client.get(url)
+            revalidada = await self.async_client.get(url, headers={'If-None-Match': respuesta['ETag']})
+            self.assertEqual(revalidada.status_code, 304)
+
+    async def test_registrarse_async(self):
+        await self.async_client.aforce_login(self.asistente)
+        respuesta = await self.async_client.get(reverse('eventos:registrarse', args=[self.publico.pk]))
+        self.assertRedirects(
+            respuesta, reverse('eventos:detalle', args=[self.publico.pk]),
+            fetch_redirect_response=False,
+        )
+        await self.publico.arefresh_from_db()
+        self.assertEqual(self.publico.confirmados, 1)
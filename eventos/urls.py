@@ -1,20 +1,46 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, calendario, views, vistas_async
+from .cache import cache_anonima
 
 app_name = 'eventos'
 
+# Lista, detalle e inscripción: versiones async para despliegues ASGI
+if settings.EVENTOS_VISTAS_ASYNC:
+    lista = vistas_async.ListaEventosAsyncView.as_view()
+    detalle = vistas_async.DetalleEventoAsyncView.as_view()
+    registrarse = vistas_async.registrarse_evento
+else:
+    lista = views.ListaEventosView.as_view()
+    detalle = views.DetalleEventoView.as_view()
+    registrarse = views.registrarse_evento
+
 urlpatterns = [
     # URLs principales
-    path('', views.ListaEventosView.as_view(), name='lista'),
+    path('', cache_anonima(lista), name='lista'),
     path('crear/', views.CrearEventoView.as_view(), name='crear'),
     path('mis-eventos/', views.MisEventosView.as_view(), name='mis_eventos'),
     
     # URLs específicas de eventos
-    path('<int:pk>/', views.DetalleEventoView.as_view(), name='detalle'),
+    path('<int:pk>/', cache_anonima(detalle), name='detalle'),
     path('<int:pk>/editar/', views.EditarEventoView.as_view(), name='editar'),
     path('<int:pk>/eliminar/', views.EliminarEventoView.as_view(), name='eliminar'),
     
     # URLs para registro de asistentes
-    path('<int:pk>/registrarse/', views.registrarse_evento, name='registrarse'),
+    path('<int:pk>/registrarse/', registrarse, name='registrarse'),
     path('<int:pk>/cancelar-registro/', views.cancelar_registro, name='cancelar_registro'),
+    path('<int:pk>/registros.<str:formato>', views.exportar_registros, name='exportar_registros'),
+    
+    # API de lectura (JSON / NDJSON en streaming)
+    path('api/eventos/', api.lista_eventos, name='api_lista'),
+    
+    # Calendarios iCalendar para suscribirse desde otras aplicaciones
+    path('calendario.ics', calendario.calendario, name='calendario'),
+    path('calendario/tipo/<int:tipo_id>.ics', calendario.calendario_tipo, name='calendario_tipo'),
+    path(
+        'calendario/organizador/<int:organizador_id>.ics',
+        calendario.calendario_organizador,
+        name='calendario_organizador',
+    ),
+    path('calendario/usuario/<str:token>.ics', calendario.calendario_usuario, name='calendario_usuario'),
 ]
\ No newline at end of file
@@ -1,3 +1,5 @@
+from functools import partial
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.auth.decorators import login_required
@@ -6,11 +8,16 @@ from django.views.generic import (
     UpdateView, DeleteView
 )
 from django.urls import reverse_lazy
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Q
 from django.http import Http404
+from django.utils.http import urlencode
 from django.core.exceptions import PermissionDenied
 from .models import Evento, TipoEvento, RegistroEvento
+from . import condicional, exportacion, reservas
+from .parametros import ParametroInvalido, parsear_fecha
+from .busqueda import obtener_buscador
+from .paginacion import PaginadorCursor, decodificar_cursor
 from django import forms
 
 # Formulario para crear/editar eventos
@@ -20,7 +27,7 @@ class EventoForm(forms.ModelForm):
         fields = [
             'titulo', 'descripcion', 'tipo_evento', 
             'fecha_inicio', 'fecha_fin', 'ubicacion', 
-            'capacidad_maxima', 'estado', 'privacidad', 
+            'capacidad_maxima', 'lista_espera', 'estado', 'privacidad', 
             'imagen', 'precio'
         ]
         widgets = {
@@ -45,6 +52,7 @@ class EventoForm(forms.ModelForm):
         self.fields['fecha_fin'].label = 'Fecha y Hora de Finalización'
         self.fields['ubicacion'].label = 'Ubicación'
         self.fields['capacidad_maxima'].label = 'Capacidad Máxima'
+        self.fields['lista_espera'].label = 'Lista de Espera'
         self.fields['estado'].label = 'Estado del Evento'
         self.fields['privacidad'].label = 'Privacidad'
         self.fields['imagen'].label = 'Imagen del Evento'
@@ -59,54 +67,147 @@ class ListaEventosView(ListView):
     paginate_by = 10
     
     def get_queryset(self):
-        queryset = Evento.objects.all()
+        # Eventos públicos y privados permitidos según el usuario
+        # (tipo y organizador se muestran en cada tarjeta: cargarlos en la misma consulta)
+        queryset = self.get_visibles().select_related('tipo_evento', 'organizador')
         
-        # Si el usuario no está autenticado, solo eventos públicos
-        if not self.request.user.is_authenticated:
-            queryset = queryset.filter(privacidad='publico', estado='publicado')
-        else:
-            # Si está autenticado, mostrar eventos públicos y privados permitidos
-            user = self.request.user
-            
-            # Administradores ven todo
-            if user.has_perm('eventos.can_manage_all_events'):
-                pass  # No filtrar nada
-            # Organizadores ven eventos públicos + sus eventos + eventos privados permitidos
-            elif user.has_perm('eventos.can_view_private_events'):
-                queryset = queryset.filter(
-                    Q(privacidad='publico') |
-                    Q(organizador=user) |
-                    Q(privacidad='privado', asistentes=user)
-                ).distinct()
-            # Asistentes ven solo eventos públicos + eventos privados donde están registrados
-            else:
-                queryset = queryset.filter(
-                    Q(privacidad='publico', estado='publicado') |
-                    Q(privacidad='privado', asistentes=user)
-                ).distinct()
-        
-        # Filtro por búsqueda
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(titulo__icontains=search) |
-                Q(descripcion__icontains=search) |
-                Q(ubicacion__icontains=search)
-            )
+        filtros = self.get_filtros()
         
         # Filtro por tipo
-        tipo = self.request.GET.get('tipo')
+        tipo = filtros['tipo']
         if tipo:
             queryset = queryset.filter(tipo_evento__id=tipo)
         
-        return queryset.order_by('-fecha_inicio')
+        # Ventana y rango de fechas (en SQL, sobre fecha_inicio y fecha_fin)
+        queryset = self.filtrar_fechas(queryset, filtros)
+        
+        # Filtro por búsqueda (índice de texto)
+        search = filtros['search']
+        if search:
+            # Los más relevantes primero (la clave del cursor de una búsqueda)
+            return obtener_buscador().buscar(queryset, search).order_by('relevancia', 'id')
+        
+        return queryset.order_by('-fecha_inicio', '-id')
+    
+    def filtrar_fechas(self, queryset, filtros):
+        """Aplica la ventana (``cuando``) y el rango ``desde``/``hasta`` válidos"""
+        cuando = filtros.get('cuando')
+        if cuando in dict(Evento.VENTANA_CHOICES):
+            queryset = queryset.en_ventana(cuando)
+        desde = self._fecha_filtro(filtros.get('desde'))
+        hasta = self._fecha_filtro(filtros.get('hasta'), fin_del_dia=True)
+        if desde or hasta:
+            # Eventos que transcurren en el rango, aunque empiecen antes
+            queryset = queryset.en_rango(desde, hasta)
+        return queryset
+    
+    @staticmethod
+    def _fecha_filtro(valor, fin_del_dia=False):
+        if not valor:
+            return None
+        try:
+            return parsear_fecha(valor, fin_del_dia)
+        except ParametroInvalido:
+            return None
+    
+    def get(self, request, *args, **kwargs):
+        # Un solo agregado decide si hace falta renderizar (GET condicional)
+        consulta = self.get_consulta_validadores()
+        # Los tipos del desplegable forman parte del ETag: se leen una sola vez
+        self.tipos_eventos = list(TipoEvento.objects.all())
+        agregado = condicional.datos_lista(consulta)
+        datos = self.get_datos_validadores(agregado, condicional.organizadores_lista(consulta))
+        validadores = condicional.validadores(
+            request, request.user, datos, condicional.modificacion_lista(agregado)
+        )
+        return condicional.responder(
+            request, validadores, partial(super().get, request, *args, **kwargs)
+        )
+    
+    def get_consulta_validadores(self):
+        """Filas de las que depende la página: las de la página o toda la lista"""
+        queryset = self.get_queryset()
+        if self.usa_cursor():
+            # get_queryset ya decodificó el cursor (get_filtros)
+            return self.get_paginador_cursor(queryset).consulta(self._cursor)
+        return queryset
+    
+    def get_datos_validadores(self, agregado, organizadores):
+        """Datos del ETag: agregado de los eventos, tipos y organizadores"""
+        if not self.usa_cursor():
+            # Con paginación numerada el total del agregado evita el COUNT(*)
+            self._total = agregado['total']
+        return [
+            agregado['ultima_modificacion'], agregado['total'], agregado['suma_ids'],
+            agregado['confirmados'], condicional.datos_tipos(self.tipos_eventos), organizadores,
+        ]
+    
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginador = super().get_paginator(queryset, per_page, **kwargs)
+        if getattr(self, '_total', None) is not None:
+            paginador.count = self._total
+        return paginador
+    
+    def get_visibles(self):
+        return Evento.objects.visible_para(self.request.user)
+    
+    def usa_cursor(self):
+        """Indica si la lista se pagina por cursor en lugar de por número de página"""
+        return self.cursor_activado()
+    
+    def get_paginador_cursor(self, queryset):
+        """Cursor por fecha o, en una búsqueda, por ``(relevancia, id)``"""
+        filtros = self.get_filtros()
+        return PaginadorCursor(
+            queryset, self.paginate_by, filtros, por_relevancia=bool(filtros['search'])
+        )
+    
+    def cursor_activado(self):
+        return getattr(settings, 'EVENTOS_PAGINACION', 'offset') == 'cursor'
+    
+    def get_filtros(self):
+        """Filtros activos: los del cursor si viene uno válido, si no los de la URL"""
+        if not hasattr(self, '_filtros'):
+            self._cursor = None
+            if self.cursor_activado():
+                self._cursor = decodificar_cursor(self.request.GET.get('cursor'))
+            if self._cursor:
+                self._filtros = self._cursor['q']
+            else:
+                self._filtros = {
+                    campo: self.request.GET.get(campo, '')
+                    for campo in ('search', 'tipo', 'cuando', 'desde', 'hasta')
+                }
+        return self._filtros
+    
+    def paginate_queryset(self, queryset, page_size):
+        if not self.usa_cursor():
+            return super().paginate_queryset(queryset, page_size)
+        
+        paginador = self.get_paginador_cursor(queryset)
+        pagina = paginador.pagina(self._cursor)
+        return paginador, pagina, pagina.object_list, pagina.has_other_pages()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['tipos_eventos'] = TipoEvento.objects.all()
-        context['search'] = self.request.GET.get('search', '')
-        context['tipo_seleccionado'] = self.request.GET.get('tipo', '')
+        context['tipos_eventos'] = self.tipos_eventos
+        context.update(self.get_contexto_filtros())
         return context
+    
+    def get_contexto_filtros(self):
+        """Filtros activos para el formulario y los enlaces de paginación"""
+        filtros = self.get_filtros()
+        return {
+            'search': filtros['search'],
+            'tipo_seleccionado': filtros['tipo'],
+            # Los cursores anteriores a los filtros de fecha no los incluyen
+            'cuando': filtros.get('cuando', ''),
+            'desde': filtros.get('desde', ''),
+            'hasta': filtros.get('hasta', ''),
+            'ventanas': Evento.VENTANA_CHOICES,
+            'parametros_filtros': urlencode({c: v for c, v in filtros.items() if v}),
+            'paginacion_cursor': self.usa_cursor(),
+        }
 
 # Vista temporal usando función (será reemplazada por la clase)
 def lista_eventos(request):
@@ -120,11 +221,26 @@ class DetalleEventoView(DetailView):
     template_name = 'eventos/detalle.html'
     context_object_name = 'evento'
     
+    def get_queryset(self):
+        # Evento, tipo, organizador, visibilidad y registro del usuario en una consulta
+        return Evento.objects.para_detalle(self.request.user)
+    
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        validadores = condicional.validadores(
+            request, request.user, condicional.datos_detalle(self.object),
+            condicional.modificacion_detalle(self.object),
+        )
+        return condicional.responder(
+            request, validadores,
+            lambda: self.render_to_response(self.get_context_data(object=self.object)),
+        )
+    
     def get_object(self, queryset=None):
         evento = super().get_object(queryset)
         
         # Verificar si el usuario puede ver este evento
-        if not evento.puede_ver_evento(self.request.user):
+        if not evento.visible:
             raise Http404("El evento no existe o no tienes permisos para verlo")
         
         return evento
@@ -133,21 +249,27 @@ class DetalleEventoView(DetailView):
         context = super().get_context_data(**kwargs)
         
         if self.request.user.is_authenticated:
-            # Verificar si el usuario ya está registrado
-            context['esta_registrado'] = RegistroEvento.objects.filter(
-                evento=self.object,
-                usuario=self.request.user,
-                estado='confirmado'
-            ).exists()
+            # Estado del registro del usuario (confirmado o en lista de espera)
+            context['esta_registrado'] = self.object.estado_registro == 'confirmado'
+            context['en_lista_espera'] = self.object.estado_registro == 'pendiente'
             
             # Verificar si puede editar el evento
             context['puede_editar'] = (
-                self.request.user == self.object.organizador or
+                self.request.user.pk == self.object.organizador_id or
                 self.request.user.has_perm('eventos.can_manage_all_events')
             )
         
         return context
 
+def avisar_conflictos(request, evento):
+    """Avisa (sin impedir el guardado) si la ubicación ya está ocupada en ese horario"""
+    conflictos = evento.conflictos().count()
+    if conflictos:
+        messages.warning(
+            request,
+            f'Hay {conflictos} eventos en "{evento.ubicacion}" que se solapan con este horario.'
+        )
+
 # Vista para crear eventos
 class CrearEventoView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     """Vista para crear nuevos eventos"""
@@ -164,7 +286,9 @@ class CrearEventoView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
             self.request, 
             f'El evento "{form.instance.titulo}" ha sido creado exitosamente.'
         )
-        return super().form_valid(form)
+        respuesta = super().form_valid(form)
+        avisar_conflictos(self.request, self.object)
+        return respuesta
     
     def form_invalid(self, form):
         messages.error(
@@ -197,7 +321,18 @@ class EditarEventoView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
             self.request, 
             f'El evento "{form.instance.titulo}" ha sido actualizado exitosamente.'
         )
-        return super().form_valid(form)
+        respuesta = super().form_valid(form)
+        if {'ubicacion', 'fecha_inicio', 'fecha_fin', 'estado'} & set(form.changed_data):
+            avisar_conflictos(self.request, self.object)
+        # Si aumentó la capacidad (o se activó la lista de espera) ceder las plazas
+        if {'capacidad_maxima', 'lista_espera'} & set(form.changed_data):
+            promovidos = reservas.promover_lista_espera(self.object.pk)
+            if promovidos:
+                messages.info(
+                    self.request,
+                    f'{promovidos} registros de la lista de espera han sido confirmados.'
+                )
+        return respuesta
 
 # Vista para eliminar eventos
 class EliminarEventoView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
@@ -237,53 +372,45 @@ def registrarse_evento(request, pk):
         messages.error(request, 'No tienes permisos para acceder a este evento.')
         return redirect('eventos:lista')
     
-    # Verificar si ya está registrado
-    registro_existente = RegistroEvento.objects.filter(
-        evento=evento,
-        usuario=request.user
-    ).first()
-    
-    if registro_existente:
-        if registro_existente.estado == 'confirmado':
-            messages.warning(request, 'Ya estás registrado en este evento.')
-        elif registro_existente.estado == 'cancelado':
-            # Reactivar registro
-            registro_existente.estado = 'confirmado'
-            registro_existente.save()
-            messages.success(request, 'Te has registrado exitosamente al evento.')
-        else:
-            messages.info(request, 'Tu registro está pendiente de confirmación.')
-    else:
-        # Verificar capacidad
-        if evento.plazas_disponibles <= 0:
-            messages.error(request, 'Este evento ha alcanzado su capacidad máxima.')
-            return redirect('eventos:detalle', pk=pk)
-        
-        # Crear nuevo registro
-        RegistroEvento.objects.create(
-            evento=evento,
-            usuario=request.user,
-            estado='confirmado'
-        )
-        messages.success(request, 'Te has registrado exitosamente al evento.')
+    # Reservar la plaza de forma atómica (sin leer antes las plazas disponibles)
+    resultado = reservas.reservar_plaza(evento, request.user)
+    notificar_reserva(request, resultado)
     
     return redirect('eventos:detalle', pk=pk)
 
+def notificar_reserva(request, resultado):
+    """Mensaje para el usuario según el resultado de ``reservas.reservar_plaza``"""
+    if resultado == reservas.CONFIRMADO:
+        messages.success(request, 'Te has registrado exitosamente al evento.')
+    elif resultado == reservas.YA_REGISTRADO:
+        messages.warning(request, 'Ya estás registrado en este evento.')
+    elif resultado == reservas.PENDIENTE:
+        messages.info(request, 'Tu registro está pendiente de confirmación.')
+    elif resultado == reservas.EN_ESPERA:
+        messages.info(
+            request,
+            'El evento está completo: te hemos añadido a la lista de espera y tu '
+            'registro se confirmará cuando se libere una plaza.'
+        )
+    else:
+        messages.error(request, 'Este evento ha alcanzado su capacidad máxima.')
+
 # Vista para cancelar registro a un evento
 @login_required
 def cancelar_registro(request, pk):
     """Vista para cancelar el registro a un evento"""
     evento = get_object_or_404(Evento, pk=pk)
     
+    # Confirmados o en lista de espera
     registro = get_object_or_404(
         RegistroEvento,
         evento=evento,
         usuario=request.user,
-        estado='confirmado'
+        estado__in=['confirmado', 'pendiente']
     )
     
-    registro.estado = 'cancelado'
-    registro.save()
+    # La plaza liberada pasa al primero de la lista de espera
+    reservas.cancelar_registro(registro)
     
     messages.success(request, f'Has cancelado tu registro al evento "{evento.titulo}".')
     return redirect('eventos:detalle', pk=pk)
@@ -303,3 +430,26 @@ class MisEventosView(LoginRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         context['puede_crear'] = self.request.user.has_perm('eventos.add_evento')
         return context
+
+# Vista para exportar los registros de un evento (organizador)
+@login_required
+def exportar_registros(request, pk, formato):
+    """Vista para descargar los registros de un evento en CSV o XLSX"""
+    evento = get_object_or_404(Evento, pk=pk)
+    
+    # Solo el organizador o administradores pueden ver los asistentes
+    if not (request.user == evento.organizador or
+            request.user.has_perm('eventos.can_manage_all_events')):
+        raise PermissionDenied("No tienes permisos para exportar los registros de este evento")
+    
+    registros = RegistroEvento.objects.filter(evento=evento)
+    nombre = f'registros-evento-{evento.pk}'
+    
+    if formato == 'csv':
+        return exportacion.respuesta_csv(registros, nombre)
+    if formato == 'xlsx' and exportacion.xlsx_disponible():
+        return exportacion.respuesta_xlsx(registros, nombre)
+    if formato == 'xlsx':
+        messages.error(request, 'La exportación a Excel no está disponible en este servidor.')
+        return redirect('eventos:detalle', pk=pk)
+    raise Http404("Formato de exportación no soportado")
@@ -0,0 +1,114 @@
+"""Vistas async de lista, detalle e inscripción para despliegues ASGI
+
+Son equivalentes a las de ``eventos.views`` pero usan el ORM async (``aget``,
+``acount``, iteración con ``async for``) y comprueban los permisos con
+``ahas_perm``, así que bajo ASGI una petición no ocupa un hilo mientras espera
+a la base de datos. Las plantillas se renderizan como siempre: Django ejecuta
+``TemplateResponse.render`` con sync_to_async.
+
+Se activan con ``EVENTOS_VISTAS_ASYNC`` (ver ``eventos/urls.py``).
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, redirect
+
+from . import condicional, reservas
+from .models import Evento, TipoEvento
+from .views import DetalleEventoView, ListaEventosView, notificar_reserva
+
+
+class ListaEventosAsyncView(ListaEventosView):
+    """ListaEventosView con consultas async"""
+
+    async def get(self, request, *args, **kwargs):
+        self.usuario = await request.auser()
+        self.visibles = await Evento.objects.avisible_para(self.usuario)
+        self.object_list = self.get_queryset()
+        consulta = self.get_consulta_validadores()
+        self.tipos_eventos = [tipo async for tipo in TipoEvento.objects.all()]
+        agregado = await condicional.adatos_lista(consulta)
+        datos = self.get_datos_validadores(
+            agregado, await condicional.aorganizadores_lista(consulta)
+        )
+        validadores = await condicional.avalidadores(
+            request, self.usuario, datos, condicional.modificacion_lista(agregado)
+        )
+        respuesta = condicional.no_modificado(request, validadores)
+        if respuesta is not None:
+            return respuesta
+
+        if self.usa_cursor():
+            paginador = self.get_paginador_cursor(self.object_list)
+            pagina = await paginador.apagina(self._cursor)
+        else:
+            paginador = self.get_paginator(self.object_list, self.paginate_by)
+            # El total sale del agregado de los validadores: el paginador no consulta
+            pagina = paginador.get_page(request.GET.get(self.page_kwarg))
+            pagina.object_list = [evento async for evento in pagina.object_list]
+
+        context = {
+            'paginator': paginador,
+            'page_obj': pagina,
+            'is_paginated': pagina.has_other_pages(),
+            'object_list': pagina.object_list,
+            self.context_object_name: pagina.object_list,
+            'view': self,
+            'tipos_eventos': self.tipos_eventos,
+            **self.get_contexto_filtros(),
+        }
+        return condicional.con_validadores(self.render_to_response(context), validadores)
+
+    def get_visibles(self):
+        return self.visibles
+
+
+class DetalleEventoAsyncView(DetalleEventoView):
+    """DetalleEventoView con consultas async"""
+
+    async def get(self, request, *args, **kwargs):
+        usuario = await request.auser()
+        visibles = await Evento.objects.apara_detalle(usuario)
+        try:
+            self.object = await visibles.aget(pk=kwargs['pk'])
+        except Evento.DoesNotExist:
+            raise Http404("El evento no existe")
+
+        if not self.object.visible:
+            raise Http404("El evento no existe o no tienes permisos para verlo")
+
+        validadores = await condicional.avalidadores(
+            request, usuario, condicional.datos_detalle(self.object),
+            condicional.modificacion_detalle(self.object),
+        )
+        respuesta = condicional.no_modificado(request, validadores)
+        if respuesta is not None:
+            return respuesta
+
+        context = {'evento': self.object, 'object': self.object, 'view': self}
+        if usuario.is_authenticated:
+            context['esta_registrado'] = self.object.estado_registro == 'confirmado'
+            context['en_lista_espera'] = self.object.estado_registro == 'pendiente'
+            context['puede_editar'] = (
+                usuario.pk == self.object.organizador_id or
+                await usuario.ahas_perm('eventos.can_manage_all_events')
+            )
+        return condicional.con_validadores(self.render_to_response(context), validadores)
+
+
+@login_required
+async def registrarse_evento(request, pk):
+    """Versión async de ``eventos.views.registrarse_evento``"""
+    usuario = await request.auser()
+    evento = await aget_object_or_404(Evento, pk=pk)
+
+    if not await evento.apuede_ver_evento(usuario):
+        messages.error(request, 'No tienes permisos para acceder a este evento.')
+        return redirect('eventos:lista')
+
+    # La reserva necesita una transacción, que el ORM async no admite
+    resultado = await sync_to_async(reservas.reservar_plaza)(evento, usuario)
+    notificar_reserva(request, resultado)
+
+    return redirect('eventos:detalle', pk=pk)
@@ -1,3 +1,28 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
 
-# Register your models here.
+from eventos.busqueda import filtro_prefijo
+from eventos.paginacion import PaginadorConteoEstimado
+
+
+# UserAdmin con búsqueda por índice: también la usan los campos autocomplete
+# de los registros de eventos
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UsuarioAdmin(UserAdmin):
+    search_fields = ['^username', '^email']
+    search_help_text = 'Inicio del username o del email'
+    paginator = PaginadorConteoEstimado
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        texto = search_term.strip()
+        if not texto:
+            return queryset, False
+        # Rango sobre los índices de LOWER(username) y LOWER(email) en lugar de LIKE '%...%'
+        return queryset.filter(
+            filtro_prefijo('username', texto) | filtro_prefijo('email', texto)
+        ), False
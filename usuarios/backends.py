@@ -0,0 +1,52 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.backends import ModelBackend
+
+from . import permisos
+
+
+class PermisosCacheadosBackend(ModelBackend):
+    """ModelBackend que resuelve los permisos desde la caché compartida
+
+    En estado estable ``has_perm`` no ejecuta ninguna consulta: los permisos del
+    usuario y de cada grupo se leen de ``usuarios.permisos``.
+    """
+
+    def _activo(self, user_obj, obj):
+        return user_obj.is_active and not user_obj.is_anonymous and obj is None
+
+    def get_user_permissions(self, user_obj, obj=None):
+        if not self._activo(user_obj, obj):
+            return set()
+        if user_obj.is_superuser:
+            return set(permisos.todos_los_permisos())
+        return set(permisos.datos_usuario(user_obj)['permisos'])
+
+    def get_group_permissions(self, user_obj, obj=None):
+        if not self._activo(user_obj, obj):
+            return set()
+        if user_obj.is_superuser:
+            return set(permisos.todos_los_permisos())
+        grupos = [pk for pk, _ in permisos.datos_usuario(user_obj)['grupos']]
+        return set(permisos.permisos_de_grupos(grupos))
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not self._activo(user_obj, obj):
+            return set()
+        # Caché por petición, igual que ModelBackend
+        if not hasattr(user_obj, '_perm_cache'):
+            user_obj._perm_cache = (
+                self.get_user_permissions(user_obj) | self.get_group_permissions(user_obj)
+            )
+        return user_obj._perm_cache
+
+    # Versiones async: ModelBackend consultaría la base de datos directamente
+    async def aget_user_permissions(self, user_obj, obj=None):
+        return await sync_to_async(self.get_user_permissions)(user_obj, obj)
+
+    async def aget_group_permissions(self, user_obj, obj=None):
+        return await sync_to_async(self.get_group_permissions)(user_obj, obj)
+
+    async def aget_all_permissions(self, user_obj, obj=None):
+        if hasattr(user_obj, '_perm_cache') or not self._activo(user_obj, obj):
+            return self.get_all_permissions(user_obj, obj)
+        return await sync_to_async(self.get_all_permissions)(user_obj, obj)
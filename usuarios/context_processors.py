@@ -0,0 +1,10 @@
+from .permisos import grupos_de
+
+
+def grupos_usuario(request):
+    """Grupos del usuario para la barra de navegación, desde la caché de permisos"""
+    usuario = getattr(request, 'user', None)
+    if usuario is None:
+        return {}
+    # Perezoso: solo se resuelve si la plantilla lo usa
+    return {'grupos_usuario': lambda: grupos_de(usuario)}
@@ -0,0 +1,176 @@
+"""Mantenimiento incremental de ``EstadisticasUsuario``
+
+Las rutas de escritura de ``eventos.models`` (guardar y eliminar eventos y
+registros, promoción de la lista de espera) ajustan los contadores con un
+UPDATE atómico sobre la fila del usuario, así que el perfil se dibuja con una
+sola consulta.
+
+Las operaciones masivas (``bulk_create`` y ``update`` de querysets) no
+reconstruyen cada fila: las eliminan (``invalidar``) y ``obtener`` las vuelve a
+calcular la próxima vez que se leen. El comando ``recalcular_estadisticas``
+repara cualquier desajuste.
+"""
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db.models import Count, Q
+
+from .models import EstadisticasUsuario
+
+# Estado del registro -> contador
+CAMPOS_REGISTRO = {
+    'pendiente': 'registros_pendientes',
+    'confirmado': 'registros_confirmados',
+    'cancelado': 'registros_cancelados',
+}
+CAMPOS = ['eventos_organizados', 'eventos_publicados', *CAMPOS_REGISTRO.values()]
+TAMANO_LOTE = 500
+
+
+def _ajustar(deltas):
+    """Aplica ``{usuario_id: Counter(campo -> delta)}``"""
+    for usuario_id, cambios in deltas.items():
+        EstadisticasUsuario.objects.filter(usuario_id=usuario_id).ajustar(**cambios)
+
+
+def registro_cambiado(anterior, actual):
+    """Ajusta los contadores entre dos estados (usuario_id, estado) de un registro
+
+    ``anterior`` es None para registros nuevos y ``actual`` para eliminados.
+    """
+    if anterior == actual:
+        return
+    deltas = defaultdict(Counter)
+    if anterior and anterior[1] in CAMPOS_REGISTRO:
+        deltas[anterior[0]][CAMPOS_REGISTRO[anterior[1]]] -= 1
+    if actual and actual[1] in CAMPOS_REGISTRO:
+        deltas[actual[0]][CAMPOS_REGISTRO[actual[1]]] += 1
+    _ajustar(deltas)
+
+
+def evento_cambiado(anterior, actual):
+    """Ajusta los contadores entre dos estados (organizador_id, estado) de un evento"""
+    if anterior == actual:
+        return
+    deltas = defaultdict(Counter)
+    if anterior:
+        deltas[anterior[0]]['eventos_organizados'] -= 1
+        deltas[anterior[0]]['eventos_publicados'] -= anterior[1] == 'publicado'
+    if actual:
+        deltas[actual[0]]['eventos_organizados'] += 1
+        deltas[actual[0]]['eventos_publicados'] += actual[1] == 'publicado'
+    _ajustar(deltas)
+
+
+def _por_cantidad(cantidades):
+    """Lotes ``(cantidad, usuario_ids)`` de usuarios con la misma cantidad"""
+    por_cantidad = defaultdict(list)
+    for usuario_id, cantidad in cantidades.items():
+        por_cantidad[cantidad].append(usuario_id)
+    for cantidad, ids in por_cantidad.items():
+        for inicio in range(0, len(ids), TAMANO_LOTE):
+            yield cantidad, ids[inicio:inicio + TAMANO_LOTE]
+
+
+def registros_movidos(usuario_ids, desde, hasta):
+    """Un registro pasó de ``desde`` a ``hasta`` por cada aparición del usuario
+
+    Un UPDATE por lote de usuarios con el mismo número de registros movidos
+    (normalmente uno solo).
+    """
+    for cantidad, ids in _por_cantidad(Counter(usuario_ids)):
+        EstadisticasUsuario.objects.filter(usuario_id__in=ids).ajustar(
+            **{CAMPOS_REGISTRO[desde]: -cantidad, CAMPOS_REGISTRO[hasta]: cantidad}
+        )
+
+
+def registros_eliminados(filas):
+    """Descuenta registros eliminados, dados como filas ``(usuario_id, estado, total)``
+
+    Un UPDATE por estado y lote de usuarios con el mismo total.
+    """
+    por_estado = defaultdict(Counter)
+    for usuario_id, estado, total in filas:
+        if estado in CAMPOS_REGISTRO:
+            por_estado[estado][usuario_id] += total
+    for estado, cantidades in por_estado.items():
+        for cantidad, ids in _por_cantidad(cantidades):
+            EstadisticasUsuario.objects.filter(usuario_id__in=ids).ajustar(
+                **{CAMPOS_REGISTRO[estado]: -cantidad}
+            )
+
+
+def invalidar(usuario_ids):
+    """Descarta las filas de estos usuarios; se recalculan al leerlas"""
+    usuario_ids = list(usuario_ids)
+    for inicio in range(0, len(usuario_ids), TAMANO_LOTE):
+        EstadisticasUsuario.objects.filter(
+            usuario_id__in=usuario_ids[inicio:inicio + TAMANO_LOTE]
+        ).delete()
+
+
+def calcular(usuario_ids):
+    """Estadísticas reales (sin guardar) de los usuarios indicados"""
+    Evento = apps.get_model('eventos', 'Evento')
+    RegistroEvento = apps.get_model('eventos', 'RegistroEvento')
+
+    resultado = {
+        usuario_id: EstadisticasUsuario(usuario_id=usuario_id) for usuario_id in usuario_ids
+    }
+    organizados = (
+        Evento.objects.filter(organizador_id__in=usuario_ids)
+        .order_by()
+        .values('organizador_id')
+        .annotate(total=Count('pk'), publicados=Count('pk', filter=Q(estado='publicado')))
+    )
+    for fila in organizados:
+        estadisticas = resultado[fila['organizador_id']]
+        estadisticas.eventos_organizados = fila['total']
+        estadisticas.eventos_publicados = fila['publicados']
+
+    registros = (
+        RegistroEvento.objects.filter(usuario_id__in=usuario_ids)
+        .order_by()
+        .values('usuario_id', 'estado')
+        .annotate(total=Count('pk'))
+    )
+    for fila in registros:
+        campo = CAMPOS_REGISTRO.get(fila['estado'])
+        if campo:
+            setattr(resultado[fila['usuario_id']], campo, fila['total'])
+    return resultado
+
+
+def reconstruir(usuario_ids):
+    """Recalcula y guarda las filas de estos usuarios; devuelve las estadísticas"""
+    calculadas = calcular(list(usuario_ids))
+    EstadisticasUsuario.objects.bulk_create(
+        calculadas.values(),
+        update_conflicts=True,
+        unique_fields=['usuario'],
+        update_fields=CAMPOS,
+    )
+    return calculadas
+
+
+def obtener(usuario):
+    """Fila de estadísticas del usuario (la reconstruye si no existe)"""
+    estadisticas = EstadisticasUsuario.objects.filter(usuario_id=usuario.pk).first()
+    if estadisticas is None:
+        estadisticas = reconstruir([usuario.pk])[usuario.pk]
+    return estadisticas
+
+
+def lotes_de_usuarios(usuario_ids=None):
+    """Ids de usuario en lotes de TAMANO_LOTE (todos si no se indican)"""
+    if usuario_ids is None:
+        usuario_ids = User.objects.order_by('pk').values_list('pk', flat=True).iterator()
+    lote = []
+    for usuario_id in usuario_ids:
+        lote.append(usuario_id)
+        if len(lote) == TAMANO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
@@ -0,0 +1 @@
+# Archivo para que Python reconozca la carpeta como módulo
\ No newline at end of file
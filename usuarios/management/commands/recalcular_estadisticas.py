@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios import estadisticas
+from usuarios.models import EstadisticasUsuario
+
+
+class Command(BaseCommand):
+    help = 'Reconstruir y verificar las estadísticas desnormalizadas de los usuarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo comprobar las estadísticas sin modificarlas (falla si hay diferencias)',
+        )
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            action='append',
+            dest='usuarios',
+            help='ID de un usuario concreto (se puede repetir)',
+        )
+
+    def handle(self, *args, **options):
+        diferencias = revisados = 0
+        for lote in estadisticas.lotes_de_usuarios(options['usuarios']):
+            reales = estadisticas.calcular(lote)
+            guardadas = EstadisticasUsuario.objects.in_bulk(lote)
+            for usuario_id, real in reales.items():
+                guardada = guardadas.get(usuario_id)
+                # Las filas ausentes no son un desajuste: se calculan al leerlas
+                if guardada is None:
+                    continue
+                cambios = [
+                    f'{campo}={getattr(guardada, campo)}->{getattr(real, campo)}'
+                    for campo in estadisticas.CAMPOS
+                    if getattr(guardada, campo) != getattr(real, campo)
+                ]
+                if cambios:
+                    diferencias += 1
+                    self.stdout.write(f'Usuario {usuario_id}: {", ".join(cambios)}')
+            if not options['verificar']:
+                estadisticas.reconstruir(lote)
+            revisados += len(lote)
+
+        if options['verificar']:
+            if diferencias:
+                raise CommandError(f'{diferencias} usuarios con estadísticas desajustadas')
+            self.stdout.write(self.style.SUCCESS('Todas las estadísticas son correctas'))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Estadísticas recalculadas para {revisados} usuarios '
+                f'({diferencias} tenían diferencias)'
+            )
+        )
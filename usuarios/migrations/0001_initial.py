@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticasUsuario',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('eventos_organizados', models.PositiveIntegerField(default=0, verbose_name='Eventos organizados')),
+                ('eventos_publicados', models.PositiveIntegerField(default=0, verbose_name='Eventos publicados')),
+                ('registros_pendientes', models.PositiveIntegerField(default=0, verbose_name='Registros pendientes')),
+                ('registros_confirmados', models.PositiveIntegerField(default=0, verbose_name='Registros confirmados')),
+                ('registros_cancelados', models.PositiveIntegerField(default=0, verbose_name='Registros cancelados')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de Usuario',
+                'verbose_name_plural': 'Estadísticas de Usuarios',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+INDICE = models.Index(fields=['email'], name='usuarios_user_email_idx')
+
+
+def crear_indice(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), INDICE)
+
+
+def eliminar_indice(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), INDICE)
+
+
+class Migration(migrations.Migration):
+    """Índice sobre auth_user.email para la búsqueda por prefijo del admin
+
+    El modelo User pertenece a django.contrib.auth, así que el índice no puede
+    ir en Meta.indexes: se crea con el schema editor, que genera el SQL de
+    cada base de datos.
+    """
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
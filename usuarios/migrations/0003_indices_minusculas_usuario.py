@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+INDICE_EMAIL = models.Index(fields=['email'], name='usuarios_user_email_idx')
+INDICES = [
+    models.Index(Lower('username'), name='usuarios_user_username_low_idx'),
+    models.Index(Lower('email'), name='usuarios_user_email_low_idx'),
+]
+
+
+def crear_indices(apps, schema_editor):
+    usuario = apps.get_model('auth', 'User')
+    schema_editor.remove_index(usuario, INDICE_EMAIL)
+    for indice in INDICES:
+        schema_editor.add_index(usuario, indice)
+
+
+def eliminar_indices(apps, schema_editor):
+    usuario = apps.get_model('auth', 'User')
+    for indice in INDICES:
+        schema_editor.remove_index(usuario, indice)
+    schema_editor.add_index(usuario, INDICE_EMAIL)
+
+
+class Migration(migrations.Migration):
+    """Índices sobre LOWER(username) y LOWER(email) de auth_user
+
+    La búsqueda por prefijo del admin (``eventos.busqueda.filtro_prefijo``) no
+    distingue mayúsculas: compara un rango sobre estas expresiones. Sustituyen
+    al índice sobre email de la migración 0002.
+    """
+
+    dependencies = [
+        ('usuarios', '0002_indice_email_usuario'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:28
+
+import django.db.models.deletion
+import usuarios.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('usuarios', '0003_indices_minusculas_usuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveCalendario',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='clave_calendario', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('clave', models.CharField(default=usuarios.models.generar_clave_calendario, max_length=32, verbose_name='Clave')),
+            ],
+            options={
+                'verbose_name': 'Clave de Calendario',
+                'verbose_name_plural': 'Claves de Calendario',
+            },
+        ),
+    ]
@@ -1,3 +1,78 @@
+from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.crypto import get_random_string
 
-# Create your models here.
+
+# QuerySet con ajustes atómicos de los contadores
+class EstadisticasUsuarioQuerySet(models.QuerySet):
+    """Operaciones sobre los contadores de EstadisticasUsuario"""
+
+    def ajustar(self, **deltas):
+        """Suma (o resta) cada delta a su contador con un único UPDATE
+
+        Las filas que no existen no se crean: se reconstruyen al leerlas.
+        """
+        cambios = {
+            campo: Greatest(F(campo) + delta, 0) if delta < 0 else F(campo) + delta
+            for campo, delta in deltas.items() if delta
+        }
+        if not cambios:
+            return 0
+        return self.update(**cambios)
+
+
+# Estadísticas desnormalizadas que muestra el perfil
+class EstadisticasUsuario(models.Model):
+    """Contadores por usuario mantenidos de forma incremental (ver usuarios/estadisticas.py)"""
+
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='estadisticas',
+        verbose_name="Usuario"
+    )
+    eventos_organizados = models.PositiveIntegerField(default=0, verbose_name="Eventos organizados")
+    eventos_publicados = models.PositiveIntegerField(default=0, verbose_name="Eventos publicados")
+    registros_pendientes = models.PositiveIntegerField(default=0, verbose_name="Registros pendientes")
+    registros_confirmados = models.PositiveIntegerField(default=0, verbose_name="Registros confirmados")
+    registros_cancelados = models.PositiveIntegerField(default=0, verbose_name="Registros cancelados")
+
+    objects = EstadisticasUsuarioQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Estadísticas de Usuario"
+        verbose_name_plural = "Estadísticas de Usuarios"
+
+    def __str__(self):
+        return f"Estadísticas de {self.usuario_id}"
+
+
+def generar_clave_calendario():
+    return get_random_string(32)
+
+
+# Secreto del enlace al calendario personal (eventos.calendario.enlace_usuario)
+class ClaveCalendario(models.Model):
+    """Clave con la que se firma el enlace al calendario .ics del usuario
+
+    Renovarla invalida el enlace anterior.
+    """
+
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='clave_calendario',
+        verbose_name="Usuario"
+    )
+    clave = models.CharField(max_length=32, default=generar_clave_calendario, verbose_name="Clave")
+
+    class Meta:
+        verbose_name = "Clave de Calendario"
+        verbose_name_plural = "Claves de Calendario"
+
+    def __str__(self):
+        return f"Clave de calendario de {self.usuario_id}"
@@ -0,0 +1,116 @@
+"""Caché compartida de permisos y grupos de los usuarios
+
+Los permisos de cada grupo (los que crea ``configurar_grupos``) se resuelven
+una sola vez a un ``frozenset`` de cadenas ``"app.codename"`` y se guardan en la
+caché por grupo. De cada usuario solo se guardan sus permisos directos y los
+grupos a los que pertenece, así que cambiar los permisos de un grupo no obliga
+a invalidar a todos sus miembros.
+
+Las señales de ``usuarios.signals`` invalidan las entradas afectadas; los
+cambios que no permiten saber qué entradas tocar (borrar grupos o permisos,
+``clear()`` desde el lado inverso...) incrementan la versión global.
+"""
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+
+TIEMPO_CACHE = 60 * 60
+CLAVE_VERSION = 'permisos:version'
+
+
+def version():
+    return cache.get_or_set(CLAVE_VERSION, 1, None)
+
+
+def invalidar_todo():
+    """Invalida todas las entradas de permisos incrementando la versión"""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, 2, None)
+
+
+def _clave_usuario(usuario_id, v):
+    return f'permisos:v{v}:usuario:{usuario_id}'
+
+
+def _clave_grupo(grupo_id, v):
+    return f'permisos:v{v}:grupo:{grupo_id}'
+
+
+def _clave_todos(v):
+    return f'permisos:v{v}:todos'
+
+
+def invalidar_usuarios(usuario_ids):
+    v = version()
+    cache.delete_many([_clave_usuario(pk, v) for pk in usuario_ids])
+
+
+def invalidar_grupos(grupo_ids):
+    v = version()
+    cache.delete_many([_clave_grupo(pk, v) for pk in grupo_ids])
+
+
+def _como_cadenas(permisos):
+    return frozenset(f'{app}.{codename}' for app, codename in permisos)
+
+
+def datos_usuario(usuario):
+    """Permisos directos y grupos ``(id, nombre)`` del usuario, desde la caché"""
+    v = version()
+    clave = _clave_usuario(usuario.pk, v)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = {
+            'permisos': _como_cadenas(
+                Permission.objects
+                .filter(user=usuario)
+                .values_list('content_type__app_label', 'codename')
+            ),
+            'grupos': tuple(usuario.groups.order_by('pk').values_list('pk', 'name')),
+        }
+        cache.set(clave, datos, TIEMPO_CACHE)
+    return datos
+
+
+def permisos_de_grupos(grupo_ids):
+    """Unión de los permisos de los grupos indicados, resolviendo cada grupo una vez"""
+    if not grupo_ids:
+        return frozenset()
+    v = version()
+    claves = {_clave_grupo(pk, v): pk for pk in grupo_ids}
+    encontrados = cache.get_many(claves)
+
+    faltantes = [pk for clave, pk in claves.items() if clave not in encontrados]
+    if faltantes:
+        por_grupo = {pk: set() for pk in faltantes}
+        for grupo_id, app, codename in (
+            Permission.objects
+            .filter(group__in=faltantes)
+            .values_list('group', 'content_type__app_label', 'codename')
+        ):
+            por_grupo[grupo_id].add(f'{app}.{codename}')
+        nuevos = {_clave_grupo(pk, v): frozenset(p) for pk, p in por_grupo.items()}
+        cache.set_many(nuevos, TIEMPO_CACHE)
+        encontrados.update(nuevos)
+
+    return frozenset().union(*encontrados.values())
+
+
+def todos_los_permisos():
+    """Todos los permisos del sistema (los que tiene un superusuario)"""
+    v = version()
+    permisos = cache.get(_clave_todos(v))
+    if permisos is None:
+        permisos = _como_cadenas(
+            Permission.objects.values_list('content_type__app_label', 'codename')
+        )
+        cache.set(_clave_todos(v), permisos, TIEMPO_CACHE)
+    return permisos
+
+
+def grupos_de(usuario):
+    """Grupos del usuario como instancias de Group (sin consultar la base de datos)"""
+    if not usuario.is_authenticated:
+        return []
+    return [Group(pk=pk, name=nombre) for pk, nombre in datos_usuario(usuario)['grupos']]
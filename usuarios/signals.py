@@ -0,0 +1,69 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import permisos
+from .models import ClaveCalendario, EstadisticasUsuario
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidar_permisos_usuario(sender, instance, action, reverse, pk_set, **kwargs):
+    """Cambios en los grupos o permisos directos de usuarios"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        permisos.invalidar_usuarios([instance.pk])
+    elif pk_set:
+        permisos.invalidar_usuarios(pk_set)
+    else:
+        # clear() desde el grupo/permiso: no sabemos qué usuarios cambiaron
+        permisos.invalidar_todo()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidar_permisos_grupo(sender, instance, action, reverse, pk_set, **kwargs):
+    """Cambios en los permisos asignados a los grupos"""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        permisos.invalidar_grupos([instance.pk])
+    elif pk_set:
+        permisos.invalidar_grupos(pk_set)
+    else:
+        permisos.invalidar_todo()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidar_por_catalogo(sender, **kwargs):
+    """Altas, renombres y borrados de grupos o permisos (los borrados en cascada no emiten m2m_changed)"""
+    permisos.invalidar_todo()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_usuario_eliminado(sender, instance, created=True, **kwargs):
+    """Un usuario nuevo o eliminado no debe conservar entradas con su id"""
+    if created:
+        permisos.invalidar_usuarios([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def crear_estadisticas_usuario(sender, instance, created, raw=False, **kwargs):
+    """Fila de estadísticas vacía para que los contadores se ajusten desde el alta"""
+    if created and not raw:
+        EstadisticasUsuario.objects.bulk_create(
+            [EstadisticasUsuario(usuario=instance)], ignore_conflicts=True
+        )
+
+
+@receiver(post_save, sender=User)
+def crear_clave_calendario(sender, instance, created, raw=False, **kwargs):
+    """Clave del enlace al calendario personal desde el alta"""
+    if created and not raw:
+        ClaveCalendario.objects.bulk_create(
+            [ClaveCalendario(usuario=instance)], ignore_conflicts=True
+        )
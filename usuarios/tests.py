@@ -1,3 +1,175 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from event_platform.presupuestos import PresupuestoConsultasMixin
+from eventos import reservas
+from eventos.models import Evento, RegistroEvento, TipoEvento
+
+from . import estadisticas
+from .models import EstadisticasUsuario
+from .permisos import grupos_de
+
+
+class PresupuestoConsultasUsuariosTests(PresupuestoConsultasMixin, TestCase):
+    """Las vistas de usuarios no deben superar su presupuesto de consultas"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('organizador')
+        self.usuario.groups.add(Group.objects.create(name='Organizadores'))
+
+    def test_perfil(self):
+        self.client.force_login(self.usuario)
+        self.assertDentroDelPresupuesto('usuarios:perfil')
+
+
+class PermisosCacheadosTests(TestCase):
+    """Pruebas de la caché de permisos y grupos"""
+
+    def setUp(self):
+        cache.clear()
+        self.grupo = Group.objects.create(name='Organizadores')
+        self.grupo.permissions.add(Permission.objects.get(codename='add_evento'))
+        self.usuario = User.objects.create_user('organizador')
+        self.usuario.groups.add(self.grupo)
+
+    def recargar(self):
+        # Cada petición trae una instancia nueva del usuario
+        return User.objects.get(pk=self.usuario.pk)
+
+    def test_sin_consultas_en_estado_estable(self):
+        self.assertTrue(self.recargar().has_perm('eventos.add_evento'))
+        usuario = self.recargar()
+        with self.assertNumQueries(0):
+            self.assertTrue(usuario.has_perm('eventos.add_evento'))
+            self.assertFalse(usuario.has_perm('eventos.can_manage_all_events'))
+            self.assertEqual([g.name for g in grupos_de(usuario)], ['Organizadores'])
+
+    def test_invalida_al_cambiar_permisos_del_grupo(self):
+        self.assertFalse(self.recargar().has_perm('eventos.can_view_private_events'))
+        self.grupo.permissions.add(Permission.objects.get(codename='can_view_private_events'))
+        self.assertTrue(self.recargar().has_perm('eventos.can_view_private_events'))
+        self.grupo.permissions.clear()
+        self.assertFalse(self.recargar().has_perm('eventos.add_evento'))
+
+    def test_invalida_al_cambiar_grupos_del_usuario(self):
+        self.assertTrue(self.recargar().has_perm('eventos.add_evento'))
+        self.grupo.user_set.remove(self.usuario)
+        self.assertFalse(self.recargar().has_perm('eventos.add_evento'))
+        self.usuario.groups.add(self.grupo)
+        self.assertTrue(self.recargar().has_perm('eventos.add_evento'))
+
+    def test_invalida_al_eliminar_grupo(self):
+        self.assertTrue(self.recargar().has_perm('eventos.add_evento'))
+        self.grupo.delete()
+        usuario = self.recargar()
+        self.assertFalse(usuario.has_perm('eventos.add_evento'))
+        self.assertEqual(grupos_de(usuario), [])
+
+    def test_permisos_directos_y_superusuario(self):
+        self.usuario.user_permissions.add(Permission.objects.get(codename='delete_evento'))
+        self.assertTrue(self.recargar().has_perm('eventos.delete_evento'))
+        User.objects.filter(pk=self.usuario.pk).update(is_superuser=True)
+        self.assertTrue(self.recargar().has_perm('eventos.can_manage_all_events'))
+        User.objects.filter(pk=self.usuario.pk).update(is_superuser=False, is_active=False)
+        self.assertFalse(self.recargar().has_perm('eventos.add_evento'))
+
+
+class EstadisticasUsuarioTests(TestCase):
+    """Pruebas de las estadísticas desnormalizadas del perfil"""
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = User.objects.create_user('organizador')
+        self.organizador.groups.add(Group.objects.create(name='Organizadores'))
+        self.asistente = User.objects.create_user('asistente')
+        self.tipo = TipoEvento.objects.create(nombre='Conferencia')
+
+    def crear_evento(self, **kwargs):
+        inicio = timezone.now() + timedelta(days=7)
+        datos = {
+            'titulo': 'Evento', 'descripcion': 'Descripción', 'tipo_evento': self.tipo,
+            'fecha_inicio': inicio, 'fecha_fin': inicio + timedelta(hours=2),
+            'ubicacion': 'Santiago', 'capacidad_maxima': 1, 'estado': 'publicado',
+            'organizador': self.organizador,
+        }
+        datos.update(kwargs)
+        return Evento.objects.create(**datos)
+
+    def estadisticas(self, usuario):
+        return EstadisticasUsuario.objects.get(usuario=usuario)
+
+    def test_eventos_organizados_y_publicados(self):
+        evento = self.crear_evento()
+        self.crear_evento(estado='borrador')
+        datos = self.estadisticas(self.organizador)
+        self.assertEqual((datos.eventos_organizados, datos.eventos_publicados), (2, 1))
+
+        evento.estado = 'cancelado'
+        evento.save()
+        evento.delete()
+        datos = self.estadisticas(self.organizador)
+        self.assertEqual((datos.eventos_organizados, datos.eventos_publicados), (1, 0))
+
+    def test_registros_por_estado(self):
+        evento = self.crear_evento(lista_espera=True)
+        reservas.reservar_plaza(evento, self.asistente)
+        otro = User.objects.create_user('otro')
+        reservas.reservar_plaza(evento, otro)
+        self.assertEqual(self.estadisticas(otro).registros_pendientes, 1)
+
+        # La cancelación promueve al siguiente de la lista de espera
+        reservas.cancelar_registro(RegistroEvento.objects.get(usuario=self.asistente))
+        datos = self.estadisticas(self.asistente)
+        self.assertEqual((datos.registros_confirmados, datos.registros_cancelados), (0, 1))
+        datos = self.estadisticas(otro)
+        self.assertEqual((datos.registros_pendientes, datos.registros_confirmados), (0, 1))
+
+        # Eliminar el evento elimina en cascada sus registros
+        evento.delete()
+        self.assertEqual(self.estadisticas(otro).registros_confirmados, 0)
+
+    def test_perfil_con_una_consulta_y_sin_cancelados(self):
+        evento = self.crear_evento(capacidad_maxima=5)
+        cancelado = self.crear_evento()
+        reservas.reservar_plaza(evento, self.organizador)
+        reservas.reservar_plaza(cancelado, self.organizador)
+        reservas.cancelar_registro(RegistroEvento.objects.get(evento=cancelado))
+
+        self.client.force_login(self.organizador)
+        self.client.get(reverse('usuarios:perfil'))
+        respuesta = self.client.get(reverse('usuarios:perfil'))
+        consultas = [
+            q['sql'] for q in respuesta.wsgi_request.consultas_sql.consultas
+            if 'eventos_' in q['sql'] or 'estadisticas' in q['sql']
+        ]
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(respuesta.context['eventos_organizados'], 2)
+        self.assertEqual(respuesta.context['eventos_activos'], 2)
+        self.assertEqual(respuesta.context['eventos_registrado'], 1)
+
+    def test_operaciones_masivas_invalidan_y_se_reconstruyen(self):
+        self.crear_evento()
+        Evento.objects.filter(organizador=self.organizador).update(estado='finalizado')
+        self.assertFalse(EstadisticasUsuario.objects.filter(usuario=self.organizador).exists())
+        datos = estadisticas.obtener(self.organizador)
+        self.assertEqual((datos.eventos_organizados, datos.eventos_publicados), (1, 0))
+
+    def test_comando_recalcular_estadisticas(self):
+        self.crear_evento()
+        EstadisticasUsuario.objects.filter(usuario=self.organizador).update(
+            eventos_organizados=7
+        )
+        with self.assertRaises(CommandError):
+            call_command('recalcular_estadisticas', '--verificar', stdout=StringIO())
 
-# Create your tests here.
+        call_command('recalcular_estadisticas', stdout=StringIO())
+        self.assertEqual(self.estadisticas(self.organizador).eventos_organizados, 1)
+        call_command('recalcular_estadisticas', '--verificar', stdout=StringIO())
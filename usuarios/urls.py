@@ -11,6 +11,7 @@ urlpatterns = [
     
     # URLs para gestión de perfil
     path('perfil/', views.perfil_usuario, name='perfil'),
+    path('perfil/renovar-calendario/', views.renovar_calendario, name='renovar_calendario'),
     
     # URL para acceso denegado
     path('acceso-denegado/', views.acceso_denegado, name='acceso_denegado'),
@@ -7,8 +7,12 @@ from django.views.generic import CreateView
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from django.contrib.auth.models import User
 from django import forms
+from eventos import calendario
+from . import estadisticas
+from .permisos import grupos_de
 
 # Vista personalizada para el login
 class LoginUsuario(LoginView):
@@ -113,28 +117,43 @@ class RegistroUsuario(CreateView):
 def perfil_usuario(request):
     """Vista para mostrar el perfil del usuario autenticado"""
     usuario = request.user
-    grupos = usuario.groups.all()
+    grupos = grupos_de(usuario)
     
-    # Obtener estadísticas del usuario
-    if grupos.filter(name='Organizadores').exists():
-        eventos_organizados = usuario.eventos_organizados.count()
-        eventos_activos = usuario.eventos_organizados.filter(estado='publicado').count()
+    # Estadísticas desnormalizadas: una sola fila (ver usuarios/estadisticas.py)
+    datos = estadisticas.obtener(usuario)
+    if any(grupo.name == 'Organizadores' for grupo in grupos):
+        eventos_organizados = datos.eventos_organizados
+        eventos_activos = datos.eventos_publicados
     else:
         eventos_organizados = 0
         eventos_activos = 0
     
-    eventos_registrado = usuario.eventos_asistiendo.count()
-    
     context = {
         'usuario': usuario,
         'grupos': grupos,
         'eventos_organizados': eventos_organizados,
         'eventos_activos': eventos_activos,
-        'eventos_registrado': eventos_registrado,
+        'eventos_registrado': datos.registros_confirmados,
+        'en_lista_espera': datos.registros_pendientes,
+        # Enlace firmado: las aplicaciones de calendario no inician sesión
+        'calendario_personal': calendario.enlace_usuario(usuario),
     }
     
     return render(request, 'usuarios/perfil.html', context)
 
+# Vista para renovar el enlace al calendario personal
+@login_required
+@require_POST
+def renovar_calendario(request):
+    """Genera un enlace nuevo al calendario personal y revoca el anterior"""
+    calendario.renovar_enlace_usuario(request.user)
+    messages.success(
+        request,
+        'Has renovado el enlace a tu calendario: actualiza tus suscripciones, '
+        'el enlace anterior ya no funciona.'
+    )
+    return redirect('usuarios:perfil')
+
 # Vista para acceso denegado
 def acceso_denegado(request):
     """Vista que se muestra cuando un usuario no tiene permisos suficientes"""